@@ -0,0 +1,317 @@
+# ai_providers.py
+# AI providers for Q&A extraction, and a router that picks the healthiest one
+import asyncio
+import functools
+import os
+import threading
+import time
+from importlib.util import find_spec
+from clients import clients
+from rate_limit import estimate_tokens, get_limiter
+
+# Optional provider SDKs (clients imports them when first used)
+try:
+    GEMINI_AVAILABLE = find_spec("google.generativeai") is not None
+except ImportError:  # no google namespace package at all
+    GEMINI_AVAILABLE = False
+if not GEMINI_AVAILABLE:
+    print("⚠️  Google Gemini SDK not installed")
+
+# Provider Configuration
+GROQ_API_KEY = os.getenv("GROQ_API_KEY", "your-groq-api-key-here")
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "your-gemini-api-key-here")
+HUGGINGFACE_API_KEY = os.getenv("HUGGINGFACE_API_KEY", "your-hf-api-key-here")
+GROQ_MODEL = "llama-3.3-70b-versatile"
+GEMINI_MODELS = ['gemini-1.5-flash', 'gemini-pro', 'gemini-1.0-pro']
+HUGGINGFACE_MODEL = "mistralai/Mistral-7B-Instruct-v0.2"
+# Output budget per call, counted against tokens/min quotas (see rate_limit.py)
+MAX_COMPLETION_TOKENS = {"groq": 3000, "gemini": 2000, "huggingface": 2000}
+# Model context windows in tokens (prompt + completion)
+CONTEXT_WINDOWS = {"groq": 128000, "gemini": 1000000, "huggingface": 32000}
+EXTRACTION_MODELS = (
+    [("groq", GROQ_MODEL)]
+    + [("gemini", model_name) for model_name in GEMINI_MODELS]
+    + [("huggingface", HUGGINGFACE_MODEL)]
+)
+
+# Router Configuration
+AI_RATE_LIMIT_COOLDOWN = float(os.getenv("AI_RATE_LIMIT_COOLDOWN", "60"))
+AI_MAX_COOLDOWN = float(os.getenv("AI_MAX_COOLDOWN", "900"))
+# Longest a request waits for a rate-limited provider's cooldown to end;
+# providers cooling down for longer are skipped instead of called
+AI_MAX_COOLDOWN_WAIT = float(os.getenv("AI_MAX_COOLDOWN_WAIT", "60"))
+AI_PRIOR_LATENCY = 10.0  # assumed seconds per call until a provider has been measured
+AI_HEALTH_ALPHA = 0.2    # EWMA weight of the newest observation
+
+class RateLimited(Exception):
+    """A provider refused the request with HTTP 429"""
+
+    def __init__(self, message: str, retry_after: float = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+def retry_after_seconds(headers) -> float:
+    """Parse a Retry-After header given in seconds (None if absent or a date)"""
+    try:
+        return float(headers.get('retry-after'))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+def as_rate_limit(error: Exception):
+    """The RateLimited equivalent of a provider SDK error, or None if it is not a 429"""
+    if isinstance(error, RateLimited):
+        return error
+    response = getattr(error, 'response', None)
+    status = getattr(error, 'status_code', None) or getattr(response, 'status_code', None)
+    message = str(error).lower()
+    if status == 429 or '429' in message or 'rate limit' in message or 'quota' in message:
+        return RateLimited(str(error), retry_after_seconds(getattr(response, 'headers', None)))
+    return None
+
+def call_groq(prompt: str, on_text=None):
+    """Groq completion; returns (text, model). Streams deltas to on_text if given"""
+    response = clients.groq(GROQ_API_KEY).chat.completions.create(
+        model=GROQ_MODEL,
+        messages=[{"role": "user", "content": prompt}],
+        temperature=0.3,
+        max_tokens=MAX_COMPLETION_TOKENS["groq"],
+        timeout=30,
+        stream=on_text is not None
+    )
+    if on_text is None:
+        return response.choices[0].message.content.strip(), GROQ_MODEL
+
+    parts = []
+    for chunk in response:
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        if delta:
+            parts.append(delta)
+            on_text(delta)
+    return ''.join(parts).strip(), GROQ_MODEL
+
+class GeminiProvider:
+    """
+    Gemini completions. The SDK is configured once (see clients.py), and the
+    first model name that works is remembered and tried first from then on
+    (Google keeps renaming them).
+    """
+
+    def __init__(self, api_key: str = GEMINI_API_KEY, models=GEMINI_MODELS):
+        self.api_key = api_key
+        self.models = list(models)
+        self.model_name = None
+
+    def __call__(self, prompt: str, on_text=None):
+        preferred = self.model_name
+        candidates = [preferred] + [m for m in self.models if m != preferred] if preferred else self.models
+        for model_name in candidates:
+            try:
+                model = clients.gemini_model(self.api_key, model_name)
+                if on_text is None:
+                    result = model.generate_content(prompt).text.strip()
+                else:
+                    parts = []
+                    for chunk in model.generate_content(prompt, stream=True):
+                        parts.append(chunk.text)
+                        on_text(chunk.text)
+                    result = ''.join(parts).strip()
+            except Exception as e:
+                rate_limit = as_rate_limit(e)
+                if rate_limit:
+                    # Quota is per project, so other model names won't help
+                    raise rate_limit
+                print(f"   {model_name} failed: {str(e)[:100]}")
+                if on_text is not None:
+                    on_text(None)
+                continue
+            if model_name != preferred:
+                print(f"   Gemini model {model_name} works, using it from now on")
+                self.model_name = model_name
+            return result, model_name
+        raise Exception("All Gemini model names failed")
+
+def call_huggingface(prompt: str, on_text=None):
+    """Hugging Face Inference API completion; returns (text, model). Not
+    streamed: on_text, if given, receives the whole completion at once"""
+    response = clients.http_client('huggingface').post(
+        f"https://api-inference.huggingface.co/models/{HUGGINGFACE_MODEL}",
+        headers={"Authorization": f"Bearer {HUGGINGFACE_API_KEY}"},
+        json={
+            "inputs": prompt,
+            "parameters": {"max_new_tokens": MAX_COMPLETION_TOKENS["huggingface"], "temperature": 0.3}
+        },
+        timeout=60
+    )
+    if response.status_code == 429:
+        raise RateLimited("HTTP 429", retry_after_seconds(response.headers))
+    if response.status_code != 200:
+        raise Exception(f"HTTP {response.status_code}")
+    result = response.json()[0]['generated_text'].strip()
+    if on_text is not None:
+        on_text(result)
+    return result, HUGGINGFACE_MODEL
+
+def prompt_token_budget(name: str) -> int:
+    """Largest prompt a provider can take in one call: its context window
+    less the completion budget, and never more than its tokens/min quota"""
+    budget = CONTEXT_WINDOWS.get(name, 8000)
+    quota = get_limiter(name).tokens
+    if quota is not None:
+        budget = min(budget, int(quota.capacity))
+    return budget - MAX_COMPLETION_TOKENS.get(name, 0)
+
+def default_providers():
+    """Configured providers as (name, call), in static preference order"""
+    providers = [("groq", call_groq)]
+    if GEMINI_AVAILABLE and GEMINI_API_KEY and GEMINI_API_KEY != "your-gemini-api-key-here":
+        providers.append(("gemini", GeminiProvider()))
+    if HUGGINGFACE_API_KEY and HUGGINGFACE_API_KEY != "your-hf-api-key-here":
+        providers.append(("huggingface", call_huggingface))
+    return providers
+
+class ProviderRouter:
+    """
+    Sends each completion to the healthiest provider, falling back to the rest.
+
+    Per provider it keeps an EWMA of call latency and of the error rate, and
+    a cooldown set by 429 responses (Retry-After if given, otherwise an
+    exponential backoff from AI_RATE_LIMIT_COOLDOWN). Providers in cooldown
+    are only tried after every ready provider has failed, and never before
+    their cooldown ends: the request waits for it (up to
+    AI_MAX_COOLDOWN_WAIT) or skips the provider, rather than drawing another
+    429 that would extend the backoff.
+    Ranking is by expected cost, latency / success rate; unmeasured
+    providers assume AI_PRIOR_LATENCY, so the static order decides at startup.
+    Every call first takes its estimated tokens from the provider's
+    rate_limit quota, so requests queue locally instead of drawing 429s.
+    """
+
+    def __init__(self, providers=None):
+        self.providers = providers if providers is not None else default_providers()
+        self._lock = threading.Lock()
+        self.health = {
+            name: {
+                'calls': 0, 'failures': 0, 'rate_limited': 0, 'consecutive_429s': 0,
+                'latency': None, 'error_rate': 0.0, 'cooldown_until': 0.0, 'last_error': None,
+            }
+            for name, _ in self.providers
+        }
+
+    def _cost(self, name: str) -> float:
+        health = self.health[name]
+        latency = health['latency'] if health['latency'] is not None else AI_PRIOR_LATENCY
+        return latency / max(1.0 - health['error_rate'], 0.05)
+
+    def ranked(self):
+        """Providers in the order to try them right now"""
+        now = time.time()
+        with self._lock:
+            order = {name: index for index, (name, _) in enumerate(self.providers)}
+            ready = [p for p in self.providers if self.health[p[0]]['cooldown_until'] <= now]
+            cooling = [p for p in self.providers if self.health[p[0]]['cooldown_until'] > now]
+            ready.sort(key=lambda p: (self._cost(p[0]), order[p[0]]))
+            cooling.sort(key=lambda p: self.health[p[0]]['cooldown_until'])
+        return ready + cooling
+
+    def _cooldown_wait(self, name: str):
+        """Seconds until a provider may be called again, or None if that is past AI_MAX_COOLDOWN_WAIT"""
+        with self._lock:
+            remaining = max(self.health[name]['cooldown_until'] - time.time(), 0.0)
+        return remaining if remaining <= AI_MAX_COOLDOWN_WAIT else None
+
+    def _record(self, name: str, elapsed: float, error: Exception = None):
+        with self._lock:
+            health = self.health[name]
+            health['calls'] += 1
+            failed = 1.0 if error else 0.0
+            health['error_rate'] += AI_HEALTH_ALPHA * (failed - health['error_rate'])
+
+            rate_limit = as_rate_limit(error) if error else None
+            if rate_limit:
+                # A fast 429 says nothing about latency; back off instead
+                health['rate_limited'] += 1
+                health['consecutive_429s'] += 1
+                backoff = AI_RATE_LIMIT_COOLDOWN * 2 ** (health['consecutive_429s'] - 1)
+                health['cooldown_until'] = time.time() + min(rate_limit.retry_after or backoff, AI_MAX_COOLDOWN)
+            else:
+                health['consecutive_429s'] = 0
+                if health['latency'] is None:
+                    health['latency'] = elapsed
+                else:
+                    health['latency'] += AI_HEALTH_ALPHA * (elapsed - health['latency'])
+            if error:
+                health['failures'] += 1
+                health['last_error'] = str(error)[:100]
+
+    async def complete(self, prompt: str, on_text=None, executor=None):
+        """
+        Completion from the best available provider; returns (text, provider, model).
+
+        Provider SDK calls block, so they run on `executor` (the loop's
+        default executor if None); waits for quota and cooldowns are awaited
+        on the event loop and never hold a thread. With on_text, output is
+        streamed: on_text(delta) is called (on the executor thread) as text
+        arrives, and on_text(None) when an attempt fails partway and the
+        next provider starts over.
+        """
+        loop = asyncio.get_running_loop()
+        prompt_tokens = estimate_tokens(prompt)
+        providers = self.ranked()
+
+        # Prefer a healthy provider with quota free right now over queueing
+        # for the best one; only wait for quota once none has any left
+        admitted = None
+        for index, (name, _) in enumerate(providers):
+            if self.health[name]['cooldown_until'] > time.time():
+                break
+            if get_limiter(name).try_acquire(prompt_tokens + MAX_COMPLETION_TOKENS.get(name, 0)):
+                admitted = name
+                providers.insert(0, providers.pop(index))
+                break
+
+        errors = []
+        for name, call in providers:
+            wait = self._cooldown_wait(name)
+            if wait is None:
+                errors.append(f"{name}: rate limited, cooling down")
+                print(f"⏭️  Skipping {name}: rate limited, cooling down")
+                continue
+            if wait > 0:
+                print(f"⏳ {name} is rate limited: waiting {wait:.1f}s for its cooldown")
+                await asyncio.sleep(wait)
+            if name != admitted:
+                await get_limiter(name).acquire_async(prompt_tokens + MAX_COMPLETION_TOKENS.get(name, 0))
+            print(f"🤖 Trying {name}...")
+            start = time.perf_counter()
+            try:
+                request = functools.partial(call, prompt, on_text) if on_text else functools.partial(call, prompt)
+                result, model = await loop.run_in_executor(executor, request)
+            except Exception as e:
+                self._record(name, time.perf_counter() - start, e)
+                errors.append(f"{name}: {str(e)[:100]}")
+                print(f"❌ {name} failed: {str(e)[:100]}")
+                if on_text:
+                    on_text(None)
+                continue
+            self._record(name, time.perf_counter() - start)
+            print(f"✅ {name} succeeded with {model}!")
+            return result, name, model
+
+        raise Exception(f"All AI providers failed: {' | '.join(errors)}")
+
+    def summary(self) -> dict:
+        """Per-provider health, for /api/stats"""
+        now = time.time()
+        with self._lock:
+            return {
+                name: {
+                    'calls': health['calls'],
+                    'failures': health['failures'],
+                    'rate_limited': health['rate_limited'],
+                    'latency_seconds': round(health['latency'], 2) if health['latency'] is not None else None,
+                    'error_rate': round(health['error_rate'], 3),
+                    'cooldown_seconds': round(max(health['cooldown_until'] - now, 0), 1),
+                    'last_error': health['last_error'],
+                }
+                for name, health in self.health.items()
+            }
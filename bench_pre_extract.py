@@ -0,0 +1,65 @@
+# bench_pre_extract.py
+# Benchmark: rule-based pre-extraction over the fixture corpus in
+# fixtures/pre_extract. Articles under local/ should be parsed without the
+# LLM, those under llm/ should not. Reports routing, per-article parse
+# latency and the prompt + completion tokens the local path saves.
+# Run: python bench_pre_extract.py
+import glob
+import os
+import statistics
+import tempfile
+import time
+
+_scratch = tempfile.mkdtemp(prefix="bench-pre-extract-")
+os.environ.update(
+    DATABASE_PATH=os.path.join(_scratch, "scraper.db"),
+    LLM_CACHE_PATH=os.path.join(_scratch, "llm_cache.db"),
+    SCRAPE_CACHE_DIR=os.path.join(_scratch, "scrape_cache"),
+    MONGODB_URI="",
+    CLIENT_WARMUP="0",
+)
+
+import simple_api
+from qa_extract import pre_extract
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "pre_extract")
+REPEATS = int(os.getenv("BENCH_REPEATS", "200"))
+
+def parse_ms(content: str) -> float:
+    """Median pre_extract time over REPEATS runs"""
+    timings = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        pre_extract(content)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+def main():
+    paths = sorted(glob.glob(os.path.join(CORPUS, "*", "*.md")))
+    misrouted, latencies = [], []
+    print(f"{'article':<36} {'expected':>8} {'route':>6} {'conf':>6} {'pairs':>5} {'ms':>7} {'saved':>7}")
+    for path in paths:
+        content = open(path, encoding="utf-8").read()
+        expected = os.path.basename(os.path.dirname(path))
+        saved_before = simple_api.pre_extract_stats['tokens_saved']
+        routed = simple_api.pre_extract_articles([content])[0]
+        saved = simple_api.pre_extract_stats['tokens_saved'] - saved_before
+        qa_pairs, confidence = pre_extract(content)
+        route = "local" if routed else "llm"
+        latencies.append(parse_ms(content))
+        if route != expected:
+            misrouted.append(path)
+        print(f"{os.path.basename(path):<36} {expected:>8} {route:>6} {confidence:6.2f} "
+              f"{len(qa_pairs):5d} {latencies[-1]:7.3f} {saved:7d}")
+
+    stats = simple_api.pre_extract_stats
+    print(f"\n📐 {stats['local']} of {len(paths)} articles parsed locally, {stats['llm']} sent to the LLM")
+    print(f"⏱️  pre_extract median {statistics.median(latencies):.3f} ms, max {max(latencies):.3f} ms per article")
+    print(f"💰 ~{stats['tokens_saved']} tokens saved ({stats['tokens_saved'] // max(stats['local'], 1)} per local article)")
+    if misrouted:
+        print(f"❌ Misrouted: {', '.join(os.path.basename(path) for path in misrouted)}")
+    simple_api.storage.close()
+    simple_api.llm_cache.close()
+
+if __name__ == "__main__":
+    main()
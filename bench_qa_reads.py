@@ -0,0 +1,112 @@
+# bench_qa_reads.py
+# Benchmark: concurrent /api/qa reads, idle and while Q&A pairs are being ingested.
+# Runs against a scratch SQLite database: python bench_qa_reads.py
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+import uuid
+
+_scratch = tempfile.mkdtemp(prefix="bench-qa-reads-")
+os.environ.update(
+    DATABASE_PATH=os.path.join(_scratch, "scraper.db"),
+    LLM_CACHE_PATH=os.path.join(_scratch, "llm_cache.db"),
+    SCRAPE_CACHE_DIR=os.path.join(_scratch, "scrape_cache"),
+    MONGODB_URI="",
+    CLIENT_WARMUP="0",
+)
+
+import httpx
+import simple_api
+
+SEED_PAIRS = int(os.getenv("BENCH_SEED_PAIRS", "5000"))
+READERS = int(os.getenv("BENCH_READERS", "32"))
+READS_PER_READER = int(os.getenv("BENCH_READS_PER_READER", "50"))
+INGEST_BATCH = 20  # pairs per save_qa_pairs call, like one job's output
+
+# A realistic vocabulary size, so most questions are not near-duplicate candidates of each other
+WORDS = [f"{a}{b}{c}" for a in ("sw", "ui", "co", "ac", "pr", "ge") for b in "aeiou" for c in ("rt", "nk", "ll", "ft", "mp")]
+
+def random_pairs(count: int):
+    return [
+        {
+            "question": f"{' '.join(random.sample(WORDS, random.randint(5, 9))).capitalize()} {uuid.uuid4().hex[:8]}?",
+            "answer": "An answer of typical length. " * 8,
+        }
+        for _ in range(count)
+    ]
+
+def ingest(storage, stop: threading.Event, written: list):
+    """Save Q&A like the persist worker does, one job's batch at a time, until stopped"""
+    while not stop.is_set():
+        job_id = str(uuid.uuid4())
+        url = f"https://medium.com/@bench/{job_id}"
+        storage.create_job(job_id, url)
+        _, inserted = storage.save_qa_pairs(job_id, url, random_pairs(INGEST_BATCH))
+        written.append(len(inserted))
+
+async def reader(client, latencies: list):
+    """Page through /api/qa with the keyset cursor, restarting at the end"""
+    cursor = None
+    for _ in range(READS_PER_READER):
+        params = {"limit": 50, **({"cursor": cursor} if cursor else {})}
+        started = time.perf_counter()
+        response = await client.get("/api/qa", params=params)
+        latencies.append(time.perf_counter() - started)
+        response.raise_for_status()
+        cursor = response.headers.get("X-Next-Cursor")
+
+async def read_round(label: str) -> dict:
+    latencies = []
+    transport = httpx.ASGITransport(app=simple_api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(reader(client, latencies) for _ in range(READERS)))
+        elapsed = time.perf_counter() - started
+    latencies.sort()
+    result = {
+        "label": label,
+        "reads": len(latencies),
+        "reads_per_second": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+        "max_ms": latencies[-1] * 1000,
+    }
+    print(
+        f"{label:<16} {result['reads']:>6} reads  {result['reads_per_second']:>8.0f}/s  "
+        f"p50 {result['p50_ms']:6.1f} ms  p95 {result['p95_ms']:6.1f} ms  "
+        f"p99 {result['p99_ms']:6.1f} ms  max {result['max_ms']:6.1f} ms"
+    )
+    return result
+
+async def main():
+    storage = simple_api.storage.storage  # the SQLiteStorage behind the API's ThreadedStorage
+    print(f"🌱 Seeding {SEED_PAIRS} Q&A pairs in {os.environ['DATABASE_PATH']}")
+    for _ in range(SEED_PAIRS // INGEST_BATCH):
+        job_id = str(uuid.uuid4())
+        url = f"https://medium.com/@seed/{job_id}"
+        storage.create_job(job_id, url)
+        storage.save_qa_pairs(job_id, url, random_pairs(INGEST_BATCH))
+
+    print(f"📖 {READERS} concurrent readers x {READS_PER_READER} pages of /api/qa?limit=50\n")
+    idle = await read_round("idle")
+
+    stop, written = threading.Event(), []
+    writer = threading.Thread(target=ingest, args=(storage, stop, written), daemon=True)
+    writer.start()
+    started = time.perf_counter()
+    busy = await read_round("during ingest")
+    stop.set()
+    writer.join()
+    elapsed = time.perf_counter() - started
+
+    print(f"\n✍️  Ingested {sum(written)} pairs in {len(written)} jobs meanwhile ({sum(written) / elapsed:.0f} pairs/s)")
+    print(f"📈 p95 during ingest vs idle: {busy['p95_ms'] / idle['p95_ms']:.2f}x")
+    print(f"   SQLite pool: {storage.pool.stats}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
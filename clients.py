@@ -0,0 +1,184 @@
+# clients.py
+# Long-lived, keep-alive HTTP/SDK clients shared by the API and the monitor scripts
+import os
+import sys
+import threading
+import time
+from importlib.util import find_spec
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+HTTP2_AVAILABLE = find_spec("h2") is not None  # enables HTTP/2 in httpx
+
+# Client Configuration
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "16"))
+HTTP_KEEPALIVE_SECONDS = float(os.getenv("HTTP_KEEPALIVE_SECONDS", "120"))
+CLIENT_WARMUP = os.getenv("CLIENT_WARMUP", "1") == "1"
+WARMUP_TIMEOUT = 5.0
+
+# Hosts opened at warm-up, so the first job skips DNS + TCP + TLS
+WARMUP_URLS = {
+    'groq': "https://api.groq.com",
+    'huggingface': "https://api-inference.huggingface.co",
+    'firecrawl': "https://api.firecrawl.dev",
+}
+
+class _SessionRequests:
+    """
+    Stand-in for the `requests` module inside an SDK that calls
+    requests.post/get directly (firecrawl-py does): those calls go through a
+    shared Session, everything else (exceptions, Response) is the real module.
+    """
+
+    def __init__(self, session: requests.Session):
+        self._session = session
+
+    def post(self, *args, **kwargs):
+        return self._session.post(*args, **kwargs)
+
+    def get(self, *args, **kwargs):
+        return self._session.get(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(requests, name)
+
+class ClientRegistry:
+    """
+    One long-lived client per service, created on first use.
+
+    Rebuilding a client per call throws its connection pool away, so every
+    request paid DNS, TCP and TLS setup again. These keep connections alive
+    (HTTP/2 for the httpx-based clients when `h2` is installed) and count
+    requests against new connections, so reuse can be checked in /api/stats.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()  # creating a client may create its pool
+        self._clients = {}
+        self.stats = {}
+
+    def _get(self, key, create):
+        with self._lock:
+            if key not in self._clients:
+                self._clients[key] = create()
+            return self._clients[key]
+
+    def _stats(self, name: str) -> dict:
+        return self.stats.setdefault(name, {'requests': 0, 'connections': 0})
+
+    def http_client(self, name: str, timeout: float = 60.0) -> httpx.Client:
+        """Pooled httpx client; counts requests and newly opened connections"""
+        def create():
+            stats = self._stats(name)
+
+            def trace(event, info):
+                if event == 'connection.connect_tcp.complete':
+                    stats['connections'] += 1
+
+            def on_request(request):
+                stats['requests'] += 1
+                request.extensions['trace'] = trace
+
+            return httpx.Client(
+                http2=HTTP2_AVAILABLE,
+                timeout=timeout,
+                limits=httpx.Limits(
+                    max_connections=HTTP_POOL_SIZE,
+                    max_keepalive_connections=HTTP_POOL_SIZE,
+                    keepalive_expiry=HTTP_KEEPALIVE_SECONDS,
+                ),
+                event_hooks={'request': [on_request]},
+            )
+        return self._get(('http', name), create)
+
+    def session(self, name: str) -> requests.Session:
+        """Pooled requests Session, for SDKs built on requests (HTTP/1.1 only)"""
+        def create():
+            self._stats(name)
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            return session
+        return self._get(('session', name), create)
+
+    def groq(self, api_key: str):
+        """Groq SDK client over a shared keep-alive connection pool"""
+        from groq import Groq
+        return self._get(('groq', api_key), lambda: Groq(api_key=api_key, http_client=self.http_client('groq')))
+
+    def firecrawl(self, api_key: str):
+        """FirecrawlApp whose HTTP calls go through a shared Session"""
+        from firecrawl import FirecrawlApp
+
+        def create():
+            sdk = sys.modules.get(FirecrawlApp.__module__)
+            if sdk is not None and getattr(sdk, 'requests', None) is requests:
+                sdk.requests = _SessionRequests(self.session('firecrawl'))
+            return FirecrawlApp(api_key=api_key)
+        return self._get(('firecrawl', api_key), create)
+
+    def gemini_model(self, api_key: str, model_name: str):
+        """Gemini model handle; the SDK is configured once and keeps its channel"""
+        import google.generativeai as genai
+
+        def configure():
+            genai.configure(api_key=api_key)
+            return genai
+        self._get(('gemini', api_key), configure)
+        return self._get(('gemini', api_key, model_name), lambda: genai.GenerativeModel(model_name))
+
+    def warm_up(self, names=None):
+        """Open a connection to each service ahead of the first job (blocking)"""
+        for name in WARMUP_URLS if names is None else names:
+            start = time.perf_counter()
+            try:
+                if name == 'firecrawl':
+                    self.session(name).head(WARMUP_URLS[name], timeout=WARMUP_TIMEOUT)
+                else:
+                    self.http_client(name).head(WARMUP_URLS[name], timeout=WARMUP_TIMEOUT)
+            except Exception as e:
+                print(f"⚠️  Warm-up of {name} failed: {str(e)[:100]}")
+                continue
+            print(f"🔥 {name} connection warmed up in {time.perf_counter() - start:.2f}s")
+
+    def _session_counts(self, name: str):
+        """(requests, connections) from the urllib3 pools behind a Session"""
+        session = self._clients.get(('session', name))
+        if session is None:
+            return 0, 0
+        total_requests = total_connections = 0
+        for adapter in set(session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is not None:
+                    total_requests += pool.num_requests
+                    total_connections += pool.num_connections
+        return total_requests, total_connections
+
+    def summary(self) -> dict:
+        """Requests, connections opened and reuse rate per service, for /api/stats"""
+        result = {}
+        for name, stats in list(self.stats.items()):
+            counts = dict(stats)
+            if ('session', name) in self._clients:
+                counts['requests'], counts['connections'] = self._session_counts(name)
+            requests_made = counts['requests']
+            counts['reuse_rate'] = (
+                round(1 - min(counts['connections'], requests_made) / requests_made, 3) if requests_made else 0.0
+            )
+            result[name] = counts
+        result['http2'] = HTTP2_AVAILABLE
+        return result
+
+    def close(self):
+        with self._lock:
+            for key, client in self._clients.items():
+                if key[0] in ('http', 'session'):
+                    client.close()
+            self._clients.clear()
+
+# Process-wide registry
+clients = ClientRegistry()
@@ -0,0 +1,25 @@
+# conftest.py
+# pytest setup: databases and caches go to a scratch directory, and the
+# manual test_* scripts (which call live services at import) are skipped
+import os
+import tempfile
+import pytest
+
+collect_ignore = ["test_firecrawl_urls.py", "test_groq.py", "test_url_detection.py"]
+
+_scratch = tempfile.mkdtemp(prefix="scraper-tests-")
+os.environ.update(
+    DATABASE_PATH=os.path.join(_scratch, "scraper.db"),
+    LLM_CACHE_PATH=os.path.join(_scratch, "llm_cache.db"),
+    SCRAPE_CACHE_DIR=os.path.join(_scratch, "scrape_cache"),
+    MONGODB_URI="",
+    CLIENT_WARMUP="0",
+)
+
+@pytest.fixture(scope="session")
+def client():
+    """One TestClient for the session: the app's executors don't restart after shutdown"""
+    from fastapi.testclient import TestClient
+    import simple_api
+    with TestClient(simple_api.app) as client:
+        yield client
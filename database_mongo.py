@@ -1,23 +1,385 @@
 # database_mongo.py
 # MongoDB-based database layer for persistent storage
 import os
-from datetime import datetime
-from typing import List, Dict, Optional
-from pymongo import MongoClient, ASCENDING, DESCENDING
-from pymongo.errors import ConnectionFailure, DuplicateKeyError
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional, Tuple
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import MongoClient, ASCENDING, DESCENDING, ReadPreference, UpdateOne
+from pymongo.errors import BulkWriteError, ConnectionFailure, DuplicateKeyError
+from database_sqlite import STATS_COUNTERS
+from qa_dedup import SIMILARITY_THRESHOLD, calculate_similarity, choose_bands, normalize_question, question_band_keys
+from scrape_cache import canonical_url
 
 # MongoDB Configuration
 MONGODB_URI = os.getenv("MONGODB_URI", "")
 DATABASE_NAME = "medium_scraper"
+# Connection pool per client (driver defaults: 100 / 0)
+MONGODB_MAX_POOL_SIZE = int(os.getenv("MONGODB_MAX_POOL_SIZE", "100"))
+MONGODB_MIN_POOL_SIZE = int(os.getenv("MONGODB_MIN_POOL_SIZE", "0"))
+# Read preference for the API's read-only queries (job status, listings, export, stats);
+# writes, dedup lookups and the job queue always use the primary
+MONGODB_READ_PREFERENCE = os.getenv("MONGODB_READ_PREFERENCE", "primary")
+# Write concern `w` ("majority", or a number of members); empty keeps the URI/driver default
+MONGODB_WRITE_CONCERN = os.getenv("MONGODB_WRITE_CONCERN", "")
 
-class MongoDB:
-    """MongoDB database wrapper for persistent Q&A storage"""
+# Public fields of a Q&A document
+QA_FIELDS = ("question", "answer", "source_url", "timestamp")
+QA_PROJECTION = {field: 1 for field in QA_FIELDS}
+
+def qa_fields(doc) -> Dict:
+    return {field: doc[field] for field in QA_FIELDS}
+
+def client_options() -> Dict:
+    """Pool size and write concern for MongoClient / AsyncIOMotorClient"""
+    options = {
+        "serverSelectionTimeoutMS": 5000,
+        "maxPoolSize": MONGODB_MAX_POOL_SIZE,
+        "minPoolSize": MONGODB_MIN_POOL_SIZE,
+    }
+    if MONGODB_WRITE_CONCERN:
+        write_concern = MONGODB_WRITE_CONCERN
+        options["w"] = int(write_concern) if write_concern.isdigit() else write_concern
+    return options
+
+def read_preference():
+    """MONGODB_READ_PREFERENCE ("primary", "secondaryPreferred", ...) as a pymongo read preference"""
+    mode = "".join("_" + c if c.isupper() else c for c in MONGODB_READ_PREFERENCE).upper()
+    try:
+        return getattr(ReadPreference, mode)
+    except AttributeError:
+        raise ValueError(f"Unknown MONGODB_READ_PREFERENCE: {MONGODB_READ_PREFERENCE}")
+
+def new_job(job_id: str, url: str, created_at: str) -> Dict:
+    return {
+        "id": job_id,
+        "url": url,
+        "status": "queued",
+        "qa_count": 0,
+        "error": None,
+        "created_at": created_at,
+        "completed_at": None
+    }
+
+def duplicate_key_indices(error: BulkWriteError) -> set:
+    """Indices of the writes an unordered bulk write lost to the unique indexes (re-raises other errors)"""
+    if any(write.get("code") != 11000 for write in error.details.get("writeErrors", [])):
+        raise error
+    return {write["index"] for write in error.details["writeErrors"]}
+
+def batch_groups_pipeline(batch_id: str) -> List[Dict]:
+    return [
+        {"$match": {"batch_id": batch_id}},
+        {"$lookup": {"from": "jobs", "localField": "job_id", "foreignField": "id", "as": "job"}},
+        {"$unwind": "$job"},
+        {"$group": {
+            "_id": "$job.status",
+            "jobs": {"$sum": 1},
+            "qa_pairs": {"$sum": {"$ifNull": ["$job.qa_count", 0]}},
+            "created_at": {"$min": "$job.created_at"},
+            "completed_at": {"$max": "$job.completed_at"},
+        }},
+    ]
+
+def batch_group(group) -> Dict:
+    return {"status": group["_id"], **{key: group[key] for key in ("jobs", "qa_pairs", "created_at", "completed_at")}}
+
+def lease_deadline(lease_seconds: int) -> str:
+    return (datetime.now() + timedelta(seconds=lease_seconds)).isoformat()
+
+def expired_leases(now: str) -> Dict:
+    return {"status": "processing", "$or": [{"lease_expires_at": None}, {"lease_expires_at": {"$lt": now}}]}
+
+def cursor_id(value) -> ObjectId:
+    """The _id in a pagination cursor; ValueError if it is not an ObjectId"""
+    try:
+        if not isinstance(value, str):
+            raise InvalidId(value)  # ObjectId(None) would generate a new id
+        return ObjectId(value)
+    except InvalidId as e:
+        raise ValueError(f"Invalid cursor id: {value!r}") from e
+
+def newer_than(timestamp: str, last_id: ObjectId) -> Dict:
+    """Keyset condition: after (timestamp, _id) in ascending order"""
+    return {"$or": [
+        {"timestamp": {"$gt": timestamp}},
+        {"timestamp": timestamp, "_id": {"$gt": last_id}},
+    ]}
+
+def older_than(timestamp: str, last_id: ObjectId) -> Dict:
+    """Keyset condition: after (timestamp, _id) in descending order"""
+    return {"$or": [
+        {"timestamp": {"$lt": timestamp}},
+        {"timestamp": timestamp, "_id": {"$lt": last_id}},
+    ]}
+
+def stats_from_counters(counters: Dict) -> Dict:
+    total_jobs = counters["jobs"]
+    completed_jobs = counters["jobs_completed"]
+
+    # Job URLs are unique (see MongoDB._create_indexes), so completed jobs are unique articles
+    unique_urls = completed_jobs
+
+    success_rate = f"{(completed_jobs / total_jobs * 100):.1f}%" if total_jobs > 0 else "0%"
+
+    return {
+        "total_qa_pairs": counters["qa_pairs"],
+        "total_jobs": total_jobs,
+        "completed_jobs": completed_jobs,
+        "failed_jobs": counters["jobs_failed"],
+        "unique_articles_processed": unique_urls,
+        "success_rate": success_rate,
+        "queue_size": counters["jobs_queued"],
+        "database_type": "MongoDB Atlas",
+        "persistent": True
+    }
+
+# Query, update and result builders shared by MongoDB and database_motor.AsyncMongoDB,
+# so the two classes differ only in how they await the driver
+JOB_LOOKUP_PROJECTION = {"id": 1, "url": 1, "status": 1, "_id": 0}
+CANDIDATE_PROJECTION = {"question": 1, "lsh": 1, "_id": 0}
+CLAIMED_DELTAS = {"jobs_queued": -1, "jobs_processing": 1}
+OLDEST_FIRST = [("timestamp", ASCENDING), ("_id", ASCENDING)]
+NEWEST_FIRST = [("timestamp", DESCENDING), ("_id", DESCENDING)]
+
+def job_lookup(urls: List[str]) -> Tuple[List[str], Dict]:
+    """(canonical URLs in submission order, filter for jobs under either spelling)"""
+    canonical = list(dict.fromkeys(canonical_url(url) for url in urls))
+    lookup = list(dict.fromkeys(canonical + [url.strip() for url in urls]))
+    return canonical, {"url": {"$in": lookup}}
+
+def known_jobs(docs) -> Tuple[Dict, List[str]]:
+    """Fold looked-up jobs (oldest first) into ({canonical URL: job id}, failed job ids)"""
+    existing, failed = {}, []
+    for doc in docs:
+        key = canonical_url(doc["url"])
+        if key not in existing:
+            existing[key] = doc["id"]
+            if doc["status"] == "failed":
+                failed.append(doc["id"])
+    return existing, failed
+
+def new_jobs(canonical: List[str], existing: Dict) -> List[Dict]:
+    now = datetime.now().isoformat()
+    return [new_job(str(uuid.uuid4()), url, now) for url in canonical if url not in existing]
+
+def lost_urls(jobs: List[Dict], error: BulkWriteError) -> List[str]:
+    """URLs a concurrent submission created first"""
+    return [jobs[index]["url"] for index in duplicate_key_indices(error)]
+
+def submitted_jobs(canonical: List[str], inserted: Dict, existing: Dict, failed: List[str]) -> List[Tuple[str, str, bool]]:
+    """[(url, job_id, created)] in submission order; requeued failed jobs count as created"""
+    return [
+        (url, inserted[url], True) if url in inserted else (url, existing[url], existing[url] in failed)
+        for url in canonical
+    ]
+
+def batch_membership(batch_id: str, jobs) -> List[UpdateOne]:
+    return [
+        UpdateOne({"batch_id": batch_id, "job_id": job_id}, {"$setOnInsert": {}}, upsert=True)
+        for _, job_id, _ in jobs
+    ]
+
+def requeue_failed(job_ids: List[str]) -> Tuple[Dict, Dict]:
+    """Filter and update putting failed jobs back in the queue"""
+    return (
+        {"id": {"$in": job_ids}, "status": "failed"},
+        {"$set": {"status": "queued", "error": None, "completed_at": None, "attempts": 0}},
+    )
+
+def rescrape(url: str) -> Tuple[Dict, Dict]:
+    """Filter and update putting a URL's finished (completed or failed) job back in the queue"""
+    return (
+        {"url": url, "status": {"$in": ["completed", "failed"]}},
+        {"$set": {"status": "queued", "error": None, "completed_at": None, "attempts": 0}},
+    )
+
+def requeued_deltas(count: int) -> Dict:
+    return {"jobs_failed": -count, "jobs_queued": count}
+
+def job_status_update(status: str, error: Optional[str], qa_count: Optional[int]) -> Dict:
+    finished = status in ["completed", "failed"]
+    update_data = {"status": status, "completed_at": datetime.now().isoformat() if finished else None}
+    if error:
+        update_data["error"] = error
+    if qa_count is not None:
+        update_data["qa_count"] = qa_count
+    if finished:
+        update_data.update(lease_owner=None, lease_expires_at=None)
+    return {"$set": update_data}
+
+def status_change_deltas(previous: Optional[Dict], status: str) -> Dict:
+    """Counter deltas for a job moving from `previous` (its document before the update) to `status`"""
+    if not previous or previous.get("status") == status:
+        return {}
+    return {f"jobs_{previous['status']}": -1, f"jobs_{status}": 1}
+
+def claim(owner: str, lease_seconds: int) -> Dict:
+    """find_one_and_update arguments leasing the oldest queued job"""
+    return {
+        "filter": {"status": "queued"},
+        "update": {
+            "$set": {"status": "processing", "lease_owner": owner, "lease_expires_at": lease_deadline(lease_seconds)},
+            "$inc": {"attempts": 1},
+        },
+        "sort": [("created_at", ASCENDING)],
+        "projection": {"id": 1, "url": 1, "_id": 0},
+    }
+
+def lease_renewal(owner: str, lease_seconds: int) -> Tuple[Dict, Dict]:
+    return (
+        {"status": "processing", "lease_owner": owner},
+        {"$set": {"lease_expires_at": lease_deadline(lease_seconds)}},
+    )
+
+def lease_recovery(max_attempts: int) -> Tuple[Tuple[Dict, Dict], Tuple[Dict, Dict]]:
+    """(filter, update) failing expired jobs out of attempts, then (filter, update) requeueing the rest"""
+    now = datetime.now().isoformat()
+    expired = expired_leases(now)
+    released = {"lease_owner": None, "lease_expires_at": None}
+    return (
+        ({**expired, "attempts": {"$gte": max_attempts}},
+         {"$set": {"status": "failed", "error": "Exceeded max attempts", "completed_at": now, **released}}),
+        (expired, {"$set": {"status": "queued", **released}}),
+    )
+
+def recovery_deltas(failed: int, requeued: int) -> Dict:
+    return {"jobs_processing": -(failed + requeued), "jobs_failed": failed, "jobs_queued": requeued}
+
+def counter_increments(deltas: Dict) -> List[UpdateOne]:
+    return [UpdateOne({"_id": name}, {"$inc": {"value": delta}}, upsert=True) for name, delta in deltas.items()]
+
+def counter_values(names: List[str], docs) -> Dict:
+    return {**dict.fromkeys(names, 0), **{doc["_id"]: doc["value"] for doc in docs}}
+
+def inserted_docs(docs: List[Dict], error: BulkWriteError) -> List[Dict]:
+    """Documents of an unordered insert_many that another job did not insert first"""
+    lost = duplicate_key_indices(error)
+    return [doc for index, doc in enumerate(docs) if index not in lost]
+
+def saved_pairs(docs: List[Dict]) -> List[Dict]:
+    return [{"question": doc["question"], "answer": doc["answer"]} for doc in docs]
+
+def job_results_query(job_id: str, after: Optional[List]) -> Dict:
+    query = {"job_id": job_id}
+    if after:
+        query["_id"] = {"$gt": cursor_id(after[0])}
+    return query
+
+def job_results_page(docs: List[Dict], limit: Optional[int], total: int) -> Dict:
+    return {
+        "total": total,
+        "next_cursor": [str(docs[-1]["_id"])] if docs and len(docs) == limit else None,
+        "qa_pairs": [qa_fields(doc) for doc in docs]
+    }
+
+def all_qa_query(after: Optional[List]) -> Dict:
+    return older_than(str(after[0]), cursor_id(after[1])) if after else {}
+
+def all_qa_page(docs: List[Dict], limit: int, offset: int, total: int) -> Dict:
+    return {
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+        "next_cursor": [docs[-1]["timestamp"], str(docs[-1]["_id"])] if docs and len(docs) == limit else None,
+        "qa_pairs": [qa_fields(doc) for doc in docs]
+    }
+
+def export_scope(since: Optional[str], source_url: Optional[str]) -> Tuple[Dict, Dict]:
+    """(filter every export query keeps, filter for the first batch)"""
+    scope = {"source_url": source_url} if source_url else {}
+    return scope, ({**scope, "timestamp": {"$gte": since}} if since else scope)
+
+def export_after(scope: Dict, docs: List[Dict]) -> Dict:
+    """Filter for the export batch following `docs`"""
+    return {**scope, **newer_than(docs[-1]["timestamp"], docs[-1]["_id"])}
+
+def exact_lookup(docs: Dict) -> Dict:
+    """Filter for stored questions matching any of `docs` ({question_norm: document}) exactly"""
+    return {"question_norm": {"$in": list(docs)}}
+
+def bucket_lookup(buckets: List[str]) -> Dict:
+    """Filter for stored questions sharing an LSH bucket"""
+    return {"lsh": {"$in": buckets}}
+
+class MongoDocuments:
+    """Q&A document building and near-duplicate scoring shared by MongoDB and database_motor.AsyncMongoDB"""
+
+    def __init__(self, similarity_threshold: float = SIMILARITY_THRESHOLD):
+        self.threshold = similarity_threshold
+        # Bucket keys embed the banding layout; documents indexed under another one are re-indexed
+        self.lsh_layout = "b{}r{}".format(*choose_bands(similarity_threshold))
+
+    def _lsh_fields(self, question: str) -> Dict:
+        return {"lsh": question_band_keys(question, self.threshold), "lsh_layout": self.lsh_layout}
+
+    def _qa_doc(self, job_id: str, url: str, qa: Dict, timestamp: str) -> Dict:
+        return {
+            "job_id": job_id,
+            "question": qa["question"],
+            "question_norm": normalize_question(qa["question"]),
+            "answer": qa["answer"],
+            "source_url": url,
+            "timestamp": timestamp,
+            **self._lsh_fields(qa["question"])
+        }
+
+    def _qa_docs(self, job_id: str, url: str, qa_pairs: List[Dict]) -> Dict:
+        """{question_norm: document}, first occurrence wins"""
+        timestamp = datetime.now().isoformat()
+        docs = {}
+        for qa in qa_pairs:
+            doc = self._qa_doc(job_id, url, qa, timestamp)
+            docs.setdefault(doc["question_norm"], doc)
+        return docs
+
+    def _similar(self, question: str, lsh: List[str], candidates) -> bool:
+        """True if a candidate sharing an LSH bucket is at least threshold-similar"""
+        buckets = set(lsh)
+        return any(
+            buckets.intersection(other["lsh"]) and calculate_similarity(question, other["question"]) >= self.threshold
+            for other in candidates
+        )
+
+    @staticmethod
+    def _candidates(docs: Dict, existing) -> Tuple[List[Dict], List[str]]:
+        """Documents whose question_norm is not in `existing`, and their LSH buckets"""
+        candidates = [doc for norm, doc in docs.items() if norm not in existing]
+        return candidates, list({key for doc in candidates for key in doc["lsh"]})
+
+    def _not_similar(self, candidates: List[Dict], stored: List[Dict]) -> List[Dict]:
+        """Candidates unlike the stored questions and the candidates kept before them"""
+        new_docs = []
+        for doc in candidates:
+            if not self._similar(doc["question"], doc["lsh"], stored + new_docs):
+                new_docs.append(doc)
+        return new_docs
+
+class MongoDB(MongoDocuments):
+    """
+    MongoDB database wrapper for persistent Q&A storage; implements the
+    storage.Storage interface used by the API (see database_motor.py for
+    the asyncio version)
+
+    The stats counters are best-effort: each write updates them in a
+    separate bulk_write after the write itself (no multi-document
+    transaction), so a crash in between leaves them off by that write.
+    Rebuild them periodically with `python database_mongo.py reconcile`
+    (reconcile_counters).
+    """
+
+    name = "MongoDB"
     
-    def __init__(self):
+    def __init__(self, similarity_threshold: float = SIMILARITY_THRESHOLD):
+        super().__init__(similarity_threshold)
         self.client = None
         self.db = None
+        self.reads = None
         self.jobs = None
         self.qa_pairs = None
+        self.counters = None
+        self.batch_jobs = None
         self._connect()
     
     def _connect(self):
@@ -26,16 +388,19 @@ class MongoDB:
             raise ValueError("MONGODB_URI environment variable not set")
         
         try:
-            self.client = MongoClient(MONGODB_URI, serverSelectionTimeoutMS=5000)
+            self.client = MongoClient(MONGODB_URI, **client_options())
             # Test connection
             self.client.admin.command('ping')
             print("✅ Connected to MongoDB Atlas")
             
             # Select database
             self.db = self.client[DATABASE_NAME]
+            self.reads = self.client.get_database(DATABASE_NAME, read_preference=read_preference())
             self.jobs = self.db.jobs
             self.qa_pairs = self.db.qa_pairs
-            
+            self.counters = self.db.counters
+            self.batch_jobs = self.db.batch_jobs
+
             # Create indexes
             self._create_indexes()
             
@@ -49,126 +414,290 @@ class MongoDB:
         self.jobs.create_index([("created_at", DESCENDING)])
         self.jobs.create_index([("status", ASCENDING)])
         self.jobs.create_index([("url", ASCENDING)], unique=True)
+        self.jobs.create_index([("id", ASCENDING)], unique=True)
+        # Durable queue: oldest queued job, expired leases
+        self.jobs.create_index([("status", ASCENDING), ("created_at", ASCENDING)])
+        self.jobs.create_index([("status", ASCENDING), ("lease_expires_at", ASCENDING)])
+        self.batch_jobs.create_index([("batch_id", ASCENDING), ("job_id", ASCENDING)], unique=True)
         
         # Q&A pairs indexes
         self.qa_pairs.create_index([("job_id", ASCENDING)])
         self.qa_pairs.create_index([("timestamp", DESCENDING)])
         self.qa_pairs.create_index([("question", ASCENDING)])
-        
+        # Keyset pagination: (timestamp, _id) for get_all_qa, (job_id, _id) for job results
+        self.qa_pairs.create_index([("timestamp", DESCENDING), ("_id", DESCENDING)])
+        self.qa_pairs.create_index([("job_id", ASCENDING), ("_id", ASCENDING)])
+        # Dedup key; partial so documents from before it existed don't collide on null
+        self.qa_pairs.create_index(
+            [("question_norm", ASCENDING)], unique=True,
+            partialFilterExpression={"question_norm": {"$exists": True}}
+        )
+        self._backfill_question_norm()
+        # Near-duplicate candidates: multikey index over LSH bucket keys
+        self.qa_pairs.create_index([("lsh", ASCENDING)])
+        self._backfill_lsh()
+        # Export of one article in (timestamp, _id) order
+        self.qa_pairs.create_index([("source_url", ASCENDING), ("timestamp", ASCENDING), ("_id", ASCENDING)])
+
+        # Seed the maintained counters once from full counts
+        if self.counters.count_documents({"_id": {"$in": list(STATS_COUNTERS)}}) < len(STATS_COUNTERS):
+            self.reconcile_counters()
+
         print("✅ Database indexes created")
+
+    def _backfill_question_norm(self):
+        """Set question_norm on older Q&A documents, removing exact duplicates (keeps the earliest)"""
+        removed = 0
+        for doc in self.qa_pairs.find({"question_norm": {"$exists": False}}, {"question": 1}).sort("_id", ASCENDING):
+            try:
+                self.qa_pairs.update_one(
+                    {"_id": doc["_id"]}, {"$set": {"question_norm": normalize_question(doc["question"])}}
+                )
+            except DuplicateKeyError:
+                self.qa_pairs.delete_one({"_id": doc["_id"]})
+                removed += 1
+        if removed:
+            print(f"🧹 Removed {removed} exact duplicate questions")
+            self.reconcile_counters()
+
+    def _backfill_lsh(self):
+        """(Re)compute LSH bucket keys of documents indexed under another layout (or none)"""
+        stale = self.qa_pairs.find({"lsh_layout": {"$ne": self.lsh_layout}}, {"question": 1})
+        updates = []
+        for doc in stale:
+            updates.append(UpdateOne({"_id": doc["_id"]}, {"$set": self._lsh_fields(doc["question"])}))
+            if len(updates) == 1000:
+                self.qa_pairs.bulk_write(updates, ordered=False)
+                updates = []
+        if updates:
+            self.qa_pairs.bulk_write(updates, ordered=False)
     
-    def create_job(self, job_id: str, url: str) -> Dict:
-        """Create a new scraping job"""
-        job = {
-            "id": job_id,
-            "url": url,
-            "status": "queued",
-            "qa_count": 0,
-            "error": None,
-            "created_at": datetime.now().isoformat(),
-            "completed_at": None
-        }
-        
+    def create_job(self, job_id: str, url: str) -> str:
+        """Queue a (re)scrape of the URL; returns the id of the job handling it"""
         try:
-            self.jobs.insert_one(job)
-            return job
+            self.jobs.insert_one(new_job(job_id, url, datetime.now().isoformat()))
+            self._inc({"jobs": 1, "jobs_queued": 1})
+            return job_id
         except DuplicateKeyError:
-            # URL already exists, return existing job
-            return self.jobs.find_one({"url": url})
+            # Job URLs are unique: the URL's job scrapes again unless it is still queued or processing
+            previous = self.jobs.find_one_and_update(*rescrape(url), projection={"id": 1, "status": 1, "_id": 0})
+            if previous:
+                self._inc(status_change_deltas(previous, "queued"))
+                return previous["id"]
+            return self.jobs.find_one({"url": url}, {"id": 1, "_id": 0})["id"]
+
+    def _requeue_failed(self, job_ids: List[str]) -> int:
+        """Put failed jobs back in the queue (job URLs are unique, so retries reuse the job)"""
+        requeued = self.jobs.update_many(*requeue_failed(job_ids)).modified_count
+        if requeued:
+            self._inc(requeued_deltas(requeued))
+        return requeued
+
+    def create_jobs(self, urls: List[str], batch_id: Optional[str] = None):
+        """
+        Queue jobs for many URLs with one lookup and one insert_many.
+
+        URLs are canonicalized and deduplicated like the SQLite backend; known
+        URLs reuse their job (failed ones are requeued). Returns
+        [(url, job_id, created)] in submission order
+        """
+        canonical, lookup = job_lookup(urls)
+        existing, failed = known_jobs(self.jobs.find(lookup, JOB_LOOKUP_PROJECTION).sort("created_at", ASCENDING))
+        if failed:
+            self._requeue_failed(failed)
+
+        jobs = new_jobs(canonical, existing)
+        inserted = {job["url"]: job["id"] for job in jobs}
+        if jobs:
+            try:
+                self.jobs.insert_many(jobs, ordered=False)
+            except BulkWriteError as e:
+                # A concurrent submission created some of these URLs first
+                lost = lost_urls(jobs, e)
+                for url in lost:
+                    del inserted[url]
+                for doc in self.jobs.find({"url": {"$in": lost}}, JOB_LOOKUP_PROJECTION):
+                    existing[doc["url"]] = doc["id"]
+            if inserted:
+                self._inc({"jobs": len(inserted), "jobs_queued": len(inserted)})
+
+        submitted = submitted_jobs(canonical, inserted, existing, failed)
+        if batch_id:
+            self.batch_jobs.bulk_write(batch_membership(batch_id, submitted), ordered=False)
+        return submitted
+
+    def batch_groups(self, batch_id: str) -> List[Dict]:
+        """Per-status job counts, Q&A totals and timestamps of a batch"""
+        return [batch_group(group) for group in self.reads.batch_jobs.aggregate(batch_groups_pipeline(batch_id))]
     
     def update_job_status(self, job_id: str, status: str, error: Optional[str] = None, qa_count: Optional[int] = None):
         """Update job status"""
-        update_data = {
-            "status": status,
-            "completed_at": datetime.now().isoformat() if status in ["completed", "failed"] else None
-        }
-        
-        if error:
-            update_data["error"] = error
-        if qa_count is not None:
-            update_data["qa_count"] = qa_count
-        
-        self.jobs.update_one(
-            {"id": job_id},
-            {"$set": update_data}
+        previous = self.jobs.find_one_and_update(
+            {"id": job_id}, job_status_update(status, error, qa_count), projection={"status": 1, "_id": 0}
         )
+        deltas = status_change_deltas(previous, status)
+        if deltas:
+            self._inc(deltas)
     
     def get_job(self, job_id: str) -> Optional[Dict]:
         """Get job by ID"""
-        return self.jobs.find_one({"id": job_id}, {"_id": 0})
+        return self.reads.jobs.find_one({"id": job_id}, {"_id": 0})
+
+    # Durable job queue (same lease protocol as the SQLite jobs table)
+    def claim_next_job(self, owner: str, lease_seconds: int):
+        """Atomically lease the oldest queued job -> (job_id, url) or None"""
+        job = self.jobs.find_one_and_update(**claim(owner, lease_seconds))
+        if job is None:
+            return None
+        self._inc(CLAIMED_DELTAS)
+        return job["id"], job["url"]
+
+    def renew_leases(self, owner: str, lease_seconds: int):
+        """Extend the leases of every job `owner` is working on"""
+        self.jobs.update_many(*lease_renewal(owner, lease_seconds))
+
+    def recover_expired_jobs(self, max_attempts: int) -> int:
+        """Requeue jobs whose lease ran out; fail those out of attempts"""
+        fail, requeue = lease_recovery(max_attempts)
+        failed = self.jobs.update_many(*fail).modified_count
+        requeued = self.jobs.update_many(*requeue).modified_count
+        if failed or requeued:
+            self._inc(recovery_deltas(failed, requeued))
+        return requeued
+
+    def count_queued_jobs(self) -> int:
+        return self.get_counter("jobs_queued")
+
+    # Q&A
+    def is_duplicate(self, question: str) -> bool:
+        """Exact match on question_norm, else score the LSH candidates"""
+        if self.qa_pairs.find_one({"question_norm": normalize_question(question)}, {"_id": 1}):
+            return True
+        lsh = question_band_keys(question, self.threshold)
+        if not lsh:
+            return False
+        return self._similar(question, lsh, self.qa_pairs.find(bucket_lookup(lsh), CANDIDATE_PROJECTION))
+
+    def save_qa_pair(self, job_id: str, url: str, qa: Dict) -> bool:
+        """Deduplicate and store one streamed Q&A pair; True if inserted"""
+        if self.is_duplicate(qa["question"]):
+            return False
+        try:
+            self.qa_pairs.insert_one(self._qa_doc(job_id, url, qa, datetime.now().isoformat()))
+        except DuplicateKeyError:
+            return False
+        self._inc({"qa_pairs": 1})
+        return True
     
-    def save_qa_pairs(self, job_id: str, url: str, qa_pairs: List[Dict]) -> int:
-        """Save Q&A pairs for a job"""
-        new_count = 0
-        
-        for qa in qa_pairs:
-            # Check for duplicate question
-            existing = self.qa_pairs.find_one({"question": qa["question"]})
-            if not existing:
-                qa_doc = {
-                    "job_id": job_id,
-                    "question": qa["question"],
-                    "answer": qa["answer"],
-                    "source_url": url,
-                    "timestamp": datetime.now().isoformat()
-                }
-                self.qa_pairs.insert_one(qa_doc)
-                new_count += 1
-        
+    def save_qa_pairs(self, job_id: str, url: str, qa_pairs: List[Dict]):
+        """
+        Save Q&A pairs for a job and complete it, in O(1) round trips: one $in
+        lookup on question_norm, one on the LSH buckets of the remaining
+        questions (near-duplicates are scored locally), then one unordered
+        insert_many. The unique index settles races with concurrent jobs (the
+        losing inserts are skipped). Returns (the job's total, including pairs
+        saved while streaming, the pairs inserted now)
+        """
+        docs = self._qa_docs(job_id, url, qa_pairs)
+        existing = {
+            doc["question_norm"] for doc in self.qa_pairs.find(exact_lookup(docs), {"question_norm": 1, "_id": 0})
+        } if docs else set()
+        candidates, buckets = self._candidates(docs, existing)
+        stored = list(self.qa_pairs.find(bucket_lookup(buckets), CANDIDATE_PROJECTION)) if buckets else []
+        new_docs = self._not_similar(candidates, stored)
+
+        inserted = []
+        if new_docs:
+            try:
+                self.qa_pairs.insert_many(new_docs, ordered=False)
+                inserted = new_docs
+            except BulkWriteError as e:
+                # Another job inserted some of these questions after the lookup
+                inserted = inserted_docs(new_docs, e)
+
+        if inserted:
+            self._inc({"qa_pairs": len(inserted)})
+
         # Update job with Q&A count
-        self.update_job_status(job_id, "completed", qa_count=new_count)
-        return new_count
+        qa_count = self.qa_pairs.count_documents({"job_id": job_id})
+        self.update_job_status(job_id, "completed", qa_count=qa_count)
+        return qa_count, saved_pairs(inserted)
     
-    def get_job_results(self, job_id: str) -> List[Dict]:
-        """Get Q&A results for a job"""
-        results = list(self.qa_pairs.find(
-            {"job_id": job_id},
-            {"_id": 0, "job_id": 0}
-        ))
-        return results
-    
-    def get_all_qa(self, limit: int = 50, offset: int = 0) -> Dict:
-        """Get all Q&A pairs with pagination"""
-        total = self.qa_pairs.count_documents({})
-        
-        qa_list = list(self.qa_pairs.find(
-            {},
-            {"_id": 0, "job_id": 0}
-        ).sort("timestamp", DESCENDING).skip(offset).limit(limit))
-        
-        return {
-            "total": total,
-            "limit": limit,
-            "offset": offset,
-            "qa_pairs": qa_list
-        }
+    def get_job_results(self, job_id: str, limit: Optional[int] = None, after: Optional[List] = None) -> Dict:
+        """Get Q&A results for a job; pass `after` (the previous page's `next_cursor`) to page"""
+        cursor = self.reads.qa_pairs.find(job_results_query(job_id, after), QA_PROJECTION).sort("_id", ASCENDING)
+        if limit is not None:
+            cursor = cursor.limit(limit)
+        docs = list(cursor)
+        return job_results_page(docs, limit, self.reads.qa_pairs.count_documents({"job_id": job_id}))
+
+    def get_all_qa(self, limit: int = 50, offset: int = 0, after: Optional[List] = None) -> Dict:
+        """
+        Get all Q&A pairs, newest first.
+
+        Pass `after` (the previous page's `next_cursor`, [timestamp, _id]) for
+        keyset pagination; `offset` is kept for compatibility but costs O(offset).
+        """
+        total = self.get_counter("qa_pairs")
+        cursor = self.reads.qa_pairs.find(all_qa_query(after), QA_PROJECTION).sort(NEWEST_FIRST)
+        if not after:
+            cursor = cursor.skip(offset)
+        return all_qa_page(list(cursor.limit(limit)), limit, offset, total)
+
+    def iter_qa_batches(self, since: Optional[str], source_url: Optional[str], batch_size: int):
+        """All Q&A pairs oldest first, batch_size at a time, by keyset on (timestamp, _id)"""
+        scope, query = export_scope(since, source_url)
+        while True:
+            docs = list(self.reads.qa_pairs.find(query, QA_PROJECTION).sort(OLDEST_FIRST).limit(batch_size))
+            if not docs:
+                return
+            yield [qa_fields(doc) for doc in docs]
+            query = export_after(scope, docs)
+
+    def get_counter(self, name: str) -> int:
+        """Read a maintained counter document (0 if missing)"""
+        doc = self.reads.counters.find_one({"_id": name})
+        return doc["value"] if doc else 0
+
+    def get_counters(self, names) -> Dict:
+        """Read several maintained counters in one query (0 for missing ones)"""
+        names = list(names)
+        return counter_values(names, self.reads.counters.find({"_id": {"$in": names}}))
+
+    def _inc(self, deltas: Dict):
+        """Apply counter deltas ({name: delta}) in one round trip"""
+        self.counters.bulk_write(counter_increments(deltas), ordered=False)
+
+    def reconcile_counters(self) -> Dict:
+        """
+        Rebuild every counter from full counts. Returns {name: (old, new)}
+        for counters that had drifted (e.g. after a crash between a write
+        and its counter update, or edits made outside this class)
+        """
+        old = {doc["_id"]: doc["value"] for doc in self.counters.find()}
+
+        new = dict.fromkeys(STATS_COUNTERS, 0)
+        new["qa_pairs"] = self.qa_pairs.count_documents({})
+        for group in self.jobs.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}]):
+            new["jobs"] += group["count"]
+            new[f"jobs_{group['_id']}"] = group["count"]
+        for name in old:
+            if name.startswith("jobs_"):
+                new.setdefault(name, 0)
+
+        self.counters.bulk_write([
+            UpdateOne({"_id": name}, {"$set": {"value": value}}, upsert=True)
+            for name, value in new.items()
+        ], ordered=False)
+        return {name: (old.get(name), value) for name, value in new.items() if old.get(name) != value}
     
     def get_stats(self) -> Dict:
-        """Get system statistics"""
-        total_qa = self.qa_pairs.count_documents({})
-        total_jobs = self.jobs.count_documents({})
-        completed_jobs = self.jobs.count_documents({"status": "completed"})
-        failed_jobs = self.jobs.count_documents({"status": "failed"})
-        
-        # Count unique URLs
-        unique_urls = len(self.jobs.distinct("url", {"status": "completed"}))
-        
-        success_rate = f"{(completed_jobs / total_jobs * 100):.1f}%" if total_jobs > 0 else "0%"
-        
-        return {
-            "total_qa_pairs": total_qa,
-            "total_jobs": total_jobs,
-            "completed_jobs": completed_jobs,
-            "failed_jobs": failed_jobs,
-            "unique_articles_processed": unique_urls,
-            "success_rate": success_rate,
-            "database_type": "MongoDB Atlas",
-            "persistent": True
-        }
+        """Get system statistics from the maintained counters (one query)"""
+        return stats_from_counters(self.get_counters(STATS_COUNTERS))
     
     def get_processed_urls(self) -> set:
         """Get all URLs that have been successfully processed"""
-        urls = self.jobs.distinct("url", {"status": "completed"})
+        urls = self.reads.jobs.distinct("url", {"status": "completed"})
         return set(urls)
     
     def cleanup_old_jobs(self, days: int = 30):
@@ -176,12 +705,14 @@ class MongoDB:
         from datetime import timedelta
         cutoff_date = (datetime.now() - timedelta(days=days)).isoformat()
         
-        result = self.jobs.delete_many({
-            "created_at": {"$lt": cutoff_date},
-            "status": {"$in": ["completed", "failed"]}
-        })
+        deleted = 0
+        for status in ("completed", "failed"):
+            result = self.jobs.delete_many({"created_at": {"$lt": cutoff_date}, "status": status})
+            if result.deleted_count:
+                self._inc({"jobs": -result.deleted_count, f"jobs_{status}": -result.deleted_count})
+            deleted += result.deleted_count
         
-        return result.deleted_count
+        return deleted
     
     def close(self):
         """Close MongoDB connection"""
@@ -204,7 +735,7 @@ def test_connection():
     try:
         db = get_mongo_db()
         stats = db.get_stats()
-        print(f"✅ MongoDB connection successful!")
+        print("✅ MongoDB connection successful!")
         print(f"   Database: {stats['database_type']}")
         print(f"   Q&A Pairs: {stats['total_qa_pairs']}")
         print(f"   Jobs: {stats['total_jobs']}")
@@ -214,6 +745,14 @@ def test_connection():
         return False
 
 if __name__ == "__main__":
-    # Test the connection
-    test_connection()
+    import sys
+    if sys.argv[1:] == ["reconcile"]:
+        # python database_mongo.py reconcile  -- rebuild the stats counters
+        drift = get_mongo_db().reconcile_counters()
+        for name, (old, new) in sorted(drift.items()):
+            print(f"🔧 {name}: {old} -> {new}")
+        print(f"✅ Counters reconciled ({len(drift)} corrected)")
+    else:
+        # Test the connection
+        test_connection()
 
@@ -0,0 +1,224 @@
+# database_motor.py
+# asyncio MongoDB storage (Motor) for the API, so Atlas round trips don't block the event loop
+from datetime import datetime
+from typing import Dict, List, Optional
+from database_sqlite import STATS_COUNTERS
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from database_mongo import (
+    CANDIDATE_PROJECTION, CLAIMED_DELTAS, DATABASE_NAME, JOB_LOOKUP_PROJECTION, MONGODB_URI, NEWEST_FIRST,
+    OLDEST_FIRST, QA_PROJECTION, MongoDB, MongoDocuments, all_qa_page, all_qa_query, batch_group,
+    batch_groups_pipeline, batch_membership, bucket_lookup, claim, client_options, counter_increments,
+    counter_values, exact_lookup, export_after, export_scope, inserted_docs, job_lookup, job_results_page,
+    job_results_query, job_status_update, known_jobs, lease_recovery, lease_renewal, lost_urls, new_job,
+    new_jobs, qa_fields, read_preference, recovery_deltas, requeue_failed, requeued_deltas, rescrape,
+    saved_pairs, stats_from_counters, status_change_deltas, submitted_jobs,
+)
+from qa_dedup import SIMILARITY_THRESHOLD, normalize_question, question_band_keys
+
+class AsyncMongoDB(MongoDocuments):
+    """
+    The storage.AsyncStorage interface on Motor: same documents, indexes and
+    counters as database_mongo.MongoDB, but every query is awaited, so
+    concurrent requests share the connection pool (MONGODB_MAX_POOL_SIZE)
+    instead of queueing for executor threads.
+
+    Index builds, backfills and counter seeding run once at construction
+    through the blocking MongoDB class, which owns them. The Motor client
+    binds to the first event loop that uses it. Stats counters are
+    best-effort, as in MongoDB (reconcile them periodically).
+    """
+
+    name = "MongoDB"
+
+    def __init__(self, similarity_threshold: float = SIMILARITY_THRESHOLD):
+        super().__init__(similarity_threshold)
+        if not MONGODB_URI:
+            raise ValueError("MONGODB_URI environment variable not set")
+        MongoDB(similarity_threshold).client.close()
+
+        self.client = AsyncIOMotorClient(MONGODB_URI, **client_options())
+        self.db = self.client[DATABASE_NAME]
+        self.reads = self.client.get_database(DATABASE_NAME, read_preference=read_preference())
+        self.jobs = self.db.jobs
+        self.qa_pairs = self.db.qa_pairs
+        self.counters = self.db.counters
+        self.batch_jobs = self.db.batch_jobs
+        print(f"⚡ Motor client ready (pool {client_options()['maxPoolSize']})")
+
+    # Jobs
+    async def create_job(self, job_id: str, url: str) -> str:
+        """Queue a (re)scrape of the URL; returns the id of the job handling it"""
+        try:
+            await self.jobs.insert_one(new_job(job_id, url, datetime.now().isoformat()))
+            await self._inc({"jobs": 1, "jobs_queued": 1})
+            return job_id
+        except DuplicateKeyError:
+            # Job URLs are unique: the URL's job scrapes again unless it is still queued or processing
+            previous = await self.jobs.find_one_and_update(*rescrape(url), projection={"id": 1, "status": 1, "_id": 0})
+            if previous:
+                await self._inc(status_change_deltas(previous, "queued"))
+                return previous["id"]
+            return (await self.jobs.find_one({"url": url}, {"id": 1, "_id": 0}))["id"]
+
+    async def _requeue_failed(self, job_ids: List[str]) -> int:
+        requeued = (await self.jobs.update_many(*requeue_failed(job_ids))).modified_count
+        if requeued:
+            await self._inc(requeued_deltas(requeued))
+        return requeued
+
+    async def create_jobs(self, urls: List[str], batch_id: Optional[str] = None):
+        """Queue jobs for many URLs with one lookup and one insert_many (see MongoDB.create_jobs)"""
+        canonical, lookup = job_lookup(urls)
+        existing, failed = known_jobs(
+            await self.jobs.find(lookup, JOB_LOOKUP_PROJECTION).sort("created_at", ASCENDING).to_list(None)
+        )
+        if failed:
+            await self._requeue_failed(failed)
+
+        jobs = new_jobs(canonical, existing)
+        inserted = {job["url"]: job["id"] for job in jobs}
+        if jobs:
+            try:
+                await self.jobs.insert_many(jobs, ordered=False)
+            except BulkWriteError as e:
+                # A concurrent submission created some of these URLs first
+                lost = lost_urls(jobs, e)
+                for url in lost:
+                    del inserted[url]
+                async for doc in self.jobs.find({"url": {"$in": lost}}, JOB_LOOKUP_PROJECTION):
+                    existing[doc["url"]] = doc["id"]
+            if inserted:
+                await self._inc({"jobs": len(inserted), "jobs_queued": len(inserted)})
+
+        submitted = submitted_jobs(canonical, inserted, existing, failed)
+        if batch_id:
+            await self.batch_jobs.bulk_write(batch_membership(batch_id, submitted), ordered=False)
+        return submitted
+
+    async def get_job(self, job_id: str) -> Optional[Dict]:
+        return await self.reads.jobs.find_one({"id": job_id}, {"_id": 0})
+
+    async def update_job_status(self, job_id: str, status: str, error: Optional[str] = None,
+                                qa_count: Optional[int] = None):
+        previous = await self.jobs.find_one_and_update(
+            {"id": job_id}, job_status_update(status, error, qa_count), projection={"status": 1, "_id": 0}
+        )
+        deltas = status_change_deltas(previous, status)
+        if deltas:
+            await self._inc(deltas)
+
+    async def batch_groups(self, batch_id: str) -> List[Dict]:
+        groups = await self.reads.batch_jobs.aggregate(batch_groups_pipeline(batch_id)).to_list(None)
+        return [batch_group(group) for group in groups]
+
+    # Durable job queue (same lease protocol as the SQLite jobs table)
+    async def claim_next_job(self, owner: str, lease_seconds: int):
+        job = await self.jobs.find_one_and_update(**claim(owner, lease_seconds))
+        if job is None:
+            return None
+        await self._inc(CLAIMED_DELTAS)
+        return job["id"], job["url"]
+
+    async def renew_leases(self, owner: str, lease_seconds: int):
+        await self.jobs.update_many(*lease_renewal(owner, lease_seconds))
+
+    async def recover_expired_jobs(self, max_attempts: int) -> int:
+        fail, requeue = lease_recovery(max_attempts)
+        failed = (await self.jobs.update_many(*fail)).modified_count
+        requeued = (await self.jobs.update_many(*requeue)).modified_count
+        if failed or requeued:
+            await self._inc(recovery_deltas(failed, requeued))
+        return requeued
+
+    async def count_queued_jobs(self) -> int:
+        return (await self.get_counters(["jobs_queued"]))["jobs_queued"]
+
+    # Q&A
+    async def is_duplicate(self, question: str) -> bool:
+        if await self.qa_pairs.find_one({"question_norm": normalize_question(question)}, {"_id": 1}):
+            return True
+        lsh = question_band_keys(question, self.threshold)
+        if not lsh:
+            return False
+        candidates = await self.qa_pairs.find(bucket_lookup(lsh), CANDIDATE_PROJECTION).to_list(None)
+        return self._similar(question, lsh, candidates)
+
+    async def save_qa_pair(self, job_id: str, url: str, qa: Dict) -> bool:
+        if await self.is_duplicate(qa["question"]):
+            return False
+        try:
+            await self.qa_pairs.insert_one(self._qa_doc(job_id, url, qa, datetime.now().isoformat()))
+        except DuplicateKeyError:
+            return False
+        await self._inc({"qa_pairs": 1})
+        return True
+
+    async def save_qa_pairs(self, job_id: str, url: str, qa_pairs: List[Dict]):
+        """Same round trips as MongoDB.save_qa_pairs: two lookups, one insert_many"""
+        docs = self._qa_docs(job_id, url, qa_pairs)
+        existing = {
+            doc["question_norm"] async for doc in self.qa_pairs.find(exact_lookup(docs), {"question_norm": 1, "_id": 0})
+        } if docs else set()
+        candidates, buckets = self._candidates(docs, existing)
+        stored = await self.qa_pairs.find(bucket_lookup(buckets), CANDIDATE_PROJECTION).to_list(None) if buckets else []
+        new_docs = self._not_similar(candidates, stored)
+
+        inserted = []
+        if new_docs:
+            try:
+                await self.qa_pairs.insert_many(new_docs, ordered=False)
+                inserted = new_docs
+            except BulkWriteError as e:
+                # Another job inserted some of these questions after the lookup
+                inserted = inserted_docs(new_docs, e)
+
+        if inserted:
+            await self._inc({"qa_pairs": len(inserted)})
+
+        qa_count = await self.qa_pairs.count_documents({"job_id": job_id})
+        await self.update_job_status(job_id, "completed", qa_count=qa_count)
+        return qa_count, saved_pairs(inserted)
+
+    async def get_job_results(self, job_id: str, limit: Optional[int] = None, after: Optional[List] = None) -> Dict:
+        cursor = self.reads.qa_pairs.find(job_results_query(job_id, after), QA_PROJECTION).sort("_id", ASCENDING)
+        if limit is not None:
+            cursor = cursor.limit(limit)
+        docs = await cursor.to_list(None)
+        return job_results_page(docs, limit, await self.reads.qa_pairs.count_documents({"job_id": job_id}))
+
+    async def get_all_qa(self, limit: int = 50, offset: int = 0, after: Optional[List] = None) -> Dict:
+        total = (await self.get_counters(["qa_pairs"]))["qa_pairs"]
+        cursor = self.reads.qa_pairs.find(all_qa_query(after), QA_PROJECTION).sort(NEWEST_FIRST)
+        if not after:
+            cursor = cursor.skip(offset)
+        return all_qa_page(await cursor.limit(limit).to_list(None), limit, offset, total)
+
+    async def iter_qa_batches(self, since: Optional[str], source_url: Optional[str], batch_size: int):
+        """All Q&A pairs oldest first, batch_size at a time, by keyset on (timestamp, _id)"""
+        scope, query = export_scope(since, source_url)
+        while True:
+            docs = await self.reads.qa_pairs.find(query, QA_PROJECTION).sort(OLDEST_FIRST).limit(batch_size).to_list(None)
+            if not docs:
+                return
+            yield [qa_fields(doc) for doc in docs]
+            query = export_after(scope, docs)
+
+    # Counters and stats
+    async def get_counters(self, names) -> Dict:
+        names = list(names)
+        return counter_values(names, await self.reads.counters.find({"_id": {"$in": names}}).to_list(None))
+
+    async def _inc(self, deltas: Dict):
+        await self.counters.bulk_write(counter_increments(deltas), ordered=False)
+
+    async def get_stats(self) -> Dict:
+        return stats_from_counters(await self.get_counters(STATS_COUNTERS))
+
+    async def get_processed_urls(self) -> set:
+        return set(await self.reads.jobs.distinct("url", {"status": "completed"}))
+
+    def close(self):
+        self.client.close()
+        print("✅ MongoDB connection closed")
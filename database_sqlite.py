@@ -0,0 +1,408 @@
+# database_sqlite.py
+# Pooled SQLite access layer: WAL journaling, one writer, many readers
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from qa_dedup import normalize_question
+
+# SQLite Configuration
+DATABASE_PATH = os.getenv("DATABASE_PATH", "scraper.db")
+SQLITE_READERS = int(os.getenv("SQLITE_READERS", "8"))
+SQLITE_CACHE_KB = int(os.getenv("SQLITE_CACHE_KB", "16384"))
+SQLITE_MMAP_BYTES = int(os.getenv("SQLITE_MMAP_BYTES", str(256 * 1024 * 1024)))
+SQLITE_STATEMENT_CACHE = 256
+
+class SQLitePool:
+    """
+    Connection pool for one SQLite database file.
+
+    In WAL mode readers never block the writer (or each other), so reads get
+    their own pooled connections while all writes share one connection behind
+    a lock. Connections are long-lived, which lets sqlite3's per-connection
+    statement cache reuse prepared statements across requests.
+    """
+
+    def __init__(self, path: str = DATABASE_PATH, readers: int = SQLITE_READERS):
+        self.path = path
+        self.max_readers = readers
+        self._readers = queue.LifoQueue()
+        self._reader_count = 0
+        self._reader_lock = threading.Lock()
+        self._writer = None
+        self._write_lock = threading.Lock()
+        self.stats = {"reads": 0, "writes": 0, "reader_waits": 0}
+
+    def _connect(self, readonly: bool) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            timeout=30,
+            check_same_thread=False,  # pooled connections move between threads
+            cached_statements=SQLITE_STATEMENT_CACHE,
+        )
+        conn.row_factory = sqlite3.Row
+        if not readonly:
+            # Persistent setting, stored in the database file
+            conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_KB}")
+        conn.execute(f"PRAGMA mmap_size={SQLITE_MMAP_BYTES}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA busy_timeout=30000")
+        if readonly:
+            conn.execute("PRAGMA query_only=ON")
+        return conn
+
+    @contextmanager
+    def writer(self):
+        """The single write connection; commits on success, rolls back on error"""
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = self._connect(readonly=False)
+            conn = self._writer
+            self.stats["writes"] += 1
+            try:
+                yield conn
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+
+    @contextmanager
+    def reader(self):
+        """A pooled read-only connection (waits if all readers are busy)"""
+        conn = None
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            with self._reader_lock:
+                if self._reader_count < self.max_readers:
+                    self._reader_count += 1
+                    conn = self._connect(readonly=True)
+            if conn is None:
+                self.stats["reader_waits"] += 1
+                conn = self._readers.get()
+        self.stats["reads"] += 1
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._readers.put(conn)
+
+    def close(self):
+        """Close every pooled connection"""
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        while True:
+            try:
+                self._readers.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._reader_lock:
+            self._reader_count = 0
+
+# Schema migrations. Each entry upgrades the schema by one version; the
+# current version is stored in PRAGMA user_version and pending migrations
+# run automatically at startup (see migrate)
+def _migration_base_schema(conn):
+    """Jobs and Q&A tables, durable-queue lease columns, LSH dedup index"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            url TEXT NOT NULL,
+            status TEXT NOT NULL,
+            qa_count INTEGER DEFAULT 0,
+            error TEXT,
+            created_at TEXT NOT NULL,
+            completed_at TEXT
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS qa_pairs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_id TEXT NOT NULL,
+            question TEXT NOT NULL,
+            answer TEXT NOT NULL,
+            source_url TEXT NOT NULL,
+            timestamp TEXT NOT NULL
+        )
+    ''')
+
+    # Databases created before versioning may already have some of these
+    job_columns = {row[1] for row in conn.execute('PRAGMA table_info(jobs)')}
+    for column, definition in (
+        ('attempts', 'INTEGER NOT NULL DEFAULT 0'),
+        ('lease_owner', 'TEXT'),
+        ('lease_expires_at', 'TEXT'),
+    ):
+        if column not in job_columns:
+            conn.execute(f'ALTER TABLE jobs ADD COLUMN {column} {definition}')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs (status, created_at)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status_lease ON jobs (status, lease_expires_at)')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS qa_lsh (
+            band_key TEXT NOT NULL,
+            qa_id INTEGER NOT NULL
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_qa_lsh_band_key ON qa_lsh (band_key, qa_id)')
+    conn.execute('DROP TABLE IF EXISTS qa_tokens')
+    conn.execute('DROP TABLE IF EXISTS qa_token_df')
+
+def _migration_query_indexes(conn):
+    """Indexes for job results, Q&A listing, processed URLs and stats"""
+    # /api/jobs/{id}/results
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_qa_pairs_job_id ON qa_pairs (job_id)')
+    # /api/qa ordered by timestamp (id breaks ties)
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_qa_pairs_timestamp ON qa_pairs (timestamp, id)')
+    # get_processed_urls and /api/stats: covers status counts and DISTINCT url
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status_url ON jobs (status, url)')
+    # LSH backfill and cleanup look rows up by question id
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_qa_lsh_qa_id ON qa_lsh (qa_id)')
+
+def _migration_question_norm(conn):
+    """Normalized question column with a unique index (exact duplicates removed)"""
+    conn.execute('ALTER TABLE qa_pairs ADD COLUMN question_norm TEXT')
+    seen = set()
+    duplicate_ids = []
+    affected_jobs = set()
+    rows = conn.execute('SELECT id, job_id, question FROM qa_pairs ORDER BY id').fetchall()
+    for qa_id, job_id, question in rows:
+        norm = normalize_question(question)
+        if norm in seen:
+            duplicate_ids.append((qa_id,))
+            affected_jobs.add(job_id)
+            continue
+        seen.add(norm)
+        conn.execute('UPDATE qa_pairs SET question_norm = ? WHERE id = ?', (norm, qa_id))
+
+    # Keep the earliest copy of each exact duplicate, and recount the jobs that lost one
+    conn.executemany('DELETE FROM qa_lsh WHERE qa_id = ?', duplicate_ids)
+    conn.executemany('DELETE FROM qa_pairs WHERE id = ?', duplicate_ids)
+    conn.executemany(
+        'UPDATE jobs SET qa_count = (SELECT COUNT(*) FROM qa_pairs WHERE job_id = jobs.id) WHERE id = ?',
+        [(job_id,) for job_id in sorted(affected_jobs)]
+    )
+    if duplicate_ids:
+        print(f"🧹 Removed {len(duplicate_ids)} exact duplicate questions, recounted Q&A of {len(affected_jobs)} jobs")
+
+    conn.execute('CREATE UNIQUE INDEX idx_qa_pairs_question_norm ON qa_pairs (question_norm)')
+
+def _migration_counters(conn):
+    """Counters table with trigger-maintained Q&A total"""
+    conn.execute('''
+        CREATE TABLE counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    conn.execute("INSERT INTO counters (name, value) SELECT 'qa_pairs', COUNT(*) FROM qa_pairs")
+    conn.execute('''
+        CREATE TRIGGER trg_qa_pairs_count_insert AFTER INSERT ON qa_pairs
+        BEGIN
+            UPDATE counters SET value = value + 1 WHERE name = 'qa_pairs';
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER trg_qa_pairs_count_delete AFTER DELETE ON qa_pairs
+        BEGIN
+            UPDATE counters SET value = value - 1 WHERE name = 'qa_pairs';
+        END
+    ''')
+
+def _migration_export_indexes(conn):
+    """Index for exporting one article's Q&A in (timestamp, id) order"""
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_qa_pairs_source_url ON qa_pairs (source_url, timestamp, id)')
+
+def _migration_job_batches(conn):
+    """Batch membership table and a job URL index for bulk submission"""
+    conn.execute('''
+        CREATE TABLE batch_jobs (
+            batch_id TEXT NOT NULL,
+            job_id TEXT NOT NULL,
+            PRIMARY KEY (batch_id, job_id)
+        ) WITHOUT ROWID
+    ''')
+    # Dedup of submitted URLs against existing jobs
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_url ON jobs (url)')
+
+def _migration_stats_counters(conn):
+    """Trigger-maintained job counters and completed-URL set for /api/stats"""
+    # Reference count of completed jobs per URL: its size is the number of
+    # unique articles processed, without a COUNT(DISTINCT url) scan
+    conn.execute('''
+        CREATE TABLE completed_urls (
+            url TEXT PRIMARY KEY,
+            jobs INTEGER NOT NULL
+        ) WITHOUT ROWID
+    ''')
+
+    # jobs and jobs_<status>
+    conn.execute('''
+        CREATE TRIGGER trg_jobs_count_insert AFTER INSERT ON jobs
+        BEGIN
+            UPDATE counters SET value = value + 1 WHERE name = 'jobs';
+            INSERT INTO counters (name, value) VALUES ('jobs_' || NEW.status, 1)
+                ON CONFLICT (name) DO UPDATE SET value = value + 1;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER trg_jobs_count_status AFTER UPDATE OF status ON jobs
+        WHEN OLD.status != NEW.status
+        BEGIN
+            UPDATE counters SET value = value - 1 WHERE name = 'jobs_' || OLD.status;
+            INSERT INTO counters (name, value) VALUES ('jobs_' || NEW.status, 1)
+                ON CONFLICT (name) DO UPDATE SET value = value + 1;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER trg_jobs_count_delete AFTER DELETE ON jobs
+        BEGIN
+            UPDATE counters SET value = value - 1 WHERE name IN ('jobs', 'jobs_' || OLD.status);
+        END
+    ''')
+
+    # completed_urls follows jobs entering and leaving 'completed'
+    for event, condition in (
+        ('INSERT', "NEW.status = 'completed'"),
+        ('UPDATE OF status', "NEW.status = 'completed' AND OLD.status != 'completed'"),
+    ):
+        name = 'insert' if event == 'INSERT' else 'complete'
+        conn.execute(f'''
+            CREATE TRIGGER trg_completed_urls_{name} AFTER {event} ON jobs
+            WHEN {condition}
+            BEGIN
+                INSERT INTO completed_urls (url, jobs) VALUES (NEW.url, 1)
+                    ON CONFLICT (url) DO UPDATE SET jobs = jobs + 1;
+            END
+        ''')
+    for event, condition in (
+        ('UPDATE OF status', "OLD.status = 'completed' AND NEW.status != 'completed'"),
+        ('DELETE', "OLD.status = 'completed'"),
+    ):
+        name = 'reopen' if event.startswith('UPDATE') else 'delete'
+        conn.execute(f'''
+            CREATE TRIGGER trg_completed_urls_{name} AFTER {event} ON jobs
+            WHEN {condition}
+            BEGIN
+                UPDATE completed_urls SET jobs = jobs - 1 WHERE url = OLD.url;
+                DELETE FROM completed_urls WHERE url = OLD.url AND jobs <= 0;
+            END
+        ''')
+
+    # unique_urls
+    conn.execute('''
+        CREATE TRIGGER trg_unique_urls_insert AFTER INSERT ON completed_urls
+        BEGIN
+            UPDATE counters SET value = value + 1 WHERE name = 'unique_urls';
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER trg_unique_urls_delete AFTER DELETE ON completed_urls
+        BEGIN
+            UPDATE counters SET value = value - 1 WHERE name = 'unique_urls';
+        END
+    ''')
+
+    reconcile_counters(conn)
+
+MIGRATIONS = [
+    _migration_base_schema,
+    _migration_query_indexes,
+    _migration_question_norm,
+    _migration_counters,
+    _migration_export_indexes,
+    _migration_job_batches,
+    _migration_stats_counters,
+]
+
+# Counters shown by /api/stats (jobs_<status> exists for every status seen)
+STATS_COUNTERS = (
+    'qa_pairs', 'jobs', 'jobs_queued', 'jobs_processing', 'jobs_completed', 'jobs_failed', 'unique_urls'
+)
+
+def get_counter(conn, name: str) -> int:
+    """Read a maintained counter (0 if it does not exist)"""
+    row = conn.execute('SELECT value FROM counters WHERE name = ?', (name,)).fetchone()
+    return row[0] if row else 0
+
+def get_counters(conn, names) -> dict:
+    """Read several maintained counters in one query (0 for missing ones)"""
+    names = list(names)
+    rows = conn.execute(
+        f"SELECT name, value FROM counters WHERE name IN ({','.join('?' * len(names))})", names
+    ).fetchall()
+    return {**dict.fromkeys(names, 0), **{row[0]: row[1] for row in rows}}
+
+def reconcile_counters(conn) -> dict:
+    """
+    Rebuild completed_urls and every counter from the base tables, in the
+    caller's transaction. Returns {name: (old, new)} for counters that had
+    drifted (e.g. after rows were edited with triggers dropped)
+    """
+    old = dict(conn.execute('SELECT name, value FROM counters').fetchall())
+
+    conn.execute('DELETE FROM completed_urls')
+    conn.execute('''
+        INSERT INTO completed_urls (url, jobs)
+        SELECT url, COUNT(*) FROM jobs WHERE status = 'completed' GROUP BY url
+    ''')
+
+    new = dict.fromkeys(STATS_COUNTERS, 0)
+    new['qa_pairs'] = conn.execute('SELECT COUNT(*) FROM qa_pairs').fetchone()[0]
+    for status, count in conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status'):
+        new['jobs'] += count
+        new[f'jobs_{status}'] = count
+    new['unique_urls'] = conn.execute('SELECT COUNT(*) FROM completed_urls').fetchone()[0]
+    for name in old:
+        if name.startswith('jobs_'):
+            new.setdefault(name, 0)
+
+    conn.executemany('''
+        INSERT INTO counters (name, value) VALUES (?, ?)
+        ON CONFLICT (name) DO UPDATE SET value = excluded.value
+    ''', new.items())
+    return {name: (old.get(name), value) for name, value in new.items() if old.get(name) != value}
+
+def migrate(conn) -> int:
+    """Apply pending migrations, each in its own transaction; returns the schema version"""
+    if conn.in_transaction:
+        conn.commit()
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    for target, migration in enumerate(MIGRATIONS, start=1):
+        if target <= version:
+            continue
+        conn.execute('BEGIN')
+        try:
+            migration(conn)
+            conn.execute(f'PRAGMA user_version = {target}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        print(f"🛠️  Database migrated to schema v{target}: {migration.__doc__}")
+        version = target
+    return version
+
+if __name__ == "__main__":
+    # python database_sqlite.py reconcile  -- rebuild the stats counters
+    import sys
+    if sys.argv[1:] != ['reconcile']:
+        print("Usage: python database_sqlite.py reconcile")
+        sys.exit(2)
+
+    pool = SQLitePool(DATABASE_PATH, readers=1)
+    with pool.writer() as conn:
+        migrate(conn)
+        conn.execute('BEGIN IMMEDIATE')  # consistent with a running API
+        drift = reconcile_counters(conn)
+    pool.close()
+
+    for name, (old, new) in sorted(drift.items()):
+        print(f"🔧 {name}: {old} -> {new}")
+    print(f"✅ Counters reconciled ({len(drift)} corrected) in {DATABASE_PATH}")
@@ -2,56 +2,26 @@
 # deduplicate_questions.py
 # Remove similar/duplicate questions using AI and fuzzy matching
 
+import os
 import pandas as pd
-from groq import Groq
+from clients import clients
 from pathlib import Path
 import re
+from qa_dedup import LSHIndex, normalize_question
+from rate_limit import acquire_for_prompt
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY", "your-groq-api-key-here")
-
-def normalize_question(q):
-    """Normalize question for basic comparison"""
-    q = q.lower().strip()
-    # Remove punctuation
-    q = re.sub(r'[^\w\s]', '', q)
-    # Remove extra whitespace
-    q = ' '.join(q.split())
-    return q
-
-def simple_similarity(q1, q2):
-    """Quick similarity check (0-1)"""
-    q1_norm = normalize_question(q1)
-    q2_norm = normalize_question(q2)
-    
-    # Exact match
-    if q1_norm == q2_norm:
-        return 1.0
-    
-    # Word overlap
-    words1 = set(q1_norm.split())
-    words2 = set(q2_norm.split())
-    
-    if not words1 or not words2:
-        return 0.0
-    
-    intersection = words1.intersection(words2)
-    union = words1.union(words2)
-    
-    return len(intersection) / len(union)
+GROQ_MAX_TOKENS = 500  # completion budget, also reserved from the rate limit
 
 def ai_similarity_batch(questions, threshold=0.8):
     """Use AI to find similar questions in batch"""
-    client = Groq(api_key=GROQ_API_KEY)
+    client = clients.groq(GROQ_API_KEY)
     
     # Format questions for AI
     q_list = '\n'.join([f"{i+1}. {q}" for i, q in enumerate(questions)])
     
     try:
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[{
-                "role": "user",
-                "content": f"""Analyze these iOS interview questions and identify which ones are DUPLICATES or VERY SIMILAR in meaning.
+        prompt = f"""Analyze these iOS interview questions and identify which ones are DUPLICATES or VERY SIMILAR in meaning.
 
 Questions:
 {q_list}
@@ -63,9 +33,12 @@ Similar: 3, 7 (both ask about ARC)
 Only return pairs that ask essentially the same thing. If no duplicates, return "NO_DUPLICATES".
 
 Similar pairs:"""
-            }],
+        acquire_for_prompt('groq', prompt, GROQ_MAX_TOKENS)
+        response = client.chat.completions.create(
+            model="llama-3.3-70b-versatile",
+            messages=[{"role": "user", "content": prompt}],
             temperature=0,
-            max_tokens=500
+            max_tokens=GROQ_MAX_TOKENS
         )
         
         result = response.choices[0].message.content.strip()
@@ -117,19 +90,18 @@ def deduplicate_qa_data(input_file, output_file=None, similarity_threshold=0.7):
     to_remove = set()
     similar_found = 0
     
-    for i in range(len(questions)):
-        if i in to_remove:
-            continue
-        for j in range(i + 1, len(questions)):
-            if j in to_remove:
-                continue
-            
-            similarity = simple_similarity(questions[i], questions[j])
-            if similarity >= similarity_threshold:
-                # Keep the first one, mark second for removal
-                to_remove.add(j)
-                similar_found += 1
-                print(f"  Similar ({similarity:.2f}): '{questions[i][:50]}...' ≈ '{questions[j][:50]}...'")
+    kept_index = LSHIndex(similarity_threshold)
+    
+    for j, question in enumerate(questions):
+        # Only questions sharing an LSH bucket with a kept question get scored
+        i, similar_q, similarity = kept_index.find_duplicate(question)
+        if i is not None:
+            # Keep the first one, mark second for removal
+            to_remove.add(j)
+            similar_found += 1
+            print(f"  Similar ({similarity:.2f}): '{similar_q[:50]}...' ≈ '{question[:50]}...'")
+        else:
+            kept_index.add(j, question)
     
     print(f"  ✓ Found {similar_found} similar pairs (word overlap)")
     print()
@@ -150,7 +122,7 @@ def deduplicate_qa_data(input_file, output_file=None, similarity_threshold=0.7):
                         original_idx = questions.index(remaining_questions[pair[1]])
                         to_remove.add(original_idx)
             else:
-                print(f"  ✓ No additional similar questions found by AI")
+                print("  ✓ No additional similar questions found by AI")
         print()
     else:
         print("Step 3: Skipping AI check (dataset too large, use word overlap only)")
@@ -177,7 +149,7 @@ def deduplicate_qa_data(input_file, output_file=None, similarity_threshold=0.7):
     print(f"Final unique questions: {len(df_final)}")
     print(f"Reduction:              {((len(df) - len(df_final)) / len(df) * 100):.1f}%")
     print()
-    print(f"💾 Saved to:")
+    print("💾 Saved to:")
     print(f"   - {output_file}")
     print(f"   - {output_file.replace('.csv', '.json')}")
     print("="*70)
@@ -1,98 +1,60 @@
 # firecrawl_simple.py
 # Simple approach: Just paste Medium URLs and let Firecrawl + AI do the work
-import re
 from datetime import datetime
 import pandas as pd
-from groq import Groq
-from firecrawl import FirecrawlApp
+from clients import clients
+from qa_dedup import QACollection, is_duplicate
+from scrape_cache import ScrapeCache
+from rate_limit import acquire_for_prompt, get_limiter
+from qa_extract import extract_chunked, parse_qa_pairs
 
 # Configuration
 import os
 GROQ_API_KEY = os.getenv("GROQ_API_KEY", "your-groq-api-key-here")
+GROQ_MAX_TOKENS = 2500  # completion budget, also reserved from the rate limit
 FIRECRAWL_API_KEY = os.getenv("FIRECRAWL_API_KEY", "your-firecrawl-api-key-here")
 SIMILARITY_THRESHOLD = 0.7
 
-def normalize_question(q):
-    q = q.lower().strip()
-    q = re.sub(r'[^\w\s]', '', q)
-    q = ' '.join(q.split())
-    return q
+scrape_cache = ScrapeCache()
 
-def calculate_similarity(q1, q2):
-    q1_norm = normalize_question(q1)
-    q2_norm = normalize_question(q2)
+def scrape_with_firecrawl(url, stats):
+    """Scrape article markdown with Firecrawl and cache it (None on failure)"""
+    print(f"   🔥 Scraping with Firecrawl...")
+    get_limiter('firecrawl').acquire()
+    app = clients.firecrawl(FIRECRAWL_API_KEY)
+    result = app.scrape(url, formats=['markdown'])
     
-    if q1_norm == q2_norm:
-        return 1.0
-    
-    words1 = set(q1_norm.split())
-    words2 = set(q2_norm.split())
-    
-    if not words1 or not words2:
-        return 0.0
+    if not result:
+        print(f"   ❌ Firecrawl failed - no content returned")
+        stats["firecrawl_errors"] += 1
+        return None
     
-    intersection = words1.intersection(words2)
-    union = words1.union(words2)
+    # Get content from Document object or dict
+    content = None
+    if hasattr(result, 'markdown'):
+        content = result.markdown
+    elif hasattr(result, 'content'):
+        content = result.content
+    elif isinstance(result, dict):
+        if 'markdown' in result:
+            content = result['markdown']
+        elif 'content' in result:
+            content = result['content']
+    elif isinstance(result, str):
+        content = result
     
-    return len(intersection) / len(union)
-
-def is_duplicate(new_question, existing_questions, threshold=SIMILARITY_THRESHOLD):
-    for existing in existing_questions:
-        similarity = calculate_similarity(new_question, existing['question'])
-        if similarity >= threshold:
-            return True, existing['question'], similarity
-    return False, None, 0.0
+    if not content:
+        print(f"   ❌ Could not extract content from result (type: {type(result)})")
+        stats["firecrawl_errors"] += 1
+        return None
+    stats["firecrawl_success"] += 1
+    print(f"   ✅ Scraped! ({len(content)} chars)")
+    scrape_cache.put(url, content)
+    return content
 
-def scrape_and_extract(url, collected_qa, stats):
-    """Scrape article and extract Q&A"""
-    print(f"\n{'='*70}")
-    print(f"📄 PROCESSING ARTICLE #{stats['total_articles'] + 1}")
-    print(f"{'='*70}")
-    print(f"🔗 {url[:65]}...")
-    
-    try:
-        # Scrape with Firecrawl
-        print(f"   🔥 Scraping with Firecrawl...")
-        app = FirecrawlApp(api_key=FIRECRAWL_API_KEY)
-        result = app.scrape(url, formats=['markdown'])
-        
-        if not result:
-            print(f"   ❌ Firecrawl failed - no content returned")
-            stats["firecrawl_errors"] += 1
-            return
-        
-        # Get content from Document object or dict
-        content = None
-        if hasattr(result, 'markdown'):
-            content = result.markdown
-        elif hasattr(result, 'content'):
-            content = result.content
-        elif isinstance(result, dict):
-            if 'markdown' in result:
-                content = result['markdown']
-            elif 'content' in result:
-                content = result['content']
-        elif isinstance(result, str):
-            content = result
-        
-        if not content:
-            print(f"   ❌ Could not extract content from result (type: {type(result)})")
-            stats["firecrawl_errors"] += 1
-            return
-        stats["firecrawl_success"] += 1
-        print(f"   ✅ Scraped! ({len(content)} chars)")
-        
-        # Extract Q&A with AI
-        print(f"   🤖 Extracting Q&A with AI...")
-        content = content[:15000]  # Limit size
-        
-        client = Groq(api_key=GROQ_API_KEY)
-        
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[{
-                "role": "user",
-                "content": f"""Extract iOS/Swift/Apple development interview questions from this article.
+def extract_chunk_with_ai(content):
+    """Extract Q&A from one article chunk with Groq"""
+    prompt = f"""Extract iOS/Swift/Apple development interview questions from this article.
 
 Format:
 Q: [question]
@@ -108,45 +70,50 @@ Article:
 {content}
 
 Q&A Pairs:"""
-            }],
-            temperature=0,
-            max_tokens=2500,
-            timeout=20
-        )
+    acquire_for_prompt('groq', prompt, GROQ_MAX_TOKENS)
+    client = clients.groq(GROQ_API_KEY)
+    
+    response = client.chat.completions.create(
+        model="llama-3.3-70b-versatile",
+        messages=[{"role": "user", "content": prompt}],
+        temperature=0,
+        max_tokens=GROQ_MAX_TOKENS,
+        timeout=20
+    )
+    
+    result = response.choices[0].message.content.strip()
+    
+    if "NO_IOS_QA" in result or not result:
+        return []
+    return parse_qa_pairs(result)
+
+def scrape_and_extract(url, collected_qa, stats):
+    """Scrape article and extract Q&A"""
+    print(f"\n{'='*70}")
+    print(f"📄 PROCESSING ARTICLE #{stats['total_articles'] + 1}")
+    print(f"{'='*70}")
+    print(f"🔗 {url[:65]}...")
+    
+    try:
+        # Reuse a cached scrape if we have one
+        cached = scrape_cache.get(url)
+        if cached:
+            content = cached['markdown']
+            stats["cache_hits"] += 1
+            print(f"   ⚡ Cached! ({len(content)} chars)")
+        else:
+            content = scrape_with_firecrawl(url, stats)
+            if not content:
+                return
         
-        result = response.choices[0].message.content.strip()
+        # Extract Q&A with AI (long articles in parallel chunks)
+        print(f"   🤖 Extracting Q&A with AI...")
+        qa_pairs = extract_chunked(content, extract_chunk_with_ai)
         
-        if "NO_IOS_QA" in result or not result:
+        if not qa_pairs:
             print(f"   ℹ️  No iOS Q&A found")
             return
         
-        # Parse Q&A pairs
-        qa_pairs = []
-        lines = result.split('\n')
-        current_q = None
-        current_a = None
-        
-        for line in lines:
-            line = line.strip()
-            if line.startswith('Q:'):
-                if current_q:
-                    qa_pairs.append({
-                        'question': current_q,
-                        'answer': current_a or "Answer not provided"
-                    })
-                current_q = line[2:].strip()
-                current_a = None
-            elif line.startswith('A:'):
-                current_a = line[2:].strip()
-            elif current_a and line:
-                current_a += " " + line
-        
-        if current_q:
-            qa_pairs.append({
-                'question': current_q,
-                'answer': current_a or "Answer not provided"
-            })
-        
         if qa_pairs:
             stats["articles_with_qa"] += 1
             new_pairs = 0
@@ -195,11 +162,12 @@ def main():
     print("🤖 Firecrawl + AI does the rest")
     print("="*70 + "\n")
     
-    collected_qa = []
+    collected_qa = QACollection(SIMILARITY_THRESHOLD)
     stats = {
         "total_articles": 0,
         "firecrawl_success": 0,
         "firecrawl_errors": 0,
+        "cache_hits": 0,
         "articles_with_qa": 0,
         "total_qa": 0,
         "duplicates": 0,
@@ -251,6 +219,7 @@ def main():
         print(f"📄 Articles processed: {stats['total_articles']}")
         print(f"🔥 Firecrawl success: {stats['firecrawl_success']}")
         print(f"❌ Firecrawl errors: {stats['firecrawl_errors']}")
+        print(f"⚡ Scrape cache hits: {stats['cache_hits']}")
         print(f"📝 Articles with Q&A: {stats['articles_with_qa']}")
         print(f"💡 Total Q&A: {stats['total_qa']}")
         print(f"🔄 Duplicates: {stats['duplicates']}")
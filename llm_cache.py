@@ -0,0 +1,115 @@
+# llm_cache.py
+# Persistent memoization of raw LLM completions for Q&A extraction
+import os
+import threading
+import time
+from typing import Iterable, Optional, Tuple
+from database_sqlite import SQLitePool
+
+# Cache Configuration
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.db")
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+
+class LLMCache:
+    """
+    Raw completions keyed by (content hash, prompt version, provider, model).
+
+    Lives in its own SQLite file so it survives resets of the main database;
+    re-running extraction over unchanged content with an unchanged prompt
+    costs no tokens. Bump the prompt version whenever the template changes.
+    Least recently used entries are evicted past `max_entries`.
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.pool = SQLitePool(path, readers=2)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+        with self.pool.writer() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS completions (
+                    content_hash TEXT NOT NULL,
+                    prompt_version INTEGER NOT NULL,
+                    provider TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    completion TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used_at REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (content_hash, prompt_version, provider, model)
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_completions_last_used ON completions (last_used_at)')
+            self._entries = conn.execute('SELECT COUNT(*) FROM completions').fetchone()[0]
+
+    def get(self, content_hash: str, prompt_version,
+            candidates: Iterable[Tuple[str, str]]) -> Optional[Tuple[str, str, str]]:
+        """
+        First cached completion among `candidates` ((provider, model) pairs in
+        preference order), as (provider, model, completion), or None.
+        `prompt_version` may be a tuple of versions, tried in order.
+        """
+        versions = prompt_version if isinstance(prompt_version, tuple) else (prompt_version,)
+        with self.pool.reader() as conn:
+            rows = conn.execute(f'''
+                SELECT prompt_version, provider, model, completion FROM completions
+                WHERE content_hash = ? AND prompt_version IN ({','.join('?' * len(versions))})
+            ''', (content_hash, *versions)).fetchall()
+        cached = {(row['prompt_version'], row['provider'], row['model']): row['completion'] for row in rows}
+
+        candidates = list(candidates)
+        for version in versions:
+            for provider, model in candidates:
+                if (version, provider, model) in cached:
+                    with self.pool.writer() as conn:
+                        conn.execute('''
+                            UPDATE completions SET last_used_at = ?, hits = hits + 1
+                            WHERE content_hash = ? AND prompt_version = ? AND provider = ? AND model = ?
+                        ''', (time.time(), content_hash, version, provider, model))
+                    self.stats["hits"] += 1
+                    return provider, model, cached[(version, provider, model)]
+
+        self.stats["misses"] += 1
+        return None
+
+    def put(self, content_hash: str, prompt_version: int, provider: str, model: str, completion: str):
+        """Store a completion, evicting least recently used entries past max_entries"""
+        now = time.time()
+        key = (content_hash, prompt_version, provider, model)
+        with self._lock, self.pool.writer() as conn:
+            exists = conn.execute('''
+                SELECT 1 FROM completions
+                WHERE content_hash = ? AND prompt_version = ? AND provider = ? AND model = ?
+            ''', key).fetchone()
+            conn.execute('''
+                INSERT OR REPLACE INTO completions
+                    (content_hash, prompt_version, provider, model, completion, created_at, last_used_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (*key, completion, now, now))
+            if not exists:
+                self._entries += 1
+            self.stats["writes"] += 1
+
+            overflow = self._entries - self.max_entries
+            if overflow > 0:
+                conn.execute('''
+                    DELETE FROM completions WHERE rowid IN (
+                        SELECT rowid FROM completions ORDER BY last_used_at LIMIT ?
+                    )
+                ''', (overflow,))
+                self._entries -= overflow
+                self.stats["evictions"] += overflow
+
+    def summary(self) -> dict:
+        """Stats plus entry count, for /api/stats"""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0,
+            "entries": self._entries,
+            "max_entries": self.max_entries,
+        }
+
+    def close(self):
+        self.pool.close()
@@ -1,50 +1,22 @@
 # monitor_final.py
 # Ultra-aggressive URL detection + accepts questions without answers
-import re
 import time
 from bs4 import BeautifulSoup
 from playwright.sync_api import sync_playwright
 import pandas as pd
 from datetime import datetime
-from groq import Groq
+from clients import clients
+from qa_dedup import QACollection, is_duplicate
+from qa_extract import extract_chunked
+from rate_limit import acquire_for_prompt
 
 # Configuration
 import os
 GROQ_API_KEY = os.getenv("GROQ_API_KEY", "your-groq-api-key-here")
+GROQ_MAX_TOKENS = 2500  # completion budget, also reserved from the rate limit
 SIMILARITY_THRESHOLD = 0.7
 CHECK_INTERVAL = 0.2  # Check 5x per second!
 
-def normalize_question(q):
-    q = q.lower().strip()
-    q = re.sub(r'[^\w\s]', '', q)
-    q = ' '.join(q.split())
-    return q
-
-def calculate_similarity(q1, q2):
-    q1_norm = normalize_question(q1)
-    q2_norm = normalize_question(q2)
-    
-    if q1_norm == q2_norm:
-        return 1.0
-    
-    words1 = set(q1_norm.split())
-    words2 = set(q2_norm.split())
-    
-    if not words1 or not words2:
-        return 0.0
-    
-    intersection = words1.intersection(words2)
-    union = words1.union(words2)
-    
-    return len(intersection) / len(union)
-
-def is_duplicate(new_question, existing_questions, threshold=SIMILARITY_THRESHOLD):
-    for existing in existing_questions:
-        similarity = calculate_similarity(new_question, existing['question'])
-        if similarity >= threshold:
-            return True, existing['question'], similarity
-    return False, None, 0.0
-
 def is_article_url(url):
     """Very aggressive article detection"""
     if not url or "medium.com" not in url:
@@ -78,19 +50,17 @@ def extract_qa_pairs_with_ai(html: str, url: str):
     """Extract Q&A pairs - accepts questions without answers too!"""
     soup = BeautifulSoup(html, "lxml")
     article = soup.find("article") or soup
-    text = article.get_text(" ", strip=True)[:15000]
+    text = article.get_text(" ", strip=True)
     
     if len(text) < 200:
         return []
     
+    return extract_chunked(text, extract_chunk_with_ai)
+
+def extract_chunk_with_ai(text: str):
+    """Extract Q&A from one article chunk using Groq AI"""
     try:
-        client = Groq(api_key=GROQ_API_KEY)
-        
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[{
-                "role": "user",
-                "content": f"""Extract iOS/Swift/Apple development interview questions from this article.
+        prompt = f"""Extract iOS/Swift/Apple development interview questions from this article.
 
 Format:
 Q: [question]
@@ -106,9 +76,14 @@ Article:
 {text}
 
 Q&A Pairs:"""
-            }],
+        acquire_for_prompt('groq', prompt, GROQ_MAX_TOKENS)
+        client = clients.groq(GROQ_API_KEY)
+        
+        response = client.chat.completions.create(
+            model="llama-3.3-70b-versatile",
+            messages=[{"role": "user", "content": prompt}],
             temperature=0,
-            max_tokens=2500,
+            max_tokens=GROQ_MAX_TOKENS,
             timeout=20
         )
         
@@ -162,7 +137,7 @@ def main():
     print("🛑 Press Ctrl+C when done")
     print("="*70 + "\n")
     
-    collected_qa = []
+    collected_qa = QACollection(SIMILARITY_THRESHOLD)
     seen_urls = set()
     stats = {
         "total_articles": 0,
@@ -1,56 +1,30 @@
 # monitor_hybrid.py
 # HYBRID: Browser monitoring + Firecrawl scraping + Groq AI extraction
-import re
+import os
 import time
+from importlib.util import find_spec
 from playwright.sync_api import sync_playwright
 import pandas as pd
 from datetime import datetime
-from groq import Groq
+from clients import clients
+from qa_dedup import QACollection, is_duplicate
+from scrape_cache import ScrapeCache
+from rate_limit import acquire_for_prompt, get_limiter
+from qa_extract import extract_chunked, parse_qa_pairs
 
 # Configuration
 GROQ_API_KEY = os.getenv("GROQ_API_KEY", "your-groq-api-key-here")
+GROQ_MAX_TOKENS = 2500  # completion budget, also reserved from the rate limit
 FIRECRAWL_API_KEY = os.getenv("FIRECRAWL_API_KEY", "your-firecrawl-api-key-here")
 SIMILARITY_THRESHOLD = 0.7
 CHECK_INTERVAL = 0.3
 
-# Try to import firecrawl
-try:
-    from firecrawl import FirecrawlApp
-    FIRECRAWL_AVAILABLE = True
-except ImportError:
-    FIRECRAWL_AVAILABLE = False
-    print("⚠️  Firecrawl not installed. Install with: pip3 install firecrawl-py")
-
-def normalize_question(q):
-    q = q.lower().strip()
-    q = re.sub(r'[^\w\s]', '', q)
-    q = ' '.join(q.split())
-    return q
+scrape_cache = ScrapeCache()
 
-def calculate_similarity(q1, q2):
-    q1_norm = normalize_question(q1)
-    q2_norm = normalize_question(q2)
-    
-    if q1_norm == q2_norm:
-        return 1.0
-    
-    words1 = set(q1_norm.split())
-    words2 = set(q2_norm.split())
-    
-    if not words1 or not words2:
-        return 0.0
-    
-    intersection = words1.intersection(words2)
-    union = words1.union(words2)
-    
-    return len(intersection) / len(union)
-
-def is_duplicate(new_question, existing_questions, threshold=SIMILARITY_THRESHOLD):
-    for existing in existing_questions:
-        similarity = calculate_similarity(new_question, existing['question'])
-        if similarity >= threshold:
-            return True, existing['question'], similarity
-    return False, None, 0.0
+# Firecrawl SDK is optional (clients imports it when first used)
+FIRECRAWL_AVAILABLE = find_spec("firecrawl") is not None
+if not FIRECRAWL_AVAILABLE:
+    print("⚠️  Firecrawl not installed. Install with: pip3 install firecrawl-py")
 
 def is_article_url(url):
     """Check if URL is a Medium article"""
@@ -78,12 +52,24 @@ def is_article_url(url):
     return False
 
 def scrape_with_firecrawl(url):
-    """Scrape article using Firecrawl (better quality)"""
+    """Scrape article using Firecrawl (better quality), reusing cached scrapes"""
+    cached = scrape_cache.get(url)
+    if cached:
+        return cached['markdown']
+    
+    content = fetch_with_firecrawl(url)
+    if content:
+        scrape_cache.put(url, content)
+    return content
+
+def fetch_with_firecrawl(url):
+    """Fetch article markdown from Firecrawl"""
     if not FIRECRAWL_AVAILABLE:
         return None
     
     try:
-        app = FirecrawlApp(api_key=FIRECRAWL_API_KEY)
+        get_limiter('firecrawl').acquire()
+        app = clients.firecrawl(FIRECRAWL_API_KEY)
         result = app.scrape(url, formats=['markdown'])
         
         if not result:
@@ -107,21 +93,16 @@ def scrape_with_firecrawl(url):
         return None
 
 def extract_qa_with_ai(content: str, url: str):
-    """Extract Q&A using Groq AI"""
+    """Extract Q&A using Groq AI (long articles in parallel chunks)"""
     if not content or len(content) < 200:
         return []
     
-    # Limit content size
-    content = content[:15000]
-    
+    return extract_chunked(content, extract_chunk_with_ai)
+
+def extract_chunk_with_ai(content: str):
+    """Extract Q&A from one article chunk using Groq AI"""
     try:
-        client = Groq(api_key=GROQ_API_KEY)
-        
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[{
-                "role": "user",
-                "content": f"""Extract iOS/Swift/Apple development interview questions from this article.
+        prompt = f"""Extract iOS/Swift/Apple development interview questions from this article.
 
 Format:
 Q: [question]
@@ -137,9 +118,14 @@ Article:
 {content}
 
 Q&A Pairs:"""
-            }],
+        acquire_for_prompt('groq', prompt, GROQ_MAX_TOKENS)
+        client = clients.groq(GROQ_API_KEY)
+        
+        response = client.chat.completions.create(
+            model="llama-3.3-70b-versatile",
+            messages=[{"role": "user", "content": prompt}],
             temperature=0,
-            max_tokens=2500,
+            max_tokens=GROQ_MAX_TOKENS,
             timeout=20
         )
         
@@ -148,33 +134,7 @@ Q&A Pairs:"""
         if "NO_IOS_QA" in result or not result:
             return []
         
-        qa_pairs = []
-        lines = result.split('\n')
-        current_q = None
-        current_a = None
-        
-        for line in lines:
-            line = line.strip()
-            if line.startswith('Q:'):
-                if current_q:
-                    qa_pairs.append({
-                        'question': current_q,
-                        'answer': current_a or "Answer not provided"
-                    })
-                current_q = line[2:].strip()
-                current_a = None
-            elif line.startswith('A:'):
-                current_a = line[2:].strip()
-            elif current_a and line:
-                current_a += " " + line
-        
-        if current_q:
-            qa_pairs.append({
-                'question': current_q,
-                'answer': current_a or "Answer not provided"
-            })
-        
-        return qa_pairs
+        return parse_qa_pairs(result)
         
     except Exception as e:
         print(f"   ⚠️  AI error: {str(e)[:50]}")
@@ -203,7 +163,7 @@ def main():
         print("2. Update FIRECRAWL_API_KEY in monitor_hybrid.py\n")
         return
     
-    collected_qa = []
+    collected_qa = QACollection(SIMILARITY_THRESHOLD)
     seen_urls = set()
     stats = {
         "url_changes": 0,
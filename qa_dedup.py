@@ -0,0 +1,155 @@
+# qa_dedup.py
+# Shared question deduplication: MinHash signatures + LSH banding
+import hashlib
+import random
+import re
+from functools import lru_cache
+
+SIMILARITY_THRESHOLD = 0.7  # Adjust: 0.5=loose, 0.7=balanced, 0.9=strict
+NUM_PERM = 128
+
+# Universal hashing modulo a Mersenne prime, seeded so signatures are stable
+# across processes (they are persisted by the API)
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(1337)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERM)
+]
+
+def normalize_question(q):
+    """Normalize question for comparison"""
+    q = q.lower().strip()
+    q = re.sub(r'[^\w\s]', '', q)  # Remove punctuation
+    q = ' '.join(q.split())  # Normalize whitespace
+    return q
+
+def question_tokens(q):
+    """Set of normalized words in a question"""
+    return set(normalize_question(q).split())
+
+def calculate_similarity(q1, q2):
+    """Calculate similarity between two questions (0-1)"""
+    q1_norm = normalize_question(q1)
+    q2_norm = normalize_question(q2)
+
+    if q1_norm == q2_norm:
+        return 1.0
+
+    words1 = set(q1_norm.split())
+    words2 = set(q2_norm.split())
+
+    if not words1 or not words2:
+        return 0.0
+
+    intersection = words1.intersection(words2)
+    union = words1.union(words2)
+
+    return len(intersection) / len(union)
+
+def _token_hash(token):
+    return int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'big')
+
+def minhash_signature(tokens, num_perm=NUM_PERM):
+    """MinHash signature of a token set (empty tuple for an empty set)"""
+    if not tokens:
+        return ()
+    permutations = _PERMUTATIONS[:num_perm]
+    rows = [
+        [(a * h + b) % _MERSENNE_PRIME for a, b in permutations]
+        for h in map(_token_hash, tokens)
+    ]
+    return tuple(map(min, zip(*rows)))
+
+@lru_cache(maxsize=None)
+def choose_bands(threshold=SIMILARITY_THRESHOLD, num_perm=NUM_PERM, recall=0.99):
+    """
+    Pick (bands, rows) for LSH banding.
+
+    Uses the most rows per band (fewest false candidates) that still makes a
+    pair at exactly `threshold` similarity a candidate with probability >= recall.
+    """
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        if 1 - (1 - threshold ** rows) ** bands >= recall:
+            best = (bands, rows)
+    return best
+
+def lsh_band_keys(signature, bands, rows):
+    """Bucket keys for each band of a signature"""
+    keys = []
+    for band in range(bands):
+        chunk = signature[band * rows:(band + 1) * rows]
+        digest = hashlib.blake2b(repr(chunk).encode('ascii'), digest_size=8).hexdigest()
+        keys.append(f"b{bands}r{rows}:{band}:{digest}")
+    return keys
+
+def question_band_keys(question, threshold=SIMILARITY_THRESHOLD, num_perm=NUM_PERM):
+    """LSH bucket keys of a question; storage backends index these"""
+    bands, rows = choose_bands(threshold, num_perm)
+    return lsh_band_keys(minhash_signature(question_tokens(question), num_perm), bands, rows)
+
+class LSHIndex:
+    """In-memory MinHash/LSH index returning near-duplicate candidates in sub-linear time"""
+
+    def __init__(self, threshold=SIMILARITY_THRESHOLD, num_perm=NUM_PERM):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands, self.rows = choose_bands(threshold, num_perm)
+        self.buckets = {}
+        self.questions = {}
+
+    def __len__(self):
+        return len(self.questions)
+
+    def _keys(self, question):
+        signature = minhash_signature(question_tokens(question), self.num_perm)
+        return lsh_band_keys(signature, self.bands, self.rows)
+
+    def add(self, key, question):
+        """Index a question under `key`"""
+        self.questions[key] = question
+        for band_key in self._keys(question):
+            self.buckets.setdefault(band_key, set()).add(key)
+
+    def candidates(self, question):
+        """Keys of indexed questions sharing at least one LSH bucket"""
+        found = set()
+        for band_key in self._keys(question):
+            found.update(self.buckets.get(band_key, ()))
+        return found
+
+    def find_duplicate(self, question, threshold=None):
+        """Return (key, similar_question, similarity) of the best match, or (None, None, 0.0)"""
+        threshold = self.threshold if threshold is None else threshold
+        best = (None, None, 0.0)
+        for key in self.candidates(question):
+            similarity = calculate_similarity(question, self.questions[key])
+            if similarity >= threshold and similarity > best[2]:
+                best = (key, self.questions[key], similarity)
+        return best
+
+class QACollection(list):
+    """List of Q&A dicts whose questions are kept in an LSHIndex"""
+
+    def __init__(self, threshold=SIMILARITY_THRESHOLD):
+        super().__init__()
+        self.index = LSHIndex(threshold)
+
+    def append(self, qa):
+        self.index.add(len(self), qa['question'])
+        super().append(qa)
+
+def is_duplicate(new_question, existing_questions, threshold=SIMILARITY_THRESHOLD):
+    """Check if new question is duplicate of existing ones -> (is_dup, similar_question, similarity)"""
+    if isinstance(existing_questions, QACollection):
+        key, similar, similarity = existing_questions.index.find_duplicate(new_question, threshold)
+        return key is not None, similar, similarity
+
+    # Plain lists have no index; compare pairwise
+    for existing in existing_questions:
+        similarity = calculate_similarity(new_question, existing['question'])
+        if similarity >= threshold:
+            return True, existing['question'], similarity
+    return False, None, 0.0
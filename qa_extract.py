@@ -0,0 +1,370 @@
+# qa_extract.py
+# Q&A extraction prompts (single and batched articles) and Q:/A: output parsing
+import re
+from concurrent.futures import ThreadPoolExecutor
+from qa_dedup import normalize_question
+from rate_limit import estimate_tokens
+
+# Bump PROMPT_VERSION whenever the extraction prompt changes so cached
+# completions for the old prompt are ignored
+PROMPT_VERSION = 1
+# Per-article sections of batched completions are cached under their own
+# version (a separate range, so it never equals PROMPT_VERSION); bump it
+# whenever build_batch_prompt changes
+BATCH_PROMPT_VERSION = 1001
+
+# Batching: several short articles share one request (and one copy of the
+# instructions). Longer articles are always extracted on their own
+BATCH_ARTICLE_MAX_CHARS = 8000
+BATCH_SECTION_OVERHEAD_TOKENS = 10
+
+# Chunking: long articles are split so every part gets extracted, rather
+# than truncating; articles up to CHUNK_MAX_CHARS stay a single chunk
+CHUNK_MAX_CHARS = 15000
+CHUNK_WORKERS = 4
+NO_ANSWER = "Answer not provided"
+
+EXTRACTION_RULES = """ANSWER EXTRACTION RULES:
+1. Look for EXPLICIT answers (direct Q&A format)
+2. Look for IMPLICIT answers (discussions, explanations, context about the topic)
+3. If a question is asked, search the ENTIRE article for related information
+4. Summarize relevant paragraphs as answers
+5. Extract code examples or technical explanations as answers
+6. If discussing a concept, that discussion IS the answer
+7. Only use "Answer not provided" if there's truly NO relevant information
+
+FORMAT:
+Q: [question]
+A: [answer - can be a summary, explanation, or discussion from the article]
+
+CONTENT TYPES TO EXTRACT:
+- Interview questions with answers
+- Technical questions with explanations
+- Conceptual questions with discussions
+- Architecture/design questions with reasoning
+- Best practices with explanations
+- Common mistakes with solutions
+
+QUALITY RULES:
+- ONLY iOS/Swift/SwiftUI/UIKit/Xcode/Apple platform content
+- Answers should be 1-3 sentences (concise but complete)
+- Include code snippets if relevant
+- If NO iOS questions found at all, return "NO_IOS_QA\""""
+
+def build_prompt(content: str) -> str:
+    """Extraction prompt for one article"""
+    return f"""Extract iOS/Swift interview questions and answers from this article. Be thorough and intelligent in finding answers.
+
+{EXTRACTION_RULES}
+
+Article:
+{content}
+
+Q&A Pairs:"""
+
+def build_batch_prompt(contents) -> str:
+    """Extraction prompt for several articles, answered in numbered sections"""
+    articles = '\n\n'.join(
+        f"=== ARTICLE {number} ===\n{content}" for number, content in enumerate(contents, start=1)
+    )
+    return f"""Extract iOS/Swift interview questions and answers from each of the {len(contents)} articles below. Treat every article separately. Be thorough and intelligent in finding answers.
+
+{EXTRACTION_RULES}
+
+BATCH FORMAT:
+- Start the output for each article with its marker line, e.g. "### ARTICLE 1"
+- Follow the marker with that article's Q:/A: pairs only
+- If an article has no iOS questions, write "NO_IOS_QA" under its marker
+
+{articles}
+
+Q&A Pairs:"""
+
+BATCH_PREAMBLE_TOKENS = estimate_tokens(build_batch_prompt([]))
+_SECTION_MARKER = re.compile(r'^\W*ARTICLE\s+(\d+)\W*$', re.IGNORECASE | re.MULTILINE)
+
+def split_batch_output(result_text: str, count: int):
+    """
+    Split a batched completion into per-article outputs, in article order.
+    Articles the model skipped come back as None.
+    """
+    sections = [None] * count
+    markers = list(_SECTION_MARKER.finditer(result_text))
+    for marker, following in zip(markers, markers[1:] + [None]):
+        number = int(marker.group(1))
+        if 1 <= number <= count and sections[number - 1] is None:
+            end = following.start() if following else len(result_text)
+            sections[number - 1] = result_text[marker.end():end].strip()
+    return sections
+
+def plan_batches(contents, prompt_budget_tokens: int, max_articles: int):
+    """
+    Group article indices into batches that fit the prompt token budget.
+
+    Articles are packed greedily in order; any article over
+    BATCH_ARTICLE_MAX_CHARS, or that would not fit with others, is a
+    batch of its own.
+    """
+    batches, current, used = [], [], BATCH_PREAMBLE_TOKENS
+    for index, content in enumerate(contents):
+        cost = estimate_tokens(content) + BATCH_SECTION_OVERHEAD_TOKENS
+        if len(content) > BATCH_ARTICLE_MAX_CHARS or max_articles <= 1:
+            batches.append([index])
+            continue
+        if current and (used + cost > prompt_budget_tokens or len(current) >= max_articles):
+            batches.append(current)
+            current, used = [], BATCH_PREAMBLE_TOKENS
+        current.append(index)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+# Lines where a chunk may start: markdown headings and question boundaries
+# ("Q:", "Q1.", "Question 3:", "12. ...", "**5. ...**")
+_CHUNK_BOUNDARY = re.compile(
+    r'^\s*(?:#{1,6}\s|\**\s*(?:Q(?:uestion)?\s*\d*\s*[:.)]|\d{1,3}[.)]\s))',
+    re.IGNORECASE
+)
+
+def _split_blocks(content: str):
+    """Split markdown into blocks that each start at a boundary line (never inside a code fence)"""
+    blocks, current, in_fence = [], [], False
+    for line in content.split('\n'):
+        if line.lstrip().startswith('```'):
+            in_fence = not in_fence
+        elif not in_fence and current and _CHUNK_BOUNDARY.match(line):
+            blocks.append('\n'.join(current))
+            current = []
+        current.append(line)
+    if current:
+        blocks.append('\n'.join(current))
+    return blocks
+
+def _split_oversized(block: str, max_chars: int):
+    """Split a block with no usable boundary at paragraphs, then hard"""
+    pieces, current = [], ''
+    for paragraph in block.split('\n\n'):
+        while len(paragraph) > max_chars:
+            pieces.append(paragraph[:max_chars])
+            paragraph = paragraph[max_chars:]
+        if current and len(current) + 2 + len(paragraph) > max_chars:
+            pieces.append(current)
+            current = paragraph
+        else:
+            current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        pieces.append(current)
+    return pieces
+
+def chunk_markdown(content: str, max_chars: int = CHUNK_MAX_CHARS):
+    """
+    Split article markdown into chunks of at most max_chars, cutting at
+    headings and question boundaries so a question stays with its answer.
+    """
+    if len(content) <= max_chars:
+        return [content]
+
+    chunks, current = [], ''
+    for block in _split_blocks(content):
+        parts = _split_oversized(block, max_chars) if len(block) > max_chars else [block]
+        for part in parts:
+            if current and len(current) + 1 + len(part) > max_chars:
+                chunks.append(current)
+                current = part
+            else:
+                current = f"{current}\n{part}" if current else part
+    if current:
+        chunks.append(current)
+    return chunks
+
+def merge_qa_pairs(chunk_results):
+    """
+    Merge per-chunk Q&A lists in order, dropping exact (normalized)
+    duplicates; a duplicate's answer fills in a missing one.
+    """
+    merged, positions = [], {}
+    for qa_pairs in chunk_results:
+        for qa in qa_pairs:
+            key = normalize_question(qa['question'])
+            if key in positions:
+                existing = merged[positions[key]]
+                if existing['answer'] == NO_ANSWER and qa['answer'] != NO_ANSWER:
+                    existing['answer'] = qa['answer']
+                continue
+            positions[key] = len(merged)
+            merged.append(dict(qa))
+    return merged
+
+def extract_chunked(content: str, extract_chunk, max_workers: int = CHUNK_WORKERS):
+    """
+    Run `extract_chunk(chunk) -> [qa dicts]` over every chunk of an article
+    in parallel and merge the results
+    """
+    chunks = chunk_markdown(content)
+    if len(chunks) == 1:
+        return merge_qa_pairs([extract_chunk(chunks[0])])
+    print(f"   🧩 Long article: extracting {len(chunks)} chunks in parallel")
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as executor:
+        return merge_qa_pairs(executor.map(extract_chunk, chunks))
+
+class QAStreamParser:
+    """
+    Incremental Q:/A: parser for streamed completions. feed() text as it
+    arrives and get back each pair as soon as its answer is closed by the
+    next question; close() returns the final pair at the end of the stream.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Drop partial state (e.g. when a provider fails mid-stream and another starts over)"""
+        self._buffer = ''
+        self._question = None
+        self._answer = None
+
+    def feed(self, text: str):
+        self._buffer += text
+        *lines, self._buffer = self._buffer.split('\n')
+        return self._consume(lines)
+
+    def close(self):
+        pairs = self._consume([self._buffer])
+        self._buffer = ''
+        if self._question:
+            pairs.append(self._pair())
+            self._question = None
+        return pairs
+
+    def _pair(self):
+        return {'question': self._question, 'answer': self._answer or NO_ANSWER}
+
+    def _consume(self, lines):
+        pairs = []
+        for line in lines:
+            line = line.strip()
+            if line.startswith('Q:'):
+                if self._question:
+                    pairs.append(self._pair())
+                self._question = line[2:].strip()
+                self._answer = None
+            elif line.startswith('A:'):
+                self._answer = line[2:].strip()
+            elif self._answer and line:
+                self._answer += " " + line
+        return pairs
+
+def parse_qa_pairs(result_text: str):
+    """Parse Q:/A: formatted AI output into Q&A dicts"""
+    parser = QAStreamParser()
+    return parser.feed(result_text) + parser.close()
+
+# Local pre-extraction: articles that already spell out their questions
+# (question headings, "Q:" lines, numbered questions) are parsed directly,
+# and the LLM is skipped when the structure is clear enough
+PRE_EXTRACT_MIN_QUESTIONS = 3
+PRE_EXTRACT_ANSWER_SENTENCES = 3
+PRE_EXTRACT_ANSWER_MAX_CHARS = 600
+# Terms that only come up in iOS writing, matched as whole words (generic
+# ones like "closure", "protocol" or "optional" appear in any language)
+IOS_KEYWORDS = {
+    'ios', 'ipados', 'watchos', 'macos', 'swift', 'swiftui', 'uikit', 'appkit', 'xcode',
+    'objective-c', 'cocoa touch', 'core data', 'grand central dispatch', 'uiview',
+    'uiviewcontroller', 'viewcontroller', 'view controller', 'appdelegate', 'scenedelegate',
+    'xctest', 'testflight', 'app store', 'cocoapods', 'swift package manager',
+}
+_IOS_TERM = re.compile(r'\b(?:' + '|'.join(map(re.escape, sorted(IOS_KEYWORDS, key=len, reverse=True))) + r')\b',
+                       re.IGNORECASE)
+PRE_EXTRACT_MIN_IOS_TERMS = 2
+PRE_EXTRACT_IOS_PAIR_SHARE = 0.6
+
+_QUESTION_PATTERNS = (
+    ('heading', re.compile(r'^#{1,6}\s+(?:Q(?:uestion)?\s*\d*\s*[:.)-]\s*|\d{1,3}[.)]\s*)?(.+\?)\s*#*$', re.IGNORECASE)),
+    ('prefixed', re.compile(r'^\**\s*Q(?:uestion)?\s*\d*\s*[:.)-]\s*\**\s*(.+?)\s*\**$', re.IGNORECASE)),
+    ('numbered', re.compile(r'^\**\s*\d{1,3}[.)]\s+\**\s*(.+\?)\s*\**$')),
+    ('bold', re.compile(r'^\*\*(.+\?)\*\*$')),
+)
+_ANSWER_PREFIX = re.compile(r'^\**\s*(?:A|Ans|Answer)\s*\d*\s*[:.)-]\s*\**\s*', re.IGNORECASE)
+_HEADING = re.compile(r'^#{1,6}\s')
+_SKIP_LINE = re.compile(r'^(?:!\[|[-*_]{3,}\s*$|<)')
+_MARKUP = re.compile(r'\*\*|__|`|^>\s*|^[-*+]\s+')
+_LINK = re.compile(r'\[([^\]]*)\]\([^)]*\)')
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+def _clean_markdown(text: str) -> str:
+    return _MARKUP.sub('', _LINK.sub(r'\1', text)).strip()
+
+def _summarize_answer(lines) -> str:
+    """First few sentences of an answer's prose"""
+    text = ' '.join(_clean_markdown(line) for line in lines)
+    text = re.sub(r'\s+', ' ', text).strip()
+    if not text:
+        return NO_ANSWER
+    sentences = _SENTENCE_END.split(text)
+    answer = ' '.join(sentences[:PRE_EXTRACT_ANSWER_SENTENCES])
+    if len(answer) > PRE_EXTRACT_ANSWER_MAX_CHARS:
+        answer = answer[:PRE_EXTRACT_ANSWER_MAX_CHARS].rsplit(' ', 1)[0] + '...'
+    return answer
+
+def _match_question(line: str):
+    for kind, pattern in _QUESTION_PATTERNS:
+        match = pattern.match(line)
+        if match:
+            return kind, _clean_markdown(match.group(1))
+    return None
+
+def pre_extract(content: str):
+    """
+    Rule-based Q&A extraction for explicitly structured articles.
+
+    Returns (qa_pairs, confidence). Confidence in [0, 1] multiplies how
+    consistently questions use one format, how many have an answer, how
+    much of the article the Q&A sections cover, and how topical it is;
+    below PRE_EXTRACT_MIN_QUESTIONS it is 0.
+    """
+    sections = []  # [kind, question, answer lines, chars]
+    current, in_fence, body_chars = None, False, 0
+    for raw_line in content.split('\n'):
+        line = raw_line.strip()
+        if line.startswith('```'):
+            in_fence = not in_fence
+            continue
+        if in_fence or not line or _SKIP_LINE.match(line):
+            continue
+        body_chars += len(line)
+
+        question = _match_question(line)
+        if question:
+            current = [question[0], question[1], [], len(line)]
+            sections.append(current)
+        elif _HEADING.match(line):
+            current = None  # a non-question heading ends the answer
+        elif current is not None:
+            current[2].append(_ANSWER_PREFIX.sub('', line))
+            current[3] += len(line)
+
+    qa_pairs = merge_qa_pairs([[
+        {'question': question, 'answer': _summarize_answer(lines)}
+        for _, question, lines, _ in sections
+    ]])
+    if len(qa_pairs) < PRE_EXTRACT_MIN_QUESTIONS:
+        return qa_pairs, 0.0
+
+    kinds = [section[0] for section in sections]
+    consistency = max(kinds.count(kind) for kind in set(kinds)) / len(kinds)
+    answered = sum(qa['answer'] != NO_ANSWER for qa in qa_pairs) / len(qa_pairs)
+    coverage = min(1.0, sum(section[3] for section in sections) / max(body_chars, 1) / 0.6)
+    return qa_pairs, round(consistency * answered * coverage * _topical(content, qa_pairs), 3)
+
+def _topical(content: str, qa_pairs) -> float:
+    """
+    0.3 unless the article uses PRE_EXTRACT_MIN_IOS_TERMS distinct iOS
+    terms; then it grows with the share of Q&A pairs that mention one,
+    reaching 1.0 at PRE_EXTRACT_IOS_PAIR_SHARE
+    """
+    terms = {term.lower() for term in _IOS_TERM.findall(content)}
+    if len(terms) < PRE_EXTRACT_MIN_IOS_TERMS:
+        return 0.3
+    on_topic = sum(bool(_IOS_TERM.search(f"{qa['question']} {qa['answer']}")) for qa in qa_pairs) / len(qa_pairs)
+    return 0.3 + 0.7 * min(1.0, on_topic / PRE_EXTRACT_IOS_PAIR_SHARE)
@@ -0,0 +1,138 @@
+# rate_limit.py
+# Token-bucket rate limits per AI provider and for Firecrawl
+import asyncio
+import math
+import os
+import threading
+import time
+
+# Default quotas as (requests/min, tokens/min); None means unlimited.
+# Override with RATE_LIMIT_<NAME>_RPM / RATE_LIMIT_<NAME>_TPM, 0 disables a limit
+DEFAULT_LIMITS = {
+    'groq': (30, 12000),
+    'gemini': (15, 1000000),
+    'huggingface': (60, None),
+    'firecrawl': (10, None),
+}
+CHARS_PER_TOKEN = 4  # rough average for English prose and markdown
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of a prompt, without a tokenizer"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+class TokenBucket:
+    """
+    Refills at `per_minute / 60` units per second up to `per_minute`.
+
+    reserve() always succeeds and returns how long the caller must wait: the
+    level may go negative, which queues later callers behind earlier ones in
+    arrival order instead of letting them race for refills.
+    """
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self._refill(now)
+        amount = min(amount, self.capacity)  # oversized requests just take a full bucket
+        return max(0.0, (amount - self.level) / self.rate)
+
+    def reserve(self, amount: float, now: float) -> float:
+        wait = self.wait_time(amount, now)
+        self.level -= min(amount, self.capacity)
+        return wait
+
+class RateLimiter:
+    """Requests/min and tokens/min buckets for one provider"""
+
+    def __init__(self, name: str, requests_per_minute=None, tokens_per_minute=None):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "tokens": 0, "waits": 0, "wait_seconds": 0.0}
+
+    def _buckets(self, tokens: int):
+        return [(bucket, amount) for bucket, amount in ((self.requests, 1), (self.tokens, tokens))
+                if bucket is not None]
+
+    def _record(self, tokens: int, wait: float):
+        self.stats["requests"] += 1
+        self.stats["tokens"] += tokens
+        if wait > 0:
+            self.stats["waits"] += 1
+            self.stats["wait_seconds"] += wait
+
+    def reserve(self, tokens: int = 0) -> float:
+        """Take quota for a request of `tokens`; returns how long to wait before sending it"""
+        with self._lock:
+            now = time.monotonic()
+            wait = max([bucket.reserve(amount, now) for bucket, amount in self._buckets(tokens)], default=0.0)
+            self._record(tokens, wait)
+        if wait > 0:
+            print(f"⏳ {self.name} quota: waiting {wait:.1f}s")
+        return wait
+
+    def acquire(self, tokens: int = 0) -> float:
+        """Block until a request of `tokens` fits the quota; returns seconds waited"""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens: int = 0) -> float:
+        """acquire() for coroutines: waits on the event loop instead of blocking a thread"""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def try_acquire(self, tokens: int = 0) -> bool:
+        """Take quota only if it is available right now"""
+        with self._lock:
+            now = time.monotonic()
+            buckets = self._buckets(tokens)
+            if any(bucket.wait_time(amount, now) > 0 for bucket, amount in buckets):
+                return False
+            for bucket, amount in buckets:
+                bucket.reserve(amount, now)
+            self._record(tokens, 0.0)
+            return True
+
+    def summary(self) -> dict:
+        return {**self.stats, "wait_seconds": round(self.stats["wait_seconds"], 1)}
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def _limit_from_env(name: str, kind: str, default):
+    value = os.getenv(f"RATE_LIMIT_{name.upper()}_{kind}")
+    if value is None:
+        return default
+    return float(value) or None
+
+def get_limiter(name: str) -> RateLimiter:
+    """The process-wide limiter for a provider ('groq', 'gemini', 'huggingface', 'firecrawl', ...)"""
+    with _limiters_lock:
+        if name not in _limiters:
+            rpm, tpm = DEFAULT_LIMITS.get(name, (None, None))
+            _limiters[name] = RateLimiter(
+                name, _limit_from_env(name, 'RPM', rpm), _limit_from_env(name, 'TPM', tpm)
+            )
+        return _limiters[name]
+
+def acquire_for_prompt(name: str, prompt: str, max_tokens: int) -> float:
+    """Block until `name` has quota for the fully built prompt plus a max_tokens completion"""
+    return get_limiter(name).acquire(estimate_tokens(prompt) + max_tokens)
+
+def limiter_stats() -> dict:
+    """Usage and queueing per limiter, for /api/stats"""
+    with _limiters_lock:
+        return {name: limiter.summary() for name, limiter in _limiters.items()}
@@ -0,0 +1,158 @@
+# scrape_cache.py
+# On-disk cache of scraped article markdown, keyed by canonical URL
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Cache Configuration
+SCRAPE_CACHE_DIR = os.getenv("SCRAPE_CACHE_DIR", ".scrape_cache")
+SCRAPE_CACHE_TTL_HOURS = float(os.getenv("SCRAPE_CACHE_TTL_HOURS", str(7 * 24)))
+SCRAPE_CACHE_MAX_MB = float(os.getenv("SCRAPE_CACHE_MAX_MB", "256"))
+
+# Query parameters that never change what an article says
+TRACKING_PARAMS = {'source', 'sk', 'gi', 'ref', 'fbclid', 'gclid'}
+
+def canonical_url(url: str) -> str:
+    """
+    Normalize a URL so variants of the same article share one cache entry:
+    lowercase scheme/host, no fragment, no tracking parameters (Medium adds
+    ?source=...), sorted remaining parameters, no trailing slash.
+    """
+    parts = urlsplit(url.strip())
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key not in TRACKING_PARAMS and not key.startswith('utm_')
+    )
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(query), ''))
+
+def content_hash(text: str) -> str:
+    """Stable hash of scraped content"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+class ScrapeCache:
+    """
+    Gzip-compressed markdown plus JSON metadata per canonical URL.
+
+    Entries expire after `ttl_hours`; when the cache grows past `max_mb` the
+    least recently used entries (by file mtime, bumped on every hit) are
+    evicted. Files are written to a temp name and renamed into place, so
+    concurrent readers never see a partial entry.
+    """
+
+    def __init__(self, directory: str = SCRAPE_CACHE_DIR, ttl_hours: float = SCRAPE_CACHE_TTL_HOURS,
+                 max_mb: float = SCRAPE_CACHE_MAX_MB):
+        self.directory = Path(directory)
+        self.ttl = ttl_hours * 3600
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._size = None  # bytes on disk, computed lazily
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "writes": 0, "evictions": 0}
+
+    def _paths(self, url: str):
+        key = hashlib.sha256(canonical_url(url).encode('utf-8')).hexdigest()
+        return self.directory / f"{key}.md.gz", self.directory / f"{key}.json"
+
+    def get(self, url: str) -> Optional[dict]:
+        """Cached entry ({'markdown', 'url', 'etag', 'fetched_at', 'content_hash'}) or None"""
+        data_path, meta_path = self._paths(url)
+        try:
+            meta = json.loads(meta_path.read_text())
+            if time.time() - meta['fetched_at'] > self.ttl:
+                self.stats["expired"] += 1
+                with self._lock:
+                    self._remove(data_path, meta_path)
+                return None
+            markdown = gzip.decompress(data_path.read_bytes()).decode('utf-8')
+            os.utime(data_path)  # LRU: mark as recently used
+        except (OSError, ValueError, KeyError, EOFError):
+            self.stats["misses"] += 1
+            return None
+
+        self.stats["hits"] += 1
+        return {**meta, "markdown": markdown}
+
+    def put(self, url: str, markdown: str, etag: Optional[str] = None) -> dict:
+        """Store markdown for a URL, evicting old entries if over the size limit"""
+        data_path, meta_path = self._paths(url)
+        meta = {
+            "url": canonical_url(url),
+            "etag": etag,
+            "fetched_at": time.time(),
+            "content_hash": content_hash(markdown),
+        }
+        self.directory.mkdir(parents=True, exist_ok=True)
+        data = gzip.compress(markdown.encode('utf-8'), compresslevel=6)
+
+        with self._lock:
+            old_size = sum(p.stat().st_size for p in (data_path, meta_path) if p.exists())
+            self._write(data_path, data)
+            self._write(meta_path, json.dumps(meta).encode('utf-8'))
+            self.stats["writes"] += 1
+            if self._size is not None:
+                self._size += data_path.stat().st_size + meta_path.stat().st_size - old_size
+            self._evict()
+
+        return {**meta, "markdown": markdown}
+
+    def fetch(self, url: str, scrape: Callable[[str], str]) -> str:
+        """Return cached markdown for `url`, calling `scrape(url)` and caching on a miss"""
+        entry = self.get(url)
+        if entry is not None:
+            return entry["markdown"]
+        markdown = scrape(url)
+        if markdown:
+            self.put(url, markdown)
+        return markdown
+
+    def summary(self) -> dict:
+        """Stats plus current size, for /api/stats"""
+        with self._lock:
+            size = self._disk_size()
+        lookups = self.stats["hits"] + self.stats["misses"] + self.stats["expired"]
+        return {
+            **self.stats,
+            "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0,
+            "size_mb": round(size / (1024 * 1024), 2),
+            "max_mb": round(self.max_bytes / (1024 * 1024), 2),
+        }
+
+    def _write(self, path: Path, data: bytes):
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+    def _remove(self, *paths: Path):
+        for path in paths:
+            try:
+                size = path.stat().st_size
+                path.unlink()
+            except OSError:
+                continue
+            if self._size is not None:
+                self._size -= size
+
+    def _disk_size(self) -> int:
+        if self._size is None:
+            self._size = sum(
+                p.stat().st_size for p in self.directory.glob('*') if not p.name.endswith('.tmp')
+            ) if self.directory.exists() else 0
+        return self._size
+
+    def _evict(self):
+        """Drop least recently used entries until under max_bytes (caller holds the lock)"""
+        if self._disk_size() <= self.max_bytes:
+            return
+        entries = sorted(self.directory.glob('*.md.gz'), key=lambda p: p.stat().st_mtime)
+        for data_path in entries:
+            if self._size <= self.max_bytes:
+                break
+            meta_path = data_path.with_name(data_path.name[:-len('.md.gz')] + '.json')
+            self._remove(data_path, meta_path)
+            self.stats["evictions"] += 1
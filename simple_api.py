@@ -1,56 +1,55 @@
 # deploy/simple_api.py
 # Simplified API for free hosting (no Redis/Celery needed)
-from fastapi import FastAPI, BackgroundTasks, HTTPException
+from fastapi import FastAPI, BackgroundTasks, HTTPException, Response
 from fastapi.responses import StreamingResponse, HTMLResponse
 from pydantic import BaseModel, HttpUrl
 from typing import List, Optional
 import asyncio
+import base64
+import csv
+import functools
+import io
 import json
-import re
+import socket
+import time
+import uuid
+import zlib
 from datetime import datetime
-from pathlib import Path
-import sqlite3
-from contextlib import contextmanager
-from firecrawl import FirecrawlApp
-from groq import Groq
+from urllib.parse import urlsplit
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
 import os
 import random
-
-# Import AI SDKs (will be installed via requirements.txt)
-try:
-    import google.generativeai as genai
-    GEMINI_AVAILABLE = True
-except ImportError:
-    GEMINI_AVAILABLE = False
-    print("⚠️  Google Gemini SDK not installed")
-
-try:
-    import requests
-    HUGGINGFACE_AVAILABLE = True
-except ImportError:
-    HUGGINGFACE_AVAILABLE = False
-    print("⚠️  Requests library not installed for Hugging Face")
+from qa_dedup import normalize_question
+from storage import open_storage
+from scrape_cache import ScrapeCache, content_hash
+from llm_cache import LLMCache
+from clients import CLIENT_WARMUP, WARMUP_URLS, clients
+from ai_providers import EXTRACTION_MODELS, MAX_COMPLETION_TOKENS, ProviderRouter, prompt_token_budget
+from qa_extract import (
+    BATCH_PROMPT_VERSION, PROMPT_VERSION, build_batch_prompt, build_prompt, chunk_markdown, merge_qa_pairs,
+    QAStreamParser, parse_qa_pairs, plan_batches, pre_extract, split_batch_output
+)
+from rate_limit import estimate_tokens, get_limiter, limiter_stats
 
 # Configuration from environment
-GROQ_API_KEY = os.getenv("GROQ_API_KEY", "your-groq-api-key-here")
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "your-gemini-api-key-here")
-HUGGINGFACE_API_KEY = os.getenv("HUGGINGFACE_API_KEY", "your-hf-api-key-here")
 FIRECRAWL_API_KEY = os.getenv("FIRECRAWL_API_KEY", "your-firecrawl-api-key-here")
-DATABASE_PATH = os.getenv("DATABASE_PATH", "scraper.db")
-MONGODB_URI = os.getenv("MONGODB_URI", "")
-
-# Determine which database to use
-USE_MONGODB = bool(MONGODB_URI and MONGODB_URI != "")
-
-if USE_MONGODB:
-    try:
-        from pymongo import MongoClient, ASCENDING, DESCENDING
-        print("✅ MongoDB enabled - data will persist!")
-    except ImportError:
-        print("⚠️  pymongo not installed, falling back to SQLite")
-        USE_MONGODB = False
-else:
-    print("ℹ️  Using SQLite (data will reset on redeploy)")
+SIMILARITY_THRESHOLD = float(os.getenv("SIMILARITY_THRESHOLD", "0.7"))
+SCRAPE_CONCURRENCY = int(os.getenv("SCRAPE_CONCURRENCY", "8"))
+AI_CONCURRENCY = int(os.getenv("AI_CONCURRENCY", "2"))
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "16"))
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "120"))
+MAX_JOB_ATTEMPTS = int(os.getenv("MAX_JOB_ATTEMPTS", "3"))
+QUEUE_POLL_SECONDS = float(os.getenv("QUEUE_POLL_SECONDS", "5"))
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+EXTRACTION_BATCH_SIZE = int(os.getenv("EXTRACTION_BATCH_SIZE", "4"))
+PRE_EXTRACT_MIN_CONFIDENCE = float(os.getenv("PRE_EXTRACT_MIN_CONFIDENCE", "0.75"))
+MAX_BATCH_URLS = int(os.getenv("MAX_BATCH_URLS", "5000"))
+JOB_EVENTS_BUFFER = int(os.getenv("JOB_EVENTS_BUFFER", "256"))
+JOB_EVENTS_KEEPALIVE_SECONDS = float(os.getenv("JOB_EVENTS_KEEPALIVE_SECONDS", "15"))
+INSTANCE_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+BLOCKING_WORKERS = int(os.getenv("BLOCKING_WORKERS", str(SCRAPE_CONCURRENCY + AI_CONCURRENCY + 4)))
+STORAGE_WORKERS = int(os.getenv("STORAGE_WORKERS", "8"))
 
 app = FastAPI(
     title="iOS Q&A Scraper API",
@@ -73,8 +72,8 @@ app = FastAPI(
 
 1. **Discover Articles**: `GET /api/discover?count=5`
 2. **Scrape Random**: `POST /api/scrape/random?count=3`
-3. **Scrape Specific**: `POST /api/scrape` with URL
-4. **Check Status**: `GET /api/jobs/{job_id}`
+3. **Scrape Specific**: `POST /api/scrape` with URL (or many: `POST /api/scrape/batch`)
+4. **Check Status**: `GET /api/jobs/{job_id}` (or stream it: `GET /api/jobs/{job_id}/events`)
 5. **Get Results**: `GET /api/jobs/{job_id}/results`
 
 ## API Keys Required
@@ -99,313 +98,539 @@ Set as environment variables: `GROQ_API_KEY`, `FIRECRAWL_API_KEY`, `GEMINI_API_K
     },
 )
 
-# Simple in-memory job queue
-job_queue = asyncio.Queue()
+# Job queue persisted in the jobs table (see DurableJobQueue)
 processing_jobs = {}
 
-# Database helper
-@contextmanager
-def get_db():
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    try:
-        yield conn
-        conn.commit()
-    finally:
-        conn.close()
-
-# Initialize database
-def init_db():
-    with get_db() as conn:
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS jobs (
-                id TEXT PRIMARY KEY,
-                url TEXT NOT NULL,
-                status TEXT NOT NULL,
-                qa_count INTEGER DEFAULT 0,
-                error TEXT,
-                created_at TEXT NOT NULL,
-                completed_at TEXT
-            )
-        ''')
-        
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS qa_pairs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                job_id TEXT NOT NULL,
-                question TEXT NOT NULL,
-                answer TEXT NOT NULL,
-                source_url TEXT NOT NULL,
-                timestamp TEXT NOT NULL
-            )
-        ''')
+class JobEvents:
+    """
+    In-process pub/sub of job updates, feeding /api/jobs/{id}/events.
+
+    Each subscriber gets its own bounded queue; one that stops reading loses
+    its oldest buffered events instead of holding memory or stalling the
+    pipeline. Only call from the event loop (threads use call_soon_threadsafe).
+    """
+
+    def __init__(self, buffer: int = JOB_EVENTS_BUFFER):
+        self.buffer = buffer
+        self.subscribers = {}
+        self.stats = {'published': 0, 'dropped': 0}
+
+    def subscribe(self, job_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.buffer)
+        self.subscribers.setdefault(job_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, job_id: str, queue: asyncio.Queue):
+        queues = self.subscribers.get(job_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[job_id]
+
+    def publish(self, job_id: str, event: str, data: dict):
+        for queue in self.subscribers.get(job_id, ()):
+            if queue.full():
+                queue.get_nowait()
+                self.stats['dropped'] += 1
+            queue.put_nowait((event, data))
+            self.stats['published'] += 1
+
+    def summary(self) -> dict:
+        return {
+            **self.stats,
+            'jobs_watched': len(self.subscribers),
+            'subscribers': sum(len(queues) for queues in self.subscribers.values()),
+        }
+
+job_events = JobEvents()
+
+def set_job_state(job_id: str, replace: bool = False, **state):
+    """Update a job's live state in processing_jobs and push it to event subscribers"""
+    if replace or job_id not in processing_jobs:
+        processing_jobs[job_id] = state
+    else:
+        processing_jobs[job_id].update(state)
+    job_events.publish(job_id, 'status', {'job_id': job_id, **processing_jobs[job_id]})
+
+def publish_qa_pairs(job_id: str, url: str, qa_pairs):
+    """Push newly saved Q&A pairs to event subscribers"""
+    for qa in qa_pairs:
+        job_events.publish(job_id, 'qa', {
+            'job_id': job_id, 'question': qa['question'], 'answer': qa['answer'], 'source_url': url
+        })
+
+# Firecrawl, the AI SDKs, the caches and export encoding are blocking; they
+# run here so the event loop keeps serving requests while jobs are in flight
+blocking_executor = ThreadPoolExecutor(max_workers=BLOCKING_WORKERS, thread_name_prefix="blocking")
+
+# Persistence backend, awaited by endpoints and workers: MongoDB (via Motor) if
+# MONGODB_URI is set, otherwise SQLite on storage_executor (see storage.py).
+# Storage has its own threads so API reads never queue behind scrapes or AI calls
+storage_executor = ThreadPoolExecutor(max_workers=STORAGE_WORKERS, thread_name_prefix="storage")
+storage = open_storage(SIMILARITY_THRESHOLD, storage_executor)
+
+# Pipeline stage queues and metrics (see scrape_worker/extract_worker/persist_worker).
+# Stage worker counts are the per-stage concurrency limits: Firecrawl fetches
+# and AI calls have separate quotas, and SQLite takes one writer at a time
+# (which also keeps dedup of concurrently finishing jobs consistent)
+extract_queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+persist_queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+stage_metrics = {
+    stage: {'workers': workers, 'in_flight': 0, 'processed': 0, 'failed': 0, 'busy_seconds': 0.0}
+    for stage, workers in (('scrape', SCRAPE_CONCURRENCY), ('extract', AI_CONCURRENCY), ('persist', 1))
+}
+pre_extract_stats = {'local': 0, 'llm': 0, 'tokens_saved': 0}
+worker_tasks = []
+
+# Scraped article cache (shared with the firecrawl_simple/monitor scripts via SCRAPE_CACHE_DIR)
+scrape_cache = ScrapeCache()
+
+# Raw LLM completions, so re-extracting unchanged articles costs no tokens.
+# Single-article completions are preferred; a section of a batched one also counts
+llm_cache = LLMCache()
+CACHED_PROMPT_VERSIONS = (PROMPT_VERSION, BATCH_PROMPT_VERSION)
 
-init_db()
+# Routes extraction to the healthiest AI provider; at most AI_CONCURRENCY
+# extraction requests are in flight, however many chunks the workers plan
+ai_router = ProviderRouter()
+ai_requests = asyncio.Semaphore(AI_CONCURRENCY)
 
 # Models
 class UrlSubmission(BaseModel):
     url: HttpUrl
+    reuse_existing: bool = False
 
 class JobResponse(BaseModel):
     job_id: str
     status: str
     message: str
 
+class BatchSubmission(BaseModel):
+    urls: List[str]
+
 # Helper functions
-def normalize_question(q):
-    q = q.lower().strip()
-    return ' '.join(re.sub(r'[^\w\s]', '', q).split())
+async def extract_qa_with_ai(content: str, on_pair=None):
+    """
+    Multi-AI Q&A extraction for one article: a cached completion if there is
+    one, otherwise the healthiest provider (Groq, Gemini, Hugging Face) via ai_router.
+    With on_pair, the completion is streamed and on_pair(qa) is called for
+    each pair as soon as its answer is complete
+    """
+    key = content_hash(content)
+    cached = await run_blocking(llm_cache.get, key, CACHED_PROMPT_VERSIONS, EXTRACTION_MODELS)
+    if cached:
+        provider, model_name, result = cached
+        print(f"⚡ Using cached {provider} completion ({model_name})")
+        return result, provider
+    
+    prompt = build_prompt(content)
+    
+    if on_pair is None:
+        result, provider, model_name = await ai_router.complete(prompt, executor=blocking_executor)
+    else:
+        parser = QAStreamParser()
+
+        def on_text(delta):
+            if delta is None:
+                parser.reset()  # provider failed partway; the next one starts over
+                return
+            for qa in parser.feed(delta):
+                on_pair(qa)
+
+        result, provider, model_name = await ai_router.complete(prompt, on_text, blocking_executor)
+        for qa in parser.close():
+            on_pair(qa)
+
+    await run_blocking(llm_cache.put, key, PROMPT_VERSION, provider, model_name, result)
+    return result, provider
+
+def cached_extractions(contents: List[str]):
+    """Cached (result_text, provider) per content, None where there is none"""
+    results = []
+    for content in contents:
+        cached = llm_cache.get(content_hash(content), CACHED_PROMPT_VERSIONS, EXTRACTION_MODELS)
+        results.append((cached[2], cached[0]) if cached else None)
+    return results
+
+async def extract_qa_group(contents: List[str], on_pair=None):
+    """
+    Extract a planned group of contents in one request: a single content
+    uses the normal prompt (streamed to on_pair if given), several share a
+    batched prompt. Returns one (result_text, provider) per content
+    """
+    if len(contents) == 1:
+        return [await extract_qa_with_ai(contents[0], on_pair)]
+
+    print(f"📦 Extracting {len(contents)} articles in one request")
+    result, provider, model_name = await ai_router.complete(build_batch_prompt(contents), executor=blocking_executor)
+    results = []
+    for content, section in zip(contents, split_batch_output(result, len(contents))):
+        if section is None:
+            # The model dropped this article; extract it on its own
+            results.append(await extract_qa_with_ai(content))
+            continue
+        await run_blocking(llm_cache.put, content_hash(content), BATCH_PROMPT_VERSION, provider, model_name, section)
+        results.append((section, provider))
+    return results
+
+async def extract_articles(contents: List[str], on_pair=None, on_progress=None):
+    """
+    Extract Q&A from several articles at once. Long articles are chunked
+    (see qa_extract.chunk_markdown), short chunks are packed into shared
+    requests sized to the best provider's prompt budget, and the requests
+    run concurrently, up to AI_CONCURRENCY at a time across all workers.
+    Articles the local pre-extractor parses confidently skip the LLM.
+    Returns (qa_pairs, providers) per article, in order, or the exception
+    that failed one of the article's requests.
+
+    Callbacks: on_pair(article, qa) for pairs streamed from unbatched
+    requests, called as they arrive, from executor threads or the event
+    loop (they are also in the returned results); on_progress(article,
+    chunks_done, chunks_total) on the event loop as chunks finish
+    """
+    local = await run_blocking(pre_extract_articles, contents)
+
+    chunks, owners = [], []
+    for article, content in enumerate(contents):
+        if local[article] is not None:
+            continue
+        for chunk in chunk_markdown(content):
+            chunks.append(chunk)
+            owners.append(article)
+
+    results = await run_blocking(cached_extractions, chunks)
+    pending = [index for index, result in enumerate(results) if result is None]
+
+    chunks_total = [owners.count(article) for article in range(len(contents))]
+    chunks_done = [0] * len(contents)
+
+    def chunk_finished(index):
+        article = owners[index]
+        chunks_done[article] += 1
+        if on_progress:
+            on_progress(article, chunks_done[article], chunks_total[article])
+
+    for index, result in enumerate(results):
+        if result is not None:
+            chunk_finished(index)
+
+    async def extract_group(group):
+        stream_to = None
+        if on_pair and len(group) == 1:
+            stream_to = functools.partial(on_pair, owners[group[0]])
+        async with ai_requests:
+            extracted = await extract_qa_group([chunks[i] for i in group], stream_to)
+        for index in group:
+            chunk_finished(index)
+        return extracted
+
+    if pending:
+        budget = prompt_token_budget(ai_router.ranked()[0][0])
+        groups = [
+            [pending[i] for i in group]
+            for group in plan_batches([chunks[i] for i in pending], budget, EXTRACTION_BATCH_SIZE)
+        ]
+        # A request that fails on every provider only fails the articles in it
+        group_results = await asyncio.gather(*(extract_group(group) for group in groups), return_exceptions=True)
+        for group, extracted in zip(groups, group_results):
+            if isinstance(extracted, Exception):
+                extracted = [extracted] * len(group)
+            for index, result in zip(group, extracted):
+                results[index] = result
+
+    per_article = [([], set()) for _ in contents]
+    failed = {}
+    for article, result in zip(owners, results):
+        if isinstance(result, Exception):
+            failed.setdefault(article, result)
+            continue
+        result_text, provider = result
+        chunk_pairs, providers = per_article[article]
+        providers.add(provider)
+        if "NO_IOS_QA" not in result_text:
+            chunk_pairs.append(parse_qa_pairs(result_text))
+    return [
+        failed.get(article) or local[article] or (merge_qa_pairs(chunk_pairs), providers)
+        for article, (chunk_pairs, providers) in enumerate(per_article)
+    ]
 
-def calculate_similarity(q1, q2):
-    q1_norm = normalize_question(q1)
-    q2_norm = normalize_question(q2)
+def pre_extract_articles(contents: List[str]):
+    """(qa_pairs, {'local'}) for articles the rule-based extractor is confident about, else None"""
+    results = []
+    for content in contents:
+        qa_pairs, confidence = pre_extract(content)
+        if confidence >= PRE_EXTRACT_MIN_CONFIDENCE:
+            pre_extract_stats['local'] += 1
+            pre_extract_stats['tokens_saved'] += sum(
+                estimate_tokens(build_prompt(chunk)) + MAX_COMPLETION_TOKENS['groq']
+                for chunk in chunk_markdown(content)
+            )
+            print(f"📐 Parsed {len(qa_pairs)} Q&A locally (confidence {confidence:.2f}), skipping AI")
+            results.append((qa_pairs, {'local'}))
+        else:
+            pre_extract_stats['llm'] += 1
+            results.append(None)
+    return results
+
+async def scrape_article(url: str) -> str:
+    """Article markdown, from the scrape cache or Firecrawl (waiting for Firecrawl quota on the event loop)"""
+    entry = await run_blocking(scrape_cache.get, url)
+    if entry is not None:
+        return entry['markdown']
+    await get_limiter('firecrawl').acquire_async()
+    content = await run_blocking(scrape_with_firecrawl, url)
+    await run_blocking(scrape_cache.put, url, content)
+    return content
+
+def scrape_with_firecrawl(url: str) -> str:
+    """Scrape one article with Firecrawl (blocking; the caller takes the Firecrawl quota)"""
+    app_fc = clients.firecrawl(FIRECRAWL_API_KEY)
+    result = app_fc.scrape_url(url, params={'formats': ['markdown']})
     
-    if q1_norm == q2_norm:
-        return 1.0
+    if not result or 'markdown' not in result:
+        raise Exception("Failed to scrape or no content returned")
     
-    words1 = set(q1_norm.split())
-    words2 = set(q2_norm.split())
+    # Extract content from Firecrawl result (dictionary)
+    content = result.get('markdown') or result.get('content') or ''
     
-    if not words1 or not words2:
-        return 0.0
+    if not content:
+        raise Exception("No content extracted")
     
-    return len(words1.intersection(words2)) / len(words1.union(words2))
+    return content
+
+async def batch_status(batch_id: str):
+    """Aggregate status of a batch's jobs, or None if there is no such batch"""
+    rows = await storage.batch_groups(batch_id)
+    if not rows:
+        return None
+
+    counts = {status: 0 for status in ('queued', 'processing', 'completed', 'failed')}
+    counts.update({row['status']: row['jobs'] for row in rows})
+    total = sum(counts.values())
+    finished = counts['completed'] + counts['failed']
+    return {
+        'batch_id': batch_id,
+        'status': 'completed' if finished == total else 'processing',
+        'total_jobs': total,
+        'jobs': counts,
+        'progress': round(finished / total * 100, 1),
+        'qa_pairs': sum(row['qa_pairs'] for row in rows),
+        'created_at': min(row['created_at'] for row in rows),
+        'completed_at': max(row['completed_at'] for row in rows if row['completed_at']) if finished == total else None,
+    }
 
-def is_duplicate(question, threshold=0.7):
-    with get_db() as conn:
-        existing = conn.execute('SELECT question FROM qa_pairs').fetchall()
-        for row in existing:
-            if calculate_similarity(question, row[0]) >= threshold:
-                return True
-    return False
+async def run_blocking(func, *args):
+    """Run a blocking call (SDKs, parsing, export encoding) on the bounded executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(blocking_executor, functools.partial(func, *args))
 
-def extract_qa_with_ai(content: str):
+# Durable job queue: the jobs table (collection) is the queue. Workers claim
+# a queued job with a lease that they keep renewing; if the process dies, the
+# lease runs out and the job goes back to 'queued' (or is failed after MAX_JOB_ATTEMPTS)
+async def claim_next_job():
+    """Lease the oldest queued job for this instance -> (job_id, url) or None"""
+    return await storage.claim_next_job(INSTANCE_ID, JOB_LEASE_SECONDS)
+
+async def renew_leases():
+    """Extend the leases of every job this instance is working on"""
+    await storage.renew_leases(INSTANCE_ID, JOB_LEASE_SECONDS)
+
+async def recover_expired_jobs() -> int:
+    """Requeue jobs whose lease ran out; fail those out of attempts"""
+    return await storage.recover_expired_jobs(MAX_JOB_ATTEMPTS)
+
+class DurableJobQueue:
     """
-    Multi-AI fallback system for Q&A extraction
-    Tries: Groq → Gemini → Hugging Face
+    asyncio-facing view of the jobs-table queue used by the scrape stage.
+    Idle workers claim one at a time: each claim is a write (a single
+    writer on SQLite), and concurrent ones would fill storage_executor
+    and delay API reads while finding nothing more to do
     """
-    prompt = f"""Extract iOS/Swift interview questions and answers from this article. Be thorough and intelligent in finding answers.
 
-ANSWER EXTRACTION RULES:
-1. Look for EXPLICIT answers (direct Q&A format)
-2. Look for IMPLICIT answers (discussions, explanations, context about the topic)
-3. If a question is asked, search the ENTIRE article for related information
-4. Summarize relevant paragraphs as answers
-5. Extract code examples or technical explanations as answers
-6. If discussing a concept, that discussion IS the answer
-7. Only use "Answer not provided" if there's truly NO relevant information
+    def __init__(self):
+        self._wakeup = asyncio.Event()
+        self._claiming = asyncio.Lock()
 
-FORMAT:
-Q: [question]
-A: [answer - can be a summary, explanation, or discussion from the article]
+    async def put(self, item):
+        """Wake a worker; the job row itself is inserted by the caller"""
+        self._wakeup.set()
 
-CONTENT TYPES TO EXTRACT:
-- Interview questions with answers
-- Technical questions with explanations
-- Conceptual questions with discussions
-- Architecture/design questions with reasoning
-- Best practices with explanations
-- Common mistakes with solutions
+    async def get(self):
+        while True:
+            async with self._claiming:
+                self._wakeup.clear()
+                claimed = await claim_next_job()
+            if claimed:
+                return claimed
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=QUEUE_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
 
-QUALITY RULES:
-- ONLY iOS/Swift/SwiftUI/UIKit/Xcode/Apple platform content
-- Answers should be 1-3 sentences (concise but complete)
-- Include code snippets if relevant
-- If NO iOS questions found at all, return "NO_IOS_QA"
+    def task_done(self):
+        pass
 
-Article:
-{content}
+    async def qsize(self) -> int:
+        return await storage.count_queued_jobs()
 
-Q&A Pairs:"""
-    
-    errors = []
-    
-    # Try 1: Groq (Primary - Fastest, Best Quality)
+async def lease_keeper():
+    """Renew our leases and requeue expired ones from crashed workers"""
+    while True:
+        await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+        try:
+            await renew_leases()
+            if await recover_expired_jobs():
+                await job_queue.put(None)
+        except Exception as e:
+            print(f"⚠️  Lease maintenance failed: {e}")
+
+job_queue = DurableJobQueue()
+
+@asynccontextmanager
+async def track_stage(stage: str):
+    """Record in-flight count, throughput and busy time for a pipeline stage"""
+    metrics = stage_metrics[stage]
+    metrics['in_flight'] += 1
+    started = time.perf_counter()
     try:
-        print("🚀 Trying Groq AI...")
-        client = Groq(api_key=GROQ_API_KEY)
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.3,
-            max_tokens=3000,
-            timeout=30
-        )
-        result = response.choices[0].message.content.strip()
-        print("✅ Groq succeeded!")
-        return result, "groq"
-    except Exception as e:
-        error_msg = str(e)
-        errors.append(f"Groq: {error_msg[:100]}")
-        print(f"❌ Groq failed: {error_msg[:100]}")
-        
-        # Check if it's a rate limit error
-        if "rate limit" in error_msg.lower() or "429" in error_msg:
-            print("⚠️  Groq rate limited, trying Gemini...")
-    
-    # Try 2: Google Gemini (Backup - More capacity, high quality)
-    if GEMINI_AVAILABLE and GEMINI_API_KEY and GEMINI_API_KEY != "your-gemini-api-key-here":
+        yield
+        metrics['processed'] += 1
+    except Exception:
+        metrics['failed'] += 1
+        raise
+    finally:
+        metrics['in_flight'] -= 1
+        metrics['busy_seconds'] += time.perf_counter() - started
+
+async def fail_job(job_id: str, error: Exception):
+    """Mark a job failed in the database and in memory"""
+    await storage.update_job_status(job_id, 'failed', str(error))
+    set_job_state(job_id, replace=True, status='failed', error=str(error))
+
+# Job pipeline:
+#   job_queue -> scrape -> extract_queue -> extract -> persist_queue -> persist
+# Bounded queues give backpressure: when extraction falls behind, scrapers
+# block on put() instead of piling articles up in memory.
+async def scrape_worker():
+    """Stage 1: fetch article markdown with Firecrawl"""
+    while True:
+        job_id, url = await job_queue.get()
         try:
-            print("🔷 Trying Google Gemini...")
-            genai.configure(api_key=GEMINI_API_KEY)
-            # Try multiple model names (Google keeps changing them!)
-            for model_name in ['gemini-1.5-flash', 'gemini-pro', 'gemini-1.0-pro']:
-                try:
-                    print(f"   Trying model: {model_name}...")
-                    model = genai.GenerativeModel(model_name)
-                    response = model.generate_content(prompt)
-                    result = response.text.strip()
-                    print(f"✅ Gemini succeeded with model: {model_name}!")
-                    return result, "gemini"
-                except Exception as model_error:
-                    print(f"   {model_name} failed: {str(model_error)[:100]}")
-                    continue
-            # If all models failed, raise the last error
-            raise Exception("All Gemini model names failed")
+            async with track_stage('scrape'):
+                set_job_state(job_id, replace=True, status='processing', stage='scrape', progress=0, qa_count=0)
+                content = await scrape_article(url)
+            set_job_state(job_id, stage='extract', progress=50)
+            await extract_queue.put((job_id, url, content))
         except Exception as e:
-            error_msg = str(e)
-            errors.append(f"Gemini: {error_msg[:100]}")
-            print(f"❌ Gemini failed: {error_msg[:100]}")
-    
-    # Try 3: Hugging Face (Final backup)
-    if HUGGINGFACE_AVAILABLE and HUGGINGFACE_API_KEY and HUGGINGFACE_API_KEY != "your-hf-api-key-here":
+            await fail_job(job_id, e)
+        finally:
+            job_queue.task_done()
+
+async def extract_worker():
+    """
+    Stage 2: extract and parse Q&A with AI (with fallback). Articles already
+    waiting in the queue are taken together (up to EXTRACTION_BATCH_SIZE) so
+    short ones can share a request
+    """
+    while True:
+        items = [await extract_queue.get()]
+        while len(items) < EXTRACTION_BATCH_SIZE and not extract_queue.empty():
+            items.append(extract_queue.get_nowait())
+        loop = asyncio.get_running_loop()
+        streamed = [set() for _ in items]  # normalized questions already persisted
+        saves = [[] for _ in items]  # their pending inserts
+
+        def on_pair(article, qa):
+            # Executor thread: hand the insert to the event loop and keep parsing
+            job_id, url, _ = items[article]
+            streamed[article].add(normalize_question(qa['question']))
+            saves[article].append(asyncio.run_coroutine_threadsafe(save_streamed_pair(job_id, url, qa), loop))
+
+        def on_progress(article, done, total):
+            set_job_state(items[article][0], progress=50 + 25 * done // total)
+
         try:
-            print("🤗 Trying Hugging Face...")
-            headers = {"Authorization": f"Bearer {HUGGINGFACE_API_KEY}"}
-            payload = {
-                "inputs": prompt,
-                "parameters": {"max_new_tokens": 2000, "temperature": 0.3}
-            }
-            response = requests.post(
-                "https://api-inference.huggingface.co/models/mistralai/Mistral-7B-Instruct-v0.2",
-                headers=headers,
-                json=payload,
-                timeout=60
-            )
-            
-            if response.status_code == 200:
-                result = response.json()[0]['generated_text'].strip()
-                print("✅ Hugging Face succeeded!")
-                return result, "huggingface"
-            else:
-                errors.append(f"HuggingFace: HTTP {response.status_code}")
-                print(f"❌ Hugging Face failed: HTTP {response.status_code}")
+            async with track_stage('extract'):
+                results = await extract_articles([content for _, _, content in items], on_pair, on_progress)
         except Exception as e:
-            error_msg = str(e)
-            errors.append(f"HuggingFace: {error_msg[:100]}")
-            print(f"❌ Hugging Face failed: {error_msg[:100]}")
-    
-    # All AI providers failed
-    raise Exception(f"All AI providers failed: {' | '.join(errors)}")
+            results = [e] * len(items)
 
-async def process_job(job_id: str, url: str):
-    """Process a scraping job"""
-    try:
-        # Update status
-        with get_db() as conn:
-            conn.execute('UPDATE jobs SET status = ? WHERE id = ?', ('processing', job_id))
-        
-        processing_jobs[job_id] = {'status': 'processing', 'progress': 0}
-        
-        # Scrape with Firecrawl
-        app_fc = FirecrawlApp(api_key=FIRECRAWL_API_KEY)
-        result = app_fc.scrape_url(url, params={'formats': ['markdown']})
-        
-        if not result or 'markdown' not in result:
-            raise Exception("Failed to scrape or no content returned")
-        
-        # Extract content from Firecrawl result (dictionary)
-        content = result.get('markdown') or result.get('content') or ''
-        
-        if not content:
-            raise Exception("No content extracted")
-        
-        processing_jobs[job_id]['progress'] = 50
-        
-        # Extract Q&A with AI (with fallback)
-        content = content[:15000]
-        result_text, ai_provider = extract_qa_with_ai(content)
-        
-        print(f"✅ Used AI provider: {ai_provider}")
-        
-        if "NO_IOS_QA" in result_text:
-            with get_db() as conn:
-                conn.execute('''
-                    UPDATE jobs SET status = ?, completed_at = ?, qa_count = ? 
-                    WHERE id = ?
-                ''', ('completed', datetime.now().isoformat(), 0, job_id))
-            return
-        
-        # Parse Q&A
-        qa_pairs = []
-        lines = result_text.split('\n')
-        current_q = None
-        current_a = None
-        
-        for line in lines:
-            line = line.strip()
-            if line.startswith('Q:'):
-                if current_q:
-                    qa_pairs.append({
-                        'question': current_q,
-                        'answer': current_a or "Answer not provided"
-                    })
-                current_q = line[2:].strip()
-                current_a = None
-            elif line.startswith('A:'):
-                current_a = line[2:].strip()
-            elif current_a and line:
-                current_a += " " + line
-        
-        if current_q:
-            qa_pairs.append({
-                'question': current_q,
-                'answer': current_a or "Answer not provided"
-            })
-        
-        processing_jobs[job_id]['progress'] = 75
-        
-        # Deduplicate and save
-        new_count = 0
-        with get_db() as conn:
-            for qa in qa_pairs:
-                if not is_duplicate(qa['question']):
-                    conn.execute('''
-                        INSERT INTO qa_pairs (job_id, question, answer, source_url, timestamp)
-                        VALUES (?, ?, ?, ?, ?)
-                    ''', (job_id, qa['question'], qa['answer'], url, datetime.now().isoformat()))
-                    new_count += 1
-            
-            conn.execute('''
-                UPDATE jobs SET status = ?, completed_at = ?, qa_count = ? 
-                WHERE id = ?
-            ''', ('completed', datetime.now().isoformat(), new_count, job_id))
-        
-        processing_jobs[job_id] = {'status': 'completed', 'progress': 100, 'qa_count': new_count}
-        
-    except Exception as e:
-        with get_db() as conn:
-            conn.execute('''
-                UPDATE jobs SET status = ?, error = ?, completed_at = ? 
-                WHERE id = ?
-            ''', ('failed', str(e), datetime.now().isoformat(), job_id))
-        processing_jobs[job_id] = {'status': 'failed', 'error': str(e)}
+        # Each article completes or fails on its own
+        for article, ((job_id, url, _), result) in enumerate(zip(items, results)):
+            try:
+                # Streamed pairs must be stored before the job completes or fails
+                await asyncio.gather(*(asyncio.wrap_future(save) for save in saves[article]))
+                if isinstance(result, Exception):
+                    raise result
+                qa_pairs, ai_providers = result
+                print(f"✅ Used AI provider: {', '.join(sorted(ai_providers))}")
+                qa_pairs = [qa for qa in qa_pairs if normalize_question(qa['question']) not in streamed[article]]
+                set_job_state(job_id, stage='persist', progress=75)
+                await persist_queue.put((job_id, url, qa_pairs))
+            except Exception as e:
+                await fail_job(job_id, e)
+            finally:
+                extract_queue.task_done()
+
+# Streamed pairs are deduplicated one at a time, as if by a single writer
+streamed_pairs_lock = asyncio.Lock()
+
+async def save_streamed_pair(job_id: str, url: str, qa):
+    """Deduplicate and store one streamed Q&A pair, then bump the live count"""
+    async with streamed_pairs_lock:
+        if await storage.save_qa_pair(job_id, url, qa):
+            count_streamed_pair(job_id, url, qa)
+
+def count_streamed_pair(job_id: str, url: str, qa):
+    job = processing_jobs.get(job_id)
+    if job is not None:
+        publish_qa_pairs(job_id, url, [qa])
+        set_job_state(job_id, qa_count=job.get('qa_count', 0) + 1)
+
+async def persist_worker():
+    """Stage 3: deduplicate and save (a single worker keeps SQLite to one writer)"""
+    while True:
+        job_id, url, qa_pairs = await persist_queue.get()
+        try:
+            async with track_stage('persist'):
+                qa_count, inserted = await storage.save_qa_pairs(job_id, url, qa_pairs)
+            publish_qa_pairs(job_id, url, inserted)
+            set_job_state(job_id, replace=True, status='completed', progress=100, qa_count=qa_count)
+        except Exception as e:
+            await fail_job(job_id, e)
+        finally:
+            persist_queue.task_done()
+
+async def pipeline_stats():
+    """Per-stage metrics plus the depth of the queue feeding each stage"""
+    depths = {'scrape': await job_queue.qsize(), 'extract': extract_queue.qsize(), 'persist': persist_queue.qsize()}
+    return {
+        stage: {
+            **metrics,
+            'busy_seconds': round(metrics['busy_seconds'], 3),
+            'avg_seconds': round(metrics['busy_seconds'] / metrics['processed'], 3) if metrics['processed'] else None,
+            'queue_depth': depths[stage],
+        }
+        for stage, metrics in stage_metrics.items()
+    }
 
 # Random Article Discovery
-def get_processed_urls():
+async def get_processed_urls():
     """Get all URLs that have already been processed"""
     try:
-        with get_db() as conn:
-            rows = conn.execute('SELECT DISTINCT url FROM jobs WHERE status = "completed"').fetchall()
-            return set(row[0] for row in rows)
+        return await storage.get_processed_urls()
     except Exception as e:
         print(f"Error fetching processed URLs: {e}")
         return set()
 
-def discover_random_ios_articles(count=5):
-    """Discover random iOS articles from Medium with curated fallback"""
-    # Get already processed URLs to avoid duplicates
-    processed_urls = get_processed_urls()
+async def discover_new_articles(count: int):
+    """Unprocessed iOS article URLs (discovery blocks, so it runs on blocking_executor)"""
+    processed_urls = await get_processed_urls()
+    await get_limiter('firecrawl').acquire_async()  # for the Firecrawl Map call
+    return await run_blocking(discover_random_ios_articles, processed_urls, count)
+
+def discover_random_ios_articles(processed_urls, count=5):
+    """Discover random iOS articles from Medium with curated fallback, skipping processed_urls"""
     print(f"📊 Already processed {len(processed_urls)} URLs")
     
     # Curated list of iOS interview and tutorial articles
@@ -458,7 +683,7 @@ def discover_random_ios_articles(count=5):
     new_urls = []
     try:
         print("🔍 Trying Firecrawl Map for discovery...")
-        app_fc = FirecrawlApp(api_key=FIRECRAWL_API_KEY)
+        app_fc = clients.firecrawl(FIRECRAWL_API_KEY)
         
         search_urls = [
             "https://medium.com/tag/ios-app-development",
@@ -500,21 +725,59 @@ def discover_random_ios_articles(count=5):
     print("⚠️  All curated URLs already processed!")
     # If all curated processed, just return some anyway (user can handle duplicates)
     random.shuffle(curated_urls)
-    print(f"ℹ️  Returning random curated URLs (may be duplicates)")
+    print("ℹ️  Returning random curated URLs (may be duplicates)")
     return curated_urls[:count]
 
-# Background worker
-async def job_worker():
-    """Simple background worker"""
-    while True:
-        job_id, url = await job_queue.get()
-        await process_job(job_id, url)
-        job_queue.task_done()
-
 @app.on_event("startup")
 async def startup_event():
-    """Start background worker on startup"""
-    asyncio.create_task(job_worker())
+    """Recover unfinished jobs, then start the pipeline stage workers"""
+    recovered = await recover_expired_jobs()
+    if recovered:
+        print(f"♻️  Requeued {recovered} jobs left unfinished by a previous run")
+    worker_tasks.append(asyncio.create_task(lease_keeper()))
+    if CLIENT_WARMUP:
+        # In the background: an unreachable host must not delay startup
+        services = [name for name, _ in ai_router.providers if name in WARMUP_URLS]
+        if FIRECRAWL_API_KEY != "your-firecrawl-api-key-here":
+            services.append('firecrawl')
+        worker_tasks.append(asyncio.create_task(run_blocking(clients.warm_up, services)))
+    for stage, worker in (('scrape', scrape_worker), ('extract', extract_worker), ('persist', persist_worker)):
+        for _ in range(stage_metrics[stage]['workers']):
+            worker_tasks.append(asyncio.create_task(worker()))
+    print(f"👷 Pipeline started (scrape: {SCRAPE_CONCURRENCY}, extract: {AI_CONCURRENCY}, persist: 1 workers)")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop workers and blocking work on shutdown"""
+    for task in worker_tasks:
+        task.cancel()
+    blocking_executor.shutdown(wait=False, cancel_futures=True)
+    storage_executor.shutdown(wait=False, cancel_futures=True)
+    storage.close()
+    llm_cache.close()
+    clients.close()
+
+# Pagination helpers
+def encode_cursor(*values) -> str:
+    """Opaque pagination cursor for a keyset position"""
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """Keyset position of `size` ids/timestamps from a cursor; 400 if it is not one"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except ValueError:
+        values = None
+    if (not isinstance(values, list) or len(values) != size
+            or not all(isinstance(value, (str, int)) and not isinstance(value, bool) for value in values)):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+def check_page(limit: Optional[int], offset: int = 0):
+    if limit is not None and limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be at least 1")
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="offset must not be negative")
 
 # API Endpoints
 @app.get("/", response_class=HTMLResponse, tags=["System"])
@@ -592,20 +855,22 @@ async def submit_scrape(submission: UrlSubmission, background_tasks: BackgroundT
     https://medium.com/@user/ios-interview-questions-guide
     ```
     
-    **Returns:** Job ID to track the scraping progress
+    **Returns:** Job ID to track the scraping progress. Submitting a URL
+    again scrapes it again (the scrape cache keeps that cheap); with
+    `"reuse_existing": true`, a URL that already has a queued, processing or
+    completed job (after canonicalization) returns that job instead
     """
-    import uuid
-    job_id = str(uuid.uuid4())
-    
-    # Create job
-    with get_db() as conn:
-        conn.execute('''
-            INSERT INTO jobs (id, url, status, created_at)
-            VALUES (?, ?, ?, ?)
-        ''', (job_id, str(submission.url), 'queued', datetime.now().isoformat()))
-    
+    if submission.reuse_existing:
+        [(url, job_id, created)] = await storage.create_jobs([str(submission.url)])
+        if not created:
+            job = await storage.get_job(job_id)
+            return JobResponse(job_id=job_id, status=job['status'], message="URL already submitted")
+    else:
+        url = str(submission.url)
+        job_id = await storage.create_job(str(uuid.uuid4()), url)
+
     # Queue job
-    await job_queue.put((job_id, str(submission.url)))
+    await job_queue.put((job_id, url))
     
     return JobResponse(
         job_id=job_id,
@@ -613,6 +878,64 @@ async def submit_scrape(submission: UrlSubmission, background_tasks: BackgroundT
         message="Job submitted successfully"
     )
 
+@app.post("/api/scrape/batch", tags=["Scraping"])
+async def submit_scrape_batch(submission: BatchSubmission):
+    """
+    ## 📦 Submit Many URLs at Once
+    
+    Queue up to `MAX_BATCH_URLS` (default 5000) Medium URLs in one request.
+    
+    URLs are canonicalized (tracking parameters, fragments and trailing
+    slashes removed) and deduplicated: a URL that already has a queued,
+    processing or completed job reuses that job. Invalid URLs are reported
+    and skipped.
+    
+    **Body:** `{"urls": ["https://medium.com/...", ...]}`
+    
+    **Returns:** A `batch_id` for `GET /api/scrape/batch/{batch_id}`, counts
+    of created and reused jobs, and the job ID for every URL
+    """
+    if len(submission.urls) > MAX_BATCH_URLS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_URLS} URLs per batch")
+
+    valid, invalid = [], []
+    for url in submission.urls:
+        parts = urlsplit(url.strip())
+        (valid if parts.scheme in ('http', 'https') and parts.netloc else invalid).append(url)
+    if not valid:
+        raise HTTPException(status_code=400, detail="No valid URLs submitted")
+
+    batch_id = str(uuid.uuid4())
+    jobs = await storage.create_jobs(valid, batch_id)
+    created = sum(1 for _, _, is_new in jobs if is_new)
+    if created:
+        await job_queue.put(None)  # one wakeup: workers claim from the jobs table
+
+    return {
+        "batch_id": batch_id,
+        "message": f"Queued {created} new jobs ({len(jobs) - created} already known)",
+        "created": created,
+        "duplicates": len(jobs) - created,
+        "invalid": invalid,
+        "jobs": [{"job_id": job_id, "url": url, "created": is_new} for url, job_id, is_new in jobs]
+    }
+
+@app.get("/api/scrape/batch/{batch_id}", tags=["Scraping", "Jobs"])
+async def get_batch_status(batch_id: str):
+    """
+    ## 📦 Batch Status
+    
+    Aggregate status of the jobs in a batch.
+    
+    **Returns:** Job counts by status (`queued`, `processing`, `completed`,
+    `failed`), overall `progress` (% of jobs finished), Q&A pairs collected,
+    and `status` (`completed` once every job has finished)
+    """
+    status = await batch_status(batch_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return status
+
 @app.post("/api/scrape/random", tags=["Scraping", "Discovery"])
 async def scrape_random_articles(background_tasks: BackgroundTasks, count: int = 1):
     """
@@ -631,13 +954,11 @@ async def scrape_random_articles(background_tasks: BackgroundTasks, count: int =
     
     **Example:** `POST /api/scrape/random?count=3`
     """
-    import uuid
-    
     # Validate count
     count = max(1, min(count, 10))
     
     # Discover random articles
-    urls = discover_random_ios_articles(count)
+    urls = await discover_new_articles(count)
     
     if not urls:
         raise HTTPException(
@@ -645,21 +966,10 @@ async def scrape_random_articles(background_tasks: BackgroundTasks, count: int =
             detail="Failed to discover articles. This is unusual - please check logs or try again."
         )
     
-    # Create jobs for each URL
-    job_ids = []
-    for url in urls:
-        job_id = str(uuid.uuid4())
-        
-        # Create job
-        with get_db() as conn:
-            conn.execute('''
-                INSERT INTO jobs (id, url, status, created_at)
-                VALUES (?, ?, ?, ?)
-            ''', (job_id, url, 'queued', datetime.now().isoformat()))
-        
-        # Queue job
-        await job_queue.put((job_id, url))
-        job_ids.append({"job_id": job_id, "url": url})
+    # Create jobs for all URLs in one transaction, then wake the scrapers
+    jobs = await storage.create_jobs(urls)
+    await job_queue.put(None)
+    job_ids = [{"job_id": job_id, "url": url} for url, job_id, _ in jobs]
     
     return {
         "message": f"Submitted {len(job_ids)} random articles for scraping",
@@ -683,7 +993,7 @@ async def discover_articles(count: int = 5):
     **Example:** `GET /api/discover?count=10`
     """
     count = max(1, min(count, 20))
-    urls = discover_random_ios_articles(count)
+    urls = await discover_new_articles(count)
     
     return {
         "count": len(urls),
@@ -704,66 +1014,220 @@ async def get_job_status(job_id: str):
     - `completed` - Finished successfully
     - `failed` - Error occurred
     
-    **Returns:** Job details including status, Q&A count, and errors (if any)
+    **Returns:** Job details including status, Q&A count, and errors (if any).
+    While a job is processing on this instance, also its `stage` and `progress`
+    (0-100), and the live `qa_count` of pairs saved so far
     """
-    with get_db() as conn:
-        row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
-        
-        if not row:
-            raise HTTPException(status_code=404, detail="Job not found")
-        
-        return dict(row)
+    job = await read_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+async def read_job(job_id: str):
+    """A job's row with live stage/progress/qa_count merged in, or None"""
+    job = await storage.get_job(job_id)
+    if not job:
+        return None
+    live = processing_jobs.get(job_id)
+    if live and job['status'] == 'processing':
+        job.update(
+            stage=live.get('stage'),
+            progress=live.get('progress'),
+            qa_count=live.get('qa_count', job['qa_count'])
+        )
+    return job
+
+def sse_message(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def iter_job_events(job_id: str, job: dict, queue: asyncio.Queue):
+    """SSE stream: the current state, then live updates until the job finishes"""
+    try:
+        yield sse_message('status', {**job, 'job_id': job_id})
+        if job['status'] in ('completed', 'failed'):
+            return
+        while True:
+            try:
+                event, data = await asyncio.wait_for(queue.get(), JOB_EVENTS_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"  # stops proxies closing an idle stream
+                continue
+            yield sse_message(event, data)
+            if event == 'status' and data.get('status') in ('completed', 'failed'):
+                return
+    finally:
+        job_events.unsubscribe(job_id, queue)
+
+@app.get("/api/jobs/{job_id}/events", tags=["Jobs"])
+async def stream_job_events(job_id: str):
+    """
+    ## 📡 Live Job Updates (Server-Sent Events)
+    
+    Stream a job's progress instead of polling `GET /api/jobs/{job_id}`.
+    Costs one database read when the stream opens; after that, updates are
+    pushed from the pipeline as they happen.
+    
+    **Events:**
+    - `status` - Job state: `status`, `stage`, `progress` (0-100), `qa_count`, `error`.
+      Sent first with the current state, then on every change
+    - `qa` - A newly saved Q&A pair (`question`, `answer`, `source_url`)
+    
+    The stream ends after the `completed` or `failed` status. Updates come
+    from the instance processing the job; on a multi-instance deployment,
+    reconnect to read the final state.
+    
+    **Example:** `curl -N /api/jobs/{job_id}/events`, or `new EventSource(...)` in a browser
+    """
+    # Subscribe before reading the row, so no update falls between the two
+    queue = job_events.subscribe(job_id)
+    try:
+        job = await read_job(job_id)
+    except BaseException:
+        job_events.unsubscribe(job_id, queue)
+        raise
+    if job is None:
+        job_events.unsubscribe(job_id, queue)
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return StreamingResponse(
+        iter_job_events(job_id, job, queue),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @app.get("/api/jobs/{job_id}/results", tags=["Jobs", "Q&A"])
-async def get_job_results(job_id: str):
+async def get_job_results(job_id: str, response: Response, limit: Optional[int] = None, cursor: Optional[str] = None):
     """
     ## 📋 Get Extracted Q&A Pairs
-    
+
     Retrieve all the questions and answers extracted from a job.
-    
+
+    **Parameters:**
+    - `limit` - Page size (default: all results)
+    - `cursor` - Value of the `X-Next-Cursor` header from the previous page
+
     **Returns:** Array of Q&A objects containing:
     - `question` - The interview question
     - `answer` - Extracted answer (or context from article)
     - `source_url` - Original Medium article URL
     - `timestamp` - When it was extracted
-    
-    **Note:** Only available for completed jobs
+
+    **Headers:** `X-Total-Count` (Q&A saved by the job), `X-Next-Cursor` (when more pages exist)
+
+    **Note:** Pairs appear as soon as they are extracted, before the job completes
     """
-    with get_db() as conn:
-        rows = conn.execute('''
-            SELECT question, answer, source_url, timestamp 
-            FROM qa_pairs WHERE job_id = ?
-        ''', (job_id,)).fetchall()
-        
-        return [dict(row) for row in rows]
+    check_page(limit)
+    try:
+        page = await storage.get_job_results(job_id, limit, decode_cursor(cursor, 1) if cursor else None)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    response.headers['X-Total-Count'] = str(page['total'])
+    if page['next_cursor']:
+        response.headers['X-Next-Cursor'] = encode_cursor(*page['next_cursor'])
+    return page['qa_pairs']
 
 @app.get("/api/qa", tags=["Q&A"])
-async def get_all_qa(limit: int = 50, offset: int = 0):
+async def get_all_qa(response: Response, limit: int = 50, offset: int = 0, cursor: Optional[str] = None):
     """
     ## 📚 Get All Q&A Pairs (Master Database)
-    
-    Retrieve all collected iOS interview Q&A pairs from the database.
-    
+
+    Retrieve all collected iOS interview Q&A pairs from the database, newest first.
+
     **Parameters:**
     - `limit` - Number of results per page (default: 50)
-    - `offset` - Pagination offset (default: 0)
-    
-    **Returns:** 
+    - `cursor` - Value of the `X-Next-Cursor` header from the previous page
+    - `offset` - Legacy offset pagination (default: 0); slow for deep pages, prefer `cursor`
+
+    **Returns:**
     - Array of all Q&A pairs across all scraped articles
-    - Total count
-    - Pagination info
-    
-    **Example:** `GET /api/qa?limit=100&offset=0`
-    """
-    with get_db() as conn:
-        rows = conn.execute('''
-            SELECT question, answer, source_url, timestamp 
-            FROM qa_pairs 
-            ORDER BY timestamp DESC 
-            LIMIT ? OFFSET ?
-        ''', (limit, offset)).fetchall()
-        
-        return [dict(row) for row in rows]
+    - `X-Total-Count` header - Total count
+    - `X-Next-Cursor` header - Cursor for the next page (absent on the last page)
+
+    **Example:** `GET /api/qa?limit=100`, then `GET /api/qa?limit=100&cursor=...`
+    """
+    check_page(limit, offset)
+    try:
+        page = await storage.get_all_qa(limit, offset, decode_cursor(cursor, 2) if cursor else None)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    response.headers['X-Total-Count'] = str(page['total'])
+    if page['next_cursor']:
+        response.headers['X-Next-Cursor'] = encode_cursor(*page['next_cursor'])
+    return page['qa_pairs']
+
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv', 'csv'),
+    'chat_jsonl': ('application/x-ndjson', 'jsonl'),
+}
+
+def format_qa_batch(rows, fmt: str) -> str:
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([row['question'], row['answer'], row['source_url'], row['timestamp']])
+        return buffer.getvalue()
+    if fmt == 'chat_jsonl':
+        return ''.join(
+            json.dumps({'messages': [
+                {'role': 'user', 'content': row['question']},
+                {'role': 'assistant', 'content': row['answer']},
+            ]}, ensure_ascii=False) + '\n'
+            for row in rows
+        )
+    return ''.join(json.dumps(row, ensure_ascii=False) + '\n' for row in rows)
+
+async def iter_qa_export(fmt: str, since: Optional[str], source_url: Optional[str], compress: bool):
+    """Encoded (and optionally gzipped) export chunks; encoding runs on blocking_executor"""
+    compressor = zlib.compressobj(wbits=31) if compress else None  # wbits=31 -> gzip container
+
+    def emit(text):
+        data = text.encode('utf-8')
+        return compressor.compress(data) if compressor else data
+
+    def encode(rows):
+        return emit(format_qa_batch(rows, fmt))
+
+    if fmt == 'csv':
+        yield emit('question,answer,source_url,timestamp\r\n')
+    # Keyset batches of EXPORT_BATCH_SIZE: memory stays constant whatever the corpus size
+    async for rows in storage.iter_qa_batches(since, source_url, EXPORT_BATCH_SIZE):
+        chunk = await run_blocking(encode, rows)
+        if chunk:
+            yield chunk
+    if compressor:
+        yield compressor.flush()
+
+@app.get("/api/qa/export", tags=["Q&A"])
+async def export_qa(format: str = "ndjson", gzip: bool = False, since: Optional[str] = None, source_url: Optional[str] = None):
+    """
+    ## 📦 Export the Full Q&A Corpus
+
+    Stream every Q&A pair, oldest first, without paging. Memory use is constant
+    regardless of corpus size.
+
+    **Parameters:**
+    - `format` - `ndjson` (default), `csv`, or `chat_jsonl` (chat fine-tuning messages)
+    - `gzip` - Compress the download (default: false)
+    - `since` - Only pairs with `timestamp >= since` (ISO 8601)
+    - `source_url` - Only pairs extracted from this article
+
+    **Example:** `GET /api/qa/export?format=csv&gzip=true&since=2024-01-01`
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+
+    media_type, extension = EXPORT_FORMATS[format]
+    filename = f"ios_qa_export.{extension}"
+    if gzip:
+        media_type, filename = "application/gzip", filename + ".gz"
+
+    return StreamingResponse(
+        iter_qa_export(format, since, source_url, gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 @app.get("/api/stats", tags=["System"])
 async def get_stats():
@@ -779,24 +1243,24 @@ async def get_stats():
     - Unique articles scraped
     - System health
     
+    Job and Q&A totals come from maintained counters. On SQLite, triggers
+    keep them exact. On MongoDB they are best-effort: a crash between a
+    write and its counter update leaves them off until
+    `python database_mongo.py reconcile` runs (schedule it periodically).
+    
     **Example:** `GET /api/stats`
     """
-    with get_db() as conn:
-        total_qa = conn.execute('SELECT COUNT(*) FROM qa_pairs').fetchone()[0]
-        total_jobs = conn.execute('SELECT COUNT(*) FROM jobs').fetchone()[0]
-        completed = conn.execute('SELECT COUNT(*) FROM jobs WHERE status = "completed"').fetchone()[0]
-        failed = conn.execute('SELECT COUNT(*) FROM jobs WHERE status = "failed"').fetchone()[0]
-        unique_urls = conn.execute('SELECT COUNT(DISTINCT url) FROM jobs WHERE status = "completed"').fetchone()[0]
-        
-        return {
-            'total_qa_pairs': total_qa,
-            'total_jobs': total_jobs,
-            'completed_jobs': completed,
-            'failed_jobs': failed,
-            'unique_articles_processed': unique_urls,
-            'success_rate': f"{(completed / total_jobs * 100):.1f}%" if total_jobs > 0 else "0%",
-            'queue_size': job_queue.qsize()
-        }
+    return {
+        **await storage.get_stats(),
+        'pipeline': await pipeline_stats(),
+        'scrape_cache': await run_blocking(scrape_cache.summary),  # stats the cache directory
+        'llm_cache': llm_cache.summary(),
+        'ai_providers': ai_router.summary(),
+        'rate_limits': limiter_stats(),
+        'pre_extractor': pre_extract_stats,
+        'job_events': job_events.summary(),
+        'http_clients': await run_blocking(clients.summary)
+    }
 
 @app.get("/health", tags=["System"])
 async def health_check():
@@ -0,0 +1,489 @@
+# storage.py
+# Storage interface used by the API, with SQLite and MongoDB implementations
+import asyncio
+import functools
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Protocol, Set, Tuple
+from database_sqlite import DATABASE_PATH, STATS_COUNTERS, SQLitePool, get_counter, get_counters, migrate
+from qa_dedup import SIMILARITY_THRESHOLD, calculate_similarity, choose_bands, normalize_question, question_band_keys
+from scrape_cache import canonical_url
+
+MONGODB_URI = os.getenv("MONGODB_URI", "")
+
+class Storage(Protocol):
+    """
+    Everything the API reads and writes. Methods are blocking; the API
+    awaits them through ThreadedStorage (or uses database_motor.AsyncMongoDB).
+    Q&A rows are dicts with `question`, `answer`, `source_url` and
+    `timestamp`; cursors are opaque lists from the backend.
+    """
+
+    name: str
+
+    # Jobs
+    def create_job(self, job_id: str, url: str) -> str:
+        """Queue a (re)scrape of the URL; returns the id of the job that will handle it"""
+    def create_jobs(self, urls: List[str], batch_id: Optional[str] = None) -> List[Tuple[str, str, bool]]:
+        """Queue canonicalized, deduplicated URLs -> [(url, job_id, created)]"""
+    def get_job(self, job_id: str) -> Optional[Dict]: ...
+    def update_job_status(self, job_id: str, status: str, error: Optional[str] = None,
+                          qa_count: Optional[int] = None): ...
+    def batch_groups(self, batch_id: str) -> List[Dict]:
+        """Per-status `jobs`, `qa_pairs`, `created_at`, `completed_at` of a batch's jobs"""
+
+    # Durable job queue (leases, see simple_api.DurableJobQueue)
+    def claim_next_job(self, owner: str, lease_seconds: int) -> Optional[Tuple[str, str]]: ...
+    def renew_leases(self, owner: str, lease_seconds: int): ...
+    def recover_expired_jobs(self, max_attempts: int) -> int: ...
+    def count_queued_jobs(self) -> int: ...
+
+    # Q&A
+    def is_duplicate(self, question: str) -> bool: ...
+    def save_qa_pair(self, job_id: str, url: str, qa: Dict) -> bool: ...
+    def save_qa_pairs(self, job_id: str, url: str, qa_pairs: List[Dict]) -> Tuple[int, List[Dict]]:
+        """Store new pairs and complete the job -> (job's Q&A total, pairs inserted)"""
+    def get_job_results(self, job_id: str, limit: Optional[int] = None, after: Optional[List] = None) -> Dict:
+        """{'total', 'next_cursor', 'qa_pairs'} in insertion order; ValueError if `after` is malformed"""
+    def get_all_qa(self, limit: int = 50, offset: int = 0, after: Optional[List] = None) -> Dict:
+        """{'total', 'limit', 'offset', 'next_cursor', 'qa_pairs'}, newest first; ValueError if `after` is malformed"""
+    def iter_qa_batches(self, since: Optional[str], source_url: Optional[str], batch_size: int) -> Iterator[List[Dict]]:
+        """All pairs oldest first, `batch_size` at a time"""
+
+    # Stats
+    def get_stats(self) -> Dict: ...
+    def get_processed_urls(self) -> Set[str]: ...
+    def close(self): ...
+
+class AsyncStorage(Protocol):
+    """
+    Storage as the API awaits it: the same methods and results as coroutines,
+    iter_qa_batches as an async iterator; close() stays a plain call.
+    Implemented natively by database_motor.AsyncMongoDB, and by
+    ThreadedStorage for the blocking backends.
+    """
+
+    name: str
+
+    async def create_job(self, job_id: str, url: str) -> str: ...
+    async def create_jobs(self, urls: List[str], batch_id: Optional[str] = None) -> List[Tuple[str, str, bool]]: ...
+    async def get_job(self, job_id: str) -> Optional[Dict]: ...
+    async def update_job_status(self, job_id: str, status: str, error: Optional[str] = None,
+                                qa_count: Optional[int] = None): ...
+    async def batch_groups(self, batch_id: str) -> List[Dict]: ...
+    async def claim_next_job(self, owner: str, lease_seconds: int) -> Optional[Tuple[str, str]]: ...
+    async def renew_leases(self, owner: str, lease_seconds: int): ...
+    async def recover_expired_jobs(self, max_attempts: int) -> int: ...
+    async def count_queued_jobs(self) -> int: ...
+    async def is_duplicate(self, question: str) -> bool: ...
+    async def save_qa_pair(self, job_id: str, url: str, qa: Dict) -> bool: ...
+    async def save_qa_pairs(self, job_id: str, url: str, qa_pairs: List[Dict]) -> Tuple[int, List[Dict]]: ...
+    async def get_job_results(self, job_id: str, limit: Optional[int] = None, after: Optional[List] = None) -> Dict: ...
+    async def get_all_qa(self, limit: int = 50, offset: int = 0, after: Optional[List] = None) -> Dict: ...
+    def iter_qa_batches(self, since: Optional[str], source_url: Optional[str], batch_size: int) -> AsyncIterator[List[Dict]]: ...
+    async def get_stats(self) -> Dict: ...
+    async def get_processed_urls(self) -> Set[str]: ...
+    def close(self): ...
+
+class ThreadedStorage:
+    """
+    AsyncStorage over a blocking Storage: every call runs on `executor` (the
+    loop's default executor if None), so the event loop never waits on the
+    database. Concurrency is bounded by the executor's threads.
+    """
+
+    def __init__(self, storage: Storage, executor=None):
+        self.storage = storage
+        self.executor = executor
+        self.name = storage.name
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args))
+
+    def __getattr__(self, name):
+        method = getattr(self.storage, name)
+
+        async def call(*args):
+            return await self._run(method, *args)
+        return call
+
+    async def iter_qa_batches(self, since: Optional[str], source_url: Optional[str], batch_size: int):
+        batches = self.storage.iter_qa_batches(since, source_url, batch_size)
+        while True:
+            batch = await self._run(next, batches, None)
+            if batch is None:
+                return
+            yield batch
+
+    def close(self):
+        self.storage.close()
+
+def lease_deadline(lease_seconds: int) -> str:
+    return (datetime.now() + timedelta(seconds=lease_seconds)).isoformat()
+
+def cursor_int(value) -> int:
+    """The row id in a pagination cursor; ValueError if it is not an integer"""
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f"Invalid cursor id: {value!r}")
+    return int(value)
+
+def qa_fields(row) -> Dict:
+    """Public fields of a stored Q&A pair"""
+    return {
+        'question': row['question'],
+        'answer': row['answer'],
+        'source_url': row['source_url'],
+        'timestamp': row['timestamp'],
+    }
+
+class SQLiteStorage:
+    """
+    Local SQLite file (see database_sqlite.py): WAL with pooled readers and
+    one writer, near-duplicate detection through the qa_lsh LSH table.
+    """
+
+    name = "SQLite"
+
+    def __init__(self, path: str = DATABASE_PATH, similarity_threshold: float = SIMILARITY_THRESHOLD):
+        self.pool = SQLitePool(path)
+        self.threshold = similarity_threshold
+        self._init_db()
+
+    def connection(self, readonly=False):
+        """Pooled connection: the single writer by default, a WAL reader if readonly"""
+        return self.pool.reader() if readonly else self.pool.writer()
+
+    def _init_db(self):
+        with self.connection() as conn:
+            migrate(conn)
+
+            # Bucket keys embed the banding layout; rebuild if the threshold changed
+            bands, rows = choose_bands(self.threshold)
+            stale = conn.execute(
+                'SELECT 1 FROM qa_lsh WHERE band_key NOT LIKE ? LIMIT 1', (f"b{bands}r{rows}:%",)
+            ).fetchone()
+            if stale:
+                conn.execute('DELETE FROM qa_lsh')
+
+            # Index any Q&A pairs stored before the index existed
+            unindexed = conn.execute('''
+                SELECT id, question FROM qa_pairs
+                WHERE NOT EXISTS (SELECT 1 FROM qa_lsh WHERE qa_lsh.qa_id = qa_pairs.id)
+            ''').fetchall()
+            for row in unindexed:
+                self._index_question(conn, row['id'], row['question'])
+            if unindexed:
+                print(f"🗂️  Indexed {len(unindexed)} existing questions for deduplication")
+
+    # Jobs
+    def create_job(self, job_id: str, url: str) -> str:
+        with self.connection() as conn:
+            conn.execute('''
+                INSERT INTO jobs (id, url, status, created_at)
+                VALUES (?, ?, ?, ?)
+            ''', (job_id, url, 'queued', datetime.now().isoformat()))
+        return job_id
+
+    def create_jobs(self, urls: List[str], batch_id: Optional[str] = None):
+        """
+        Queue jobs for many URLs in one transaction.
+
+        URLs are canonicalized (see scrape_cache.canonical_url) and deduplicated,
+        within the list and against jobs that are queued, processing or
+        completed; a duplicate reuses the existing job instead of scraping again.
+        Returns [(url, job_id, created)] in submission order. With a batch_id,
+        every job (new or reused) is recorded as a member of the batch
+        """
+        canonical = list(dict.fromkeys(canonical_url(url) for url in urls))
+        now = datetime.now().isoformat()
+        with self.connection() as conn:
+            existing = {}
+            # Older jobs store the URL as submitted, so match both spellings
+            lookup = list(dict.fromkeys(canonical + [url.strip() for url in urls]))
+            for start in range(0, len(lookup), 500):  # stay under SQLite's variable limit
+                part = lookup[start:start + 500]
+                rows = conn.execute(f'''
+                    SELECT id, url FROM jobs
+                    WHERE url IN ({','.join('?' * len(part))}) AND status != 'failed'
+                    ORDER BY created_at
+                ''', part).fetchall()
+                for row in rows:
+                    existing.setdefault(canonical_url(row['url']), row['id'])
+
+            jobs = [(url, existing.get(url) or str(uuid.uuid4()), url not in existing) for url in canonical]
+            conn.executemany('''
+                INSERT INTO jobs (id, url, status, created_at)
+                VALUES (?, ?, 'queued', ?)
+            ''', [(job_id, url, now) for url, job_id, created in jobs if created])
+            if batch_id:
+                conn.executemany(
+                    'INSERT OR IGNORE INTO batch_jobs (batch_id, job_id) VALUES (?, ?)',
+                    [(batch_id, job_id) for _, job_id, _ in jobs]
+                )
+        return jobs
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        with self.connection(readonly=True) as conn:
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def update_job_status(self, job_id: str, status: str, error: Optional[str] = None,
+                          qa_count: Optional[int] = None):
+        finished = status in ['completed', 'failed']
+        completed_at = datetime.now().isoformat() if finished else None
+        with self.connection() as conn:
+            conn.execute('''
+                UPDATE jobs SET status = ?, error = COALESCE(?, error),
+                    qa_count = COALESCE(?, qa_count), completed_at = ?,
+                    lease_owner = CASE WHEN ? THEN NULL ELSE lease_owner END,
+                    lease_expires_at = CASE WHEN ? THEN NULL ELSE lease_expires_at END
+                WHERE id = ?
+            ''', (status, error, qa_count, completed_at, finished, finished, job_id))
+
+    def batch_groups(self, batch_id: str) -> List[Dict]:
+        with self.connection(readonly=True) as conn:
+            rows = conn.execute('''
+                SELECT jobs.status, COUNT(*) AS jobs, COALESCE(SUM(jobs.qa_count), 0) AS qa_pairs,
+                    MIN(jobs.created_at) AS created_at, MAX(jobs.completed_at) AS completed_at
+                FROM batch_jobs JOIN jobs ON jobs.id = batch_jobs.job_id
+                WHERE batch_jobs.batch_id = ?
+                GROUP BY jobs.status
+            ''', (batch_id,)).fetchall()
+        return [dict(row) for row in rows]
+
+    # Durable job queue: the jobs table is the queue
+    def claim_next_job(self, owner: str, lease_seconds: int):
+        """Atomically lease the oldest queued job -> (job_id, url) or None"""
+        with self.connection() as conn:
+            row = conn.execute('''
+                UPDATE jobs
+                SET status = 'processing', lease_owner = ?, lease_expires_at = ?, attempts = attempts + 1
+                WHERE id = (
+                    SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1
+                )
+                RETURNING id, url
+            ''', (owner, lease_deadline(lease_seconds))).fetchone()
+            return (row['id'], row['url']) if row else None
+
+    def renew_leases(self, owner: str, lease_seconds: int):
+        """Extend the leases of every job `owner` is working on"""
+        with self.connection() as conn:
+            conn.execute('''
+                UPDATE jobs SET lease_expires_at = ?
+                WHERE status = 'processing' AND lease_owner = ?
+            ''', (lease_deadline(lease_seconds), owner))
+
+    def recover_expired_jobs(self, max_attempts: int) -> int:
+        """Requeue jobs whose lease ran out; fail those out of attempts"""
+        now = datetime.now().isoformat()
+        with self.connection() as conn:
+            conn.execute('''
+                UPDATE jobs
+                SET status = 'failed', error = 'Exceeded max attempts', completed_at = ?,
+                    lease_owner = NULL, lease_expires_at = NULL
+                WHERE status = 'processing' AND (lease_expires_at IS NULL OR lease_expires_at < ?)
+                    AND attempts >= ?
+            ''', (now, now, max_attempts))
+            cursor = conn.execute('''
+                UPDATE jobs SET status = 'queued', lease_owner = NULL, lease_expires_at = NULL
+                WHERE status = 'processing' AND (lease_expires_at IS NULL OR lease_expires_at < ?)
+            ''', (now,))
+            return cursor.rowcount
+
+    def count_queued_jobs(self) -> int:
+        with self.connection(readonly=True) as conn:
+            return get_counter(conn, 'jobs_queued')
+
+    # Q&A
+    def _index_question(self, conn, qa_id, question):
+        """Add a stored question to the LSH index (call in the insert's transaction)"""
+        conn.executemany(
+            'INSERT INTO qa_lsh (band_key, qa_id) VALUES (?, ?)',
+            [(key, qa_id) for key in question_band_keys(question, self.threshold)]
+        )
+
+    def _duplicate_candidates(self, conn, question):
+        """Return ids of stored questions sharing an LSH bucket with `question`"""
+        keys = question_band_keys(question, self.threshold)
+        if not keys:
+            return []
+        placeholders = ','.join('?' * len(keys))
+        rows = conn.execute(
+            f'SELECT DISTINCT qa_id FROM qa_lsh WHERE band_key IN ({placeholders})', keys
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def is_duplicate(self, question: str, conn=None) -> bool:
+        if conn is None:
+            with self.connection(readonly=True) as conn:
+                return self.is_duplicate(question, conn)
+
+        # Exact matches are a single lookup on the unique normalized-question index
+        if conn.execute(
+            'SELECT 1 FROM qa_pairs WHERE question_norm = ?', (normalize_question(question),)
+        ).fetchone():
+            return True
+
+        candidate_ids = self._duplicate_candidates(conn, question)
+
+        # Only candidates get scored (chunked to stay under SQLite's variable limit)
+        for i in range(0, len(candidate_ids), 500):
+            chunk = candidate_ids[i:i + 500]
+            placeholders = ','.join('?' * len(chunk))
+            rows = conn.execute(
+                f'SELECT question FROM qa_pairs WHERE id IN ({placeholders})', chunk
+            ).fetchall()
+            for row in rows:
+                if calculate_similarity(question, row[0]) >= self.threshold:
+                    return True
+        return False
+
+    def _insert_qa_pair(self, conn, job_id: str, url: str, qa) -> bool:
+        """Store one Q&A pair unless it duplicates an existing question; True if inserted"""
+        if self.is_duplicate(qa['question'], conn):
+            return False
+        cursor = conn.execute('''
+            INSERT OR IGNORE INTO qa_pairs (job_id, question, answer, source_url, timestamp, question_norm)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (job_id, qa['question'], qa['answer'], url, datetime.now().isoformat(),
+              normalize_question(qa['question'])))
+        if not cursor.rowcount:
+            return False
+        self._index_question(conn, cursor.lastrowid, qa['question'])
+        return True
+
+    def save_qa_pair(self, job_id: str, url: str, qa) -> bool:
+        with self.connection() as conn:
+            return self._insert_qa_pair(conn, job_id, url, qa)
+
+    def save_qa_pairs(self, job_id: str, url: str, qa_pairs):
+        with self.connection() as conn:
+            inserted = [qa for qa in qa_pairs if self._insert_qa_pair(conn, job_id, url, qa)]
+
+            qa_count = conn.execute('SELECT COUNT(*) FROM qa_pairs WHERE job_id = ?', (job_id,)).fetchone()[0]
+            conn.execute('''
+                UPDATE jobs SET status = ?, completed_at = ?, qa_count = ?,
+                    lease_owner = NULL, lease_expires_at = NULL
+                WHERE id = ?
+            ''', ('completed', datetime.now().isoformat(), qa_count, job_id))
+        return qa_count, inserted
+
+    def get_job_results(self, job_id: str, limit: Optional[int] = None, after: Optional[List] = None) -> Dict:
+        with self.connection(readonly=True) as conn:
+            rows = conn.execute('''
+                SELECT id, question, answer, source_url, timestamp
+                FROM qa_pairs WHERE job_id = ? AND id > ?
+                ORDER BY id
+                LIMIT ?
+            ''', (job_id, cursor_int(after[0]) if after else 0, -1 if limit is None else limit)).fetchall()
+            total = conn.execute('SELECT COUNT(*) FROM qa_pairs WHERE job_id = ?', (job_id,)).fetchone()[0]
+
+        next_cursor = [rows[-1]['id']] if rows and len(rows) == limit else None
+        return {"total": total, "next_cursor": next_cursor, "qa_pairs": [qa_fields(row) for row in rows]}
+
+    def get_all_qa(self, limit: int = 50, offset: int = 0, after: Optional[List] = None) -> Dict:
+        with self.connection(readonly=True) as conn:
+            if after:
+                # Keyset pagination: seek straight to the position in idx_qa_pairs_timestamp
+                rows = conn.execute('''
+                    SELECT id, question, answer, source_url, timestamp
+                    FROM qa_pairs
+                    WHERE (timestamp, id) < (?, ?)
+                    ORDER BY timestamp DESC, id DESC
+                    LIMIT ?
+                ''', (str(after[0]), cursor_int(after[1]), limit)).fetchall()
+            else:
+                rows = conn.execute('''
+                    SELECT id, question, answer, source_url, timestamp
+                    FROM qa_pairs
+                    ORDER BY timestamp DESC, id DESC
+                    LIMIT ? OFFSET ?
+                ''', (limit, offset)).fetchall()
+            total = get_counter(conn, 'qa_pairs')
+
+        next_cursor = [rows[-1]['timestamp'], rows[-1]['id']] if rows and len(rows) == limit else None
+        return {
+            "total": total,
+            "limit": limit,
+            "offset": offset,
+            "next_cursor": next_cursor,
+            "qa_pairs": [qa_fields(row) for row in rows]
+        }
+
+    def iter_qa_batches(self, since: Optional[str], source_url: Optional[str], batch_size: int):
+        """
+        Each batch is a keyset query on its own pooled reader, so memory stays
+        constant and no read transaction is held open for the whole export.
+        """
+        position = (since or '', 0)
+        while True:
+            with self.connection(readonly=True) as conn:
+                if source_url:
+                    rows = conn.execute('''
+                        SELECT id, question, answer, source_url, timestamp FROM qa_pairs
+                        WHERE source_url = ? AND (timestamp, id) > (?, ?)
+                        ORDER BY timestamp, id LIMIT ?
+                    ''', (source_url, *position, batch_size)).fetchall()
+                else:
+                    rows = conn.execute('''
+                        SELECT id, question, answer, source_url, timestamp FROM qa_pairs
+                        WHERE (timestamp, id) > (?, ?)
+                        ORDER BY timestamp, id LIMIT ?
+                    ''', (*position, batch_size)).fetchall()
+            if not rows:
+                return
+            yield [qa_fields(row) for row in rows]
+            position = (rows[-1]['timestamp'], rows[-1]['id'])
+
+    # Stats
+    def get_stats(self) -> Dict:
+        """
+        Trigger-maintained counters: one indexed read, whatever the table sizes
+        (rebuild with `python database_sqlite.py reconcile` if they ever drift)
+        """
+        with self.connection(readonly=True) as conn:
+            counters = get_counters(conn, STATS_COUNTERS)
+        total_jobs = counters['jobs']
+        completed = counters['jobs_completed']
+        return {
+            'total_qa_pairs': counters['qa_pairs'],
+            'total_jobs': total_jobs,
+            'completed_jobs': completed,
+            'failed_jobs': counters['jobs_failed'],
+            'unique_articles_processed': counters['unique_urls'],
+            'success_rate': f"{(completed / total_jobs * 100):.1f}%" if total_jobs > 0 else "0%",
+            'queue_size': counters['jobs_queued'],
+            'database_type': self.name,
+            'persistent': False,
+        }
+
+    def get_processed_urls(self) -> Set[str]:
+        with self.connection(readonly=True) as conn:
+            rows = conn.execute('SELECT url FROM completed_urls').fetchall()
+        return set(row[0] for row in rows)
+
+    def close(self):
+        self.pool.close()
+
+def open_storage(similarity_threshold: float = SIMILARITY_THRESHOLD, executor=None) -> AsyncStorage:
+    """
+    MongoDB when MONGODB_URI is set (and pymongo installed), through Motor
+    if it is installed; otherwise SQLite. Blocking backends run on `executor`
+    """
+    if MONGODB_URI:
+        try:
+            from database_mongo import MongoDB
+        except ImportError:
+            print("⚠️  pymongo not installed, falling back to SQLite")
+        else:
+            print("✅ MongoDB enabled - data will persist!")
+            try:
+                from database_motor import AsyncMongoDB
+            except ImportError:
+                print("⚠️  motor not installed, MongoDB calls will run on worker threads")
+                return ThreadedStorage(MongoDB(similarity_threshold=similarity_threshold), executor)
+            return AsyncMongoDB(similarity_threshold=similarity_threshold)
+    print("ℹ️  Using SQLite (data will reset on redeploy)")
+    return ThreadedStorage(SQLiteStorage(similarity_threshold=similarity_threshold), executor)
@@ -0,0 +1,113 @@
+# test_api_latency.py
+# The API keeps answering while jobs run: a stub provider with a slow
+# extract keeps the pipeline busy while /health and job status are polled,
+# and idle scrape workers never pile claims onto the storage threads
+import asyncio
+import threading
+import time
+import pytest
+import simple_api
+from ai_providers import GROQ_MODEL, ProviderRouter
+from rate_limit import get_limiter
+
+SLOW_EXTRACT_SECONDS = 2.0
+POLL_SECONDS = 5.0
+MAX_LATENCY_SECONDS = 0.5
+
+class SlowProvider:
+    """Provider stub: every completion takes SLOW_EXTRACT_SECONDS; tracks peak concurrency"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.peak = 0
+
+    def __call__(self, prompt, on_text=None):
+        with self.lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        try:
+            time.sleep(SLOW_EXTRACT_SECONDS)
+            result = f"Q: What does chunk {hash(prompt)} say about Swift?\nA: Something useful."
+            if on_text:
+                on_text(result)
+            return result, GROQ_MODEL
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+def long_article(url: str) -> str:
+    """About 60 KB of markdown (several extraction chunks) with no explicit Q&A structure"""
+    return "\n\n".join(f"## Section {i} of {url}\n" + "Swift concurrency prose. " * 100 for i in range(25))
+
+@pytest.fixture
+def slow_pipeline(monkeypatch):
+    provider = SlowProvider()
+    monkeypatch.setattr(simple_api, "ai_router", ProviderRouter([("groq", provider)]))
+    monkeypatch.setattr(simple_api, "scrape_with_firecrawl", long_article)
+    for name in ("groq", "firecrawl"):
+        monkeypatch.setattr(get_limiter(name), "requests", None)
+        monkeypatch.setattr(get_limiter(name), "tokens", None)
+    return provider
+
+def timed_get(client, path):
+    started = time.perf_counter()
+    response = client.get(path)
+    assert response.status_code == 200
+    return time.perf_counter() - started, response.json()
+
+def test_endpoints_stay_responsive_while_jobs_run(client, slow_pipeline):
+    job_ids = [
+        client.post("/api/scrape", json={"url": f"https://medium.com/@latency/article-{i}"}).json()["job_id"]
+        for i in range(4)
+    ]
+
+    worst = {"health": 0.0, "job": 0.0}
+    statuses = set()
+    deadline = time.monotonic() + POLL_SECONDS
+    while time.monotonic() < deadline:
+        elapsed, _ = timed_get(client, "/health")
+        worst["health"] = max(worst["health"], elapsed)
+        elapsed, job = timed_get(client, f"/api/jobs/{job_ids[0]}")
+        worst["job"] = max(worst["job"], elapsed)
+        statuses.add(job["status"])
+        time.sleep(0.05)
+
+    # The jobs were still extracting the whole time we polled
+    assert statuses <= {"queued", "processing"}
+    assert slow_pipeline.peak > 0
+    assert slow_pipeline.peak <= simple_api.AI_CONCURRENCY
+    assert worst["health"] < MAX_LATENCY_SECONDS, worst
+    assert worst["job"] < MAX_LATENCY_SECONDS, worst
+
+def test_idle_scrape_workers_claim_one_at_a_time(monkeypatch):
+    claims = {"in_flight": 0, "peak": 0, "count": 0}
+    original = simple_api.claim_next_job
+
+    async def slow_claim():
+        if asyncio.get_running_loop() is not loop:  # the session app's own workers
+            return await original()
+        claims["in_flight"] += 1
+        claims["peak"] = max(claims["peak"], claims["in_flight"])
+        claims["count"] += 1
+        await asyncio.sleep(0.01)
+        claims["in_flight"] -= 1
+        return None
+
+    async def idle_workers():
+        queue = simple_api.DurableJobQueue()
+        workers = [asyncio.create_task(queue.get()) for _ in range(8)]
+        await asyncio.sleep(0.3)
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    monkeypatch.setattr(simple_api, "claim_next_job", slow_claim)
+    monkeypatch.setattr(simple_api, "QUEUE_POLL_SECONDS", 0.01)
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(idle_workers())
+    finally:
+        loop.close()
+    assert claims["count"] > 8
+    assert claims["peak"] == 1
@@ -0,0 +1,59 @@
+# test_api_pagination.py
+# Paging parameters and cursors from clients: pages chain through
+# X-Next-Cursor, and malformed values are a 400 rather than a 500
+import uuid
+import pytest
+import simple_api
+
+@pytest.fixture
+def job_id():
+    job_id = str(uuid.uuid4())
+    url = f"https://medium.com/@pagination/{job_id}"
+    storage = simple_api.storage.storage
+    storage.create_job(job_id, url)
+    storage.save_qa_pairs(job_id, url, [
+        {"question": f"{topic} {job_id[:8]}?", "answer": "It pages."}
+        for topic in ("Why prefer structs", "When is deinit called", "What does @MainActor guarantee",
+                      "How do you cancel a Task", "Where are closures retained")
+    ])
+    return job_id
+
+def test_job_results_pages_chain(client, job_id):
+    questions, cursor = [], None
+    while True:
+        response = client.get(f"/api/jobs/{job_id}/results", params={"limit": 2, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        questions += [qa["question"] for qa in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert response.headers["X-Total-Count"] == "5"
+    assert len(set(questions)) == 5
+
+def test_qa_cursor_continues_after_previous_page(client, job_id):
+    first = client.get("/api/qa", params={"limit": 3})
+    second = client.get("/api/qa", params={"limit": 3, "cursor": first.headers["X-Next-Cursor"]})
+    assert second.status_code == 200
+    assert not {qa["question"] for qa in first.json()} & {qa["question"] for qa in second.json()}
+
+@pytest.mark.parametrize("path", ["/api/qa", "/api/jobs/{job_id}/results"])
+@pytest.mark.parametrize("params", [
+    {"limit": 0},
+    {"limit": -1},
+    {"cursor": simple_api.encode_cursor("a", "b", "c")},  # too many values
+    {"cursor": simple_api.encode_cursor(None)},
+    {"cursor": simple_api.encode_cursor(True, 1)},
+    {"cursor": simple_api.encode_cursor(["nested"], 1)},
+    {"cursor": simple_api.encode_cursor("not-an-id")},
+    {"cursor": simple_api.encode_cursor("2024-01-01", "not-an-id")},
+    {"cursor": "not base64 json"},
+])
+def test_bad_paging_parameters_are_rejected(client, job_id, path, params):
+    response = client.get(path.format(job_id=job_id), params=params)
+    assert response.status_code == 400, response.text
+
+def test_qa_rejects_job_results_cursor(client):
+    assert client.get("/api/qa", params={"cursor": "WzFd"}).status_code == 400  # [1], not [timestamp, id]
+
+def test_negative_offset_is_rejected(client):
+    assert client.get("/api/qa", params={"offset": -1}).status_code == 400
@@ -0,0 +1,29 @@
+# test_api_scrape.py
+# POST /api/scrape: submitting a URL again scrapes it again, unless the
+# client opts into reusing the URL's existing job
+import uuid
+import pytest
+import simple_api
+
+@pytest.fixture
+def completed_job():
+    """A finished job for a fresh URL -> (job_id, url)"""
+    job_id = str(uuid.uuid4())
+    url = f"https://medium.com/@resubmit/{job_id}"
+    storage = simple_api.storage.storage
+    storage.create_job(job_id, url)
+    storage.update_job_status(job_id, "completed", qa_count=0)
+    return job_id, url
+
+def test_resubmitted_url_is_scraped_again(client, completed_job):
+    job_id, url = completed_job
+    response = client.post("/api/scrape", json={"url": url})
+    assert response.status_code == 200
+    assert response.json()["job_id"] != job_id
+    assert response.json()["status"] == "queued"
+
+def test_reuse_existing_returns_the_urls_job(client, completed_job):
+    job_id, url = completed_job
+    response = client.post("/api/scrape", json={"url": url, "reuse_existing": True})
+    assert response.status_code == 200
+    assert response.json() == {"job_id": job_id, "status": "completed", "message": "URL already submitted"}
@@ -0,0 +1,38 @@
+# test_pre_extract.py
+# Rule-based pre-extraction on the fixture corpus: structured iOS articles
+# clear PRE_EXTRACT_MIN_CONFIDENCE, essays and other platforms' Q&A don't
+import glob
+import os
+import pytest
+from qa_extract import pre_extract
+from simple_api import PRE_EXTRACT_MIN_CONFIDENCE
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "pre_extract")
+
+def articles(route: str):
+    return sorted(glob.glob(os.path.join(CORPUS, route, "*.md")))
+
+def read(path: str) -> str:
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+@pytest.mark.parametrize("path", articles("local"), ids=os.path.basename)
+def test_structured_ios_articles_are_parsed_locally(path):
+    qa_pairs, confidence = pre_extract(read(path))
+    assert confidence >= PRE_EXTRACT_MIN_CONFIDENCE
+    assert all(qa["answer"] and "?" in qa["question"] for qa in qa_pairs)
+
+@pytest.mark.parametrize("path", articles("llm"), ids=os.path.basename)
+def test_other_articles_go_to_the_llm(path):
+    _, confidence = pre_extract(read(path))
+    assert confidence < PRE_EXTRACT_MIN_CONFIDENCE
+
+def test_generic_words_are_not_ios_terms():
+    article = "\n\n".join(
+        f"## {i}. How do closures capture an optional {subject}?\n\n"
+        "Apple and every framework combine closures with ARC-like reference counting."
+        for i, subject in enumerate(("delegate", "protocol", "callback", "handler", "listener"), start=1)
+    )
+    qa_pairs, confidence = pre_extract(article)
+    assert len(qa_pairs) == 5
+    assert confidence == 0.3
@@ -0,0 +1,113 @@
+# test_query_plans.py
+# The hot SQLite queries use their indexes: every statement SQLiteStorage
+# runs is captured with a trace callback and checked with EXPLAIN QUERY PLAN
+import re
+import pytest
+from storage import SQLiteStorage
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / "plans.db"))
+    jobs = storage.create_jobs([f"https://medium.com/@plans/article-{i}" for i in range(20)])
+    for i, (url, job_id, _) in enumerate(jobs[:10]):
+        storage.save_qa_pairs(job_id, url, [
+            {"question": f"Question {i}-{j} about topic {i * 10 + j} in Swift?", "answer": "An answer."}
+            for j in range(5)
+        ])
+    yield storage
+    storage.close()
+
+@pytest.fixture
+def traced(storage, monkeypatch):
+    """Statements (with bound values) run by storage from now on"""
+    statements = []
+    connect = storage.pool._connect
+
+    def traced_connect(readonly):
+        conn = connect(readonly)
+        conn.set_trace_callback(lambda sql: statements.append(" ".join(sql.split())))
+        return conn
+
+    storage.pool.close()  # reconnect through traced_connect
+    monkeypatch.setattr(storage.pool, "_connect", traced_connect)
+    return statements
+
+def query_plan(storage, sql: str) -> str:
+    with storage.connection() as conn:
+        return "\n".join(row["detail"] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}"))
+
+def statement(statements, fragment: str) -> str:
+    matches = list(dict.fromkeys(sql for sql in statements if fragment in sql))  # RETURNING traces once per row
+    assert len(matches) == 1, f"expected one statement containing {fragment!r}, got {matches}"
+    return matches[0]
+
+def first_job_id(storage) -> str:
+    with storage.connection(readonly=True) as conn:
+        return conn.execute("SELECT job_id FROM qa_pairs ORDER BY id LIMIT 1").fetchone()[0]
+
+def newest_position(storage) -> list:
+    with storage.connection(readonly=True) as conn:
+        row = conn.execute("SELECT timestamp, id FROM qa_pairs ORDER BY timestamp DESC, id DESC LIMIT 1").fetchone()
+    return [row["timestamp"], row["id"]]
+
+# (case, storage call, fragment identifying the statement, index its plan
+# must use, whether rows must come out in index order without a sort)
+PLANS = [
+    ("claim next job",
+     lambda s: s.claim_next_job("worker", 60),
+     "SET status = 'processing', lease_owner", "idx_jobs_status_created", True),
+    # Expiry also matches NULL leases, so these search status = 'processing'
+    # (few rows) on either status index rather than a lease range
+    ("fail expired leases",
+     lambda s: s.recover_expired_jobs(3),
+     "error = 'Exceeded max attempts'", "idx_jobs_status_", True),
+    ("requeue expired leases",
+     lambda s: s.recover_expired_jobs(3),
+     "UPDATE jobs SET status = 'queued'", "idx_jobs_status_", True),
+    ("job results page",
+     lambda s: s.get_job_results(first_job_id(s), 2, [1]),
+     "ORDER BY id LIMIT 2", "idx_qa_pairs_job_id", True),
+    ("job results total",
+     lambda s: s.get_job_results(first_job_id(s), 2),
+     "SELECT COUNT(*) FROM qa_pairs WHERE job_id", "idx_qa_pairs_job_id", True),
+    ("Q&A keyset page",
+     lambda s: s.get_all_qa(10, 0, newest_position(s)),
+     "WHERE (timestamp, id) <", "idx_qa_pairs_timestamp", True),
+    ("Q&A offset page",
+     lambda s: s.get_all_qa(10, 20),
+     "ORDER BY timestamp DESC, id DESC LIMIT 10 OFFSET 20", "idx_qa_pairs_timestamp", True),
+    ("export batch",
+     lambda s: list(s.iter_qa_batches(None, None, 10)),
+     "WHERE (timestamp, id) > ('', 0)", "idx_qa_pairs_timestamp", True),
+    ("export batch for one article",
+     lambda s: list(s.iter_qa_batches(None, "https://medium.com/@plans/article-3", 10)),
+     "WHERE source_url = ", "idx_qa_pairs_source_url", True),
+    # Only the submitted URLs' matches get sorted, and DISTINCT runs over candidate ids
+    ("submitted URL lookup",
+     lambda s: s.create_jobs(["https://medium.com/@plans/article-1", "https://medium.com/@plans/new"]),
+     "SELECT id, url FROM jobs WHERE url IN", "idx_jobs_url", False),
+    ("exact duplicate lookup",
+     lambda s: s.is_duplicate("Is this question new?"),
+     "WHERE question_norm = ", "idx_qa_pairs_question_norm", True),
+    ("near-duplicate candidates",
+     lambda s: s.is_duplicate("Question 1-2 about topic 12 in Swift?"),
+     "FROM qa_lsh WHERE band_key IN", "idx_qa_lsh_band_key", False),
+]
+
+@pytest.mark.parametrize("call, fragment, index, index_order", [case[1:] for case in PLANS],
+                         ids=[case[0] for case in PLANS])
+def test_query_uses_index(storage, traced, call, fragment, index, index_order):
+    call(storage)
+    plan = query_plan(storage, statement(traced, fragment))
+    assert index in plan, plan
+    assert not re.search(r"SCAN (qa_pairs|jobs|qa_lsh)(?! USING)", plan), plan  # no full table scans
+    if index_order:
+        assert "USE TEMP B-TREE" not in plan, plan
+
+def test_queued_count_and_stats_read_counters(storage, traced):
+    storage.count_queued_jobs()
+    storage.get_stats()
+    for sql in traced:
+        if sql.startswith("SELECT"):
+            plan = query_plan(storage, sql)
+            assert "counters" in plan and "SCAN" not in plan, plan
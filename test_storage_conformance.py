@@ -0,0 +1,297 @@
+# test_storage_conformance.py
+# Every Storage backend behaves the same: the suite runs against
+# SQLiteStorage, MongoDB and AsyncMongoDB (on mongomock / mongomock-motor,
+# in-memory stand-ins for pymongo and Motor).
+# Performance checks are relative (work must not grow with the table), so
+# they hold on a slow CI machine and on pure-Python mongomock alike.
+import asyncio
+import time
+import uuid
+import pytest
+from storage import SQLiteStorage
+
+BACKENDS = ["sqlite", "mongodb", "motor"]
+
+class Blocking:
+    """AsyncMongoDB driven through the blocking Storage interface"""
+
+    def __init__(self, storage):
+        self.storage = storage
+        self.loop = asyncio.new_event_loop()
+
+    def __getattr__(self, name):
+        method = getattr(self.storage, name)
+        return lambda *args, **kwargs: self.loop.run_until_complete(method(*args, **kwargs))
+
+    def iter_qa_batches(self, *args):
+        async def collect():
+            return [batch async for batch in self.storage.iter_qa_batches(*args)]
+        return iter(self.loop.run_until_complete(collect()))
+
+    def close(self):
+        self.storage.close()
+        self.loop.close()
+
+def mongo_storage(backend: str, monkeypatch):
+    mongomock = pytest.importorskip("mongomock")
+    import database_mongo
+    server = mongomock.MongoClient()  # shared, so both classes see the same collections and indexes
+    monkeypatch.setattr(database_mongo, "MONGODB_URI", "mongodb://conformance")
+    monkeypatch.setattr(database_mongo, "MongoClient", lambda *args, **kwargs: server)
+    if backend == "mongodb":
+        return database_mongo.MongoDB()
+
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    import database_motor
+    monkeypatch.setattr(database_motor, "MONGODB_URI", "mongodb://conformance")
+    monkeypatch.setattr(database_motor, "AsyncIOMotorClient",
+                        lambda *args, **kwargs: mongomock_motor.AsyncMongoMockClient(mock_mongo_client=server))
+    return Blocking(database_motor.AsyncMongoDB())
+
+@pytest.fixture(params=BACKENDS)
+def storage(request, tmp_path, monkeypatch):
+    if request.param == "sqlite":
+        storage = SQLiteStorage(str(tmp_path / "conformance.db"))
+    else:
+        storage = mongo_storage(request.param, monkeypatch)
+    yield storage
+    storage.close()
+
+def article(n) -> str:
+    return f"https://medium.com/@conformance/article-{n}"
+
+# Distinct enough that no two are near-duplicates of each other
+TOPICS = [
+    "struct and class value semantics", "ARC retain cycles with weak references",
+    "SwiftUI state ownership", "UIKit view controller lifecycle", "Grand Central Dispatch queues",
+    "actors and data races", "Core Data merge policies", "XCTest async expectations",
+    "Auto Layout priorities", "URLSession background transfers", "property wrappers",
+    "Combine publishers and backpressure",
+]
+
+def qa(topic: str, answer: str = "An answer.") -> dict:
+    return {"question": f"Can you explain {topic} in an interview?", "answer": answer}
+
+def submit(storage, n) -> str:
+    [(_, job_id, _)] = storage.create_jobs([article(n)])
+    return job_id
+
+def save(storage, n, topics) -> str:
+    job_id = submit(storage, n)
+    storage.save_qa_pairs(job_id, article(n), [qa(topic) for topic in topics])
+    return job_id
+
+# Jobs
+def test_create_jobs_canonicalizes_and_reuses_jobs(storage):
+    jobs = storage.create_jobs([
+        article(1), article(1) + "?utm_source=feed", article(2) + "/", article(1) + "#comments",
+    ], "batch-1")
+    assert [(url, created) for url, _, created in jobs] == [(article(1), True), (article(2), True)]
+
+    again = storage.create_jobs([article(2), article(3)], "batch-2")
+    assert again[0] == (article(2), jobs[1][1], False)
+    assert again[1][2] is True
+    assert storage.count_queued_jobs() == 3
+
+def test_create_job_scrapes_a_finished_url_again(storage):
+    job_id = storage.create_job(str(uuid.uuid4()), article(1))
+    assert storage.claim_next_job("worker", 60) == (job_id, article(1))
+    storage.save_qa_pairs(job_id, article(1), [qa(TOPICS[0])])
+
+    again = storage.create_job(str(uuid.uuid4()), article(1))
+    assert storage.get_job(again)["status"] == "queued"
+    assert storage.claim_next_job("worker", 60) == (again, article(1))
+    assert storage.count_queued_jobs() == storage.get_stats()["queue_size"] == 0
+
+def test_failed_url_is_queued_again(storage):
+    job_id = submit(storage, 1)
+    storage.update_job_status(job_id, "failed", error="boom")
+    [(_, retry_id, _)] = storage.create_jobs([article(1)])
+    assert storage.get_job(retry_id)["status"] == "queued"
+    assert storage.claim_next_job("worker", 60) == (retry_id, article(1))
+
+def test_update_job_status(storage):
+    job_id = submit(storage, 1)
+    storage.update_job_status(job_id, "failed", error="Scrape failed")
+    job = storage.get_job(job_id)
+    assert job["status"] == "failed" and job["error"] == "Scrape failed" and job["completed_at"]
+    assert storage.get_job("missing") is None
+
+def test_batch_groups(storage):
+    jobs = storage.create_jobs([article(n) for n in range(3)], "batch")
+    storage.save_qa_pairs(jobs[0][1], article(0), [qa(TOPICS[0]), qa(TOPICS[1])])
+    storage.update_job_status(jobs[1][1], "failed", error="boom")
+    groups = {group["status"]: group for group in storage.batch_groups("batch")}
+    assert {status: (group["jobs"], group["qa_pairs"]) for status, group in groups.items()} == {
+        "completed": (1, 2), "failed": (1, 0), "queued": (1, 0),
+    }
+    assert groups["completed"]["completed_at"]
+    assert storage.batch_groups("no-such-batch") == []
+
+# Durable queue
+def test_claim_takes_oldest_queued_job_once(storage):
+    first, second = submit(storage, 1), submit(storage, 2)
+    assert storage.claim_next_job("a", 60) == (first, article(1))
+    assert storage.claim_next_job("b", 60) == (second, article(2))
+    assert storage.claim_next_job("c", 60) is None
+    assert storage.count_queued_jobs() == 0
+    assert storage.get_job(first)["lease_owner"] == "a"
+
+def test_expired_leases_are_requeued_then_failed(storage):
+    job_id = submit(storage, 1)
+    for attempt in range(1, 3):
+        assert storage.claim_next_job("worker", -1)[0] == job_id  # lease already expired
+        assert storage.recover_expired_jobs(max_attempts=3) == 1
+        assert storage.get_job(job_id)["status"] == "queued"
+    storage.claim_next_job("worker", -1)
+    assert storage.recover_expired_jobs(max_attempts=3) == 0
+    job = storage.get_job(job_id)
+    assert job["status"] == "failed" and job["error"] == "Exceeded max attempts"
+    assert storage.get_stats()["failed_jobs"] == 1
+
+def test_renewed_leases_are_not_recovered(storage):
+    job_id = submit(storage, 1)
+    storage.claim_next_job("worker", -1)
+    storage.renew_leases("worker", 60)
+    assert storage.recover_expired_jobs(max_attempts=3) == 0
+    assert storage.get_job(job_id)["status"] == "processing"
+
+# Q&A
+def test_save_qa_pairs_drops_exact_and_near_duplicates(storage):
+    first = save(storage, 1, TOPICS[:3])
+    job_id = submit(storage, 2)
+    total, inserted = storage.save_qa_pairs(job_id, article(2), [
+        qa(TOPICS[0]),                                                     # exact (normalized) duplicate
+        {"question": f"can you EXPLAIN {TOPICS[1]} in an interview", "answer": "x"},
+        {"question": f"Can you explain {TOPICS[2]} in an interview today?", "answer": "x"},  # near duplicate
+        qa(TOPICS[3]),
+        qa(TOPICS[3]),                                                     # repeated within the batch
+    ])
+    assert (total, [pair["question"] for pair in inserted]) == (1, [qa(TOPICS[3])["question"]])
+    job = storage.get_job(job_id)
+    assert job["status"] == "completed" and job["qa_count"] == 1
+    assert storage.get_job(first)["qa_count"] == 3
+    assert storage.is_duplicate(qa(TOPICS[0])["question"])
+    assert not storage.is_duplicate(qa(TOPICS[4])["question"])
+
+def test_save_qa_pair_streams_one_pair(storage):
+    job_id = submit(storage, 1)
+    assert storage.save_qa_pair(job_id, article(1), qa(TOPICS[0])) is True
+    assert storage.save_qa_pair(job_id, article(1), qa(TOPICS[0])) is False
+    assert storage.get_job(job_id)["status"] == "queued"  # only save_qa_pairs completes the job
+    assert storage.get_job_results(job_id)["total"] == 1
+
+def test_job_results_page_in_insertion_order(storage):
+    job_id = save(storage, 1, TOPICS[:5])
+    save(storage, 2, TOPICS[5:7])
+    questions, after = [], None
+    while True:
+        page = storage.get_job_results(job_id, 2, after)
+        assert page["total"] == 5
+        questions += [pair["question"] for pair in page["qa_pairs"]]
+        after = page["next_cursor"]
+        if not after:
+            break
+    assert questions == [qa(topic)["question"] for topic in TOPICS[:5]]
+    assert [pair["question"] for pair in storage.get_job_results(job_id)["qa_pairs"]] == questions
+    pair = storage.get_job_results(job_id)["qa_pairs"][0]
+    assert set(pair) == {"question", "answer", "source_url", "timestamp"} and pair["source_url"] == article(1)
+
+def test_all_qa_keyset_pages_match_offset_pages(storage):
+    for n in range(4):
+        save(storage, n, TOPICS[n * 3:n * 3 + 3])
+    by_offset = [pair["question"] for pair in storage.get_all_qa(100)["qa_pairs"]]
+    assert len(by_offset) == 12
+    assert by_offset[0] in {qa(topic)["question"] for topic in TOPICS[9:]}  # newest first
+
+    by_cursor, after = [], None
+    while True:
+        page = storage.get_all_qa(5, 0, after)
+        assert page["total"] == 12
+        by_cursor += [pair["question"] for pair in page["qa_pairs"]]
+        after = page["next_cursor"]
+        if not after:
+            break
+    assert by_cursor == by_offset
+    assert [pair["question"] for pair in storage.get_all_qa(5, 5)["qa_pairs"]] == by_offset[5:10]
+
+def test_empty_pages(storage):
+    job_id = save(storage, 1, TOPICS[:2])
+    assert storage.get_job_results(job_id, 0)["next_cursor"] is None
+    assert storage.get_all_qa(10, 50) == {**storage.get_all_qa(10, 50), "qa_pairs": [], "next_cursor": None}
+    assert storage.get_job_results("missing", 10) == {"total": 0, "next_cursor": None, "qa_pairs": []}
+
+@pytest.mark.parametrize("after", [["not-an-id"], [None], [1.5j]])
+def test_malformed_job_results_cursor_raises_value_error(storage, after):
+    with pytest.raises(ValueError):
+        storage.get_job_results("job", 10, after)
+
+def test_malformed_qa_cursor_raises_value_error(storage):
+    with pytest.raises(ValueError):
+        storage.get_all_qa(10, 0, ["2024-01-01T00:00:00", "not-an-id"])
+
+def test_iter_qa_batches(storage):
+    save(storage, 1, TOPICS[:3])
+    save(storage, 2, TOPICS[3:8])
+    batches = list(storage.iter_qa_batches(None, None, 3))
+    assert [len(batch) for batch in batches] == [3, 3, 2]
+    exported = [pair["question"] for batch in batches for pair in batch]
+    assert exported == [qa(topic)["question"] for topic in TOPICS[:8]]  # oldest first
+
+    only_second = [pair for batch in storage.iter_qa_batches(None, article(2), 2) for pair in batch]
+    assert {pair["source_url"] for pair in only_second} == {article(2)} and len(only_second) == 5
+    newest = batches[-1][-1]["timestamp"]
+    since = [pair for batch in storage.iter_qa_batches(newest, None, 10) for pair in batch]
+    assert all(pair["timestamp"] >= newest for pair in since) and since
+
+def test_stats_and_processed_urls(storage):
+    save(storage, 1, TOPICS[:2])
+    save(storage, 2, TOPICS[2:3])
+    failed = submit(storage, 3)
+    storage.update_job_status(failed, "failed", error="boom")
+    submit(storage, 4)
+    stats = storage.get_stats()
+    assert {key: stats[key] for key in (
+        "total_qa_pairs", "total_jobs", "completed_jobs", "failed_jobs", "unique_articles_processed", "queue_size",
+    )} == {
+        "total_qa_pairs": 3, "total_jobs": 4, "completed_jobs": 2, "failed_jobs": 1,
+        "unique_articles_processed": 2, "queue_size": 1,
+    }
+    assert stats["success_rate"] == "50.0%"
+    assert storage.get_processed_urls() == {article(1), article(2)}
+
+# Performance: the per-call work must not scale with the table size
+def seed(storage, jobs: int, pairs_per_job: int = 10):
+    for n in range(jobs):
+        job_id = submit(storage, f"seed-{n}")
+        storage.save_qa_pairs(job_id, article(f"seed-{n}"), [
+            {"question": f"Seed question {n} {i} {uuid.uuid4().hex} zz{uuid.uuid4().hex[:6]}?", "answer": "x"}
+            for i in range(pairs_per_job)
+        ])
+
+def median_seconds(call, repeats: int = 15) -> float:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - started)
+    return sorted(timings)[len(timings) // 2]
+
+def test_counters_answer_stats_and_queue_size_without_scanning(storage):
+    seed(storage, 5)
+    small = median_seconds(lambda: (storage.get_stats(), storage.count_queued_jobs()))
+    seed(storage, 45)
+    large = median_seconds(lambda: (storage.get_stats(), storage.count_queued_jobs()))
+    assert large < small * 3 + 0.002, (small, large)
+
+def test_keyset_page_cost_does_not_grow_with_depth(storage):
+    seed(storage, 30)
+    cursors, after = [], None
+    while True:
+        after = storage.get_all_qa(10, 0, after)["next_cursor"]
+        if not after:
+            break
+        cursors.append(after)
+    shallow = median_seconds(lambda: storage.get_all_qa(10, 0, cursors[0]))
+    deep = median_seconds(lambda: storage.get_all_qa(10, 0, cursors[-1]))
+    assert deep < shallow * 3 + 0.002, (shallow, deep)